@@ -1,7 +1,9 @@
 import os
 import json
+import tempfile
+import threading
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -13,6 +15,9 @@ class APIManager:
     # File to store API key
     KEY_FILE = os.path.join(str(Path.home()), ".browser_use", "api_keys.json")
     
+    # Key file entry holding extra keys for rotation, e.g. "1_pool": [...]
+    POOL_SUFFIX = "_pool"
+    
     # Gemini model configuration
     MODELS = {
         "1": {
@@ -20,41 +25,88 @@ class APIManager:
             "name": "Gemini 2.0 Flash",
             "provider": "Google",
             "key_name": "GOOGLE_API_KEY",
+            "pool_env_name": "GOOGLE_API_KEYS",
             "pricing": "Free",
             "test_prompt": "Say 'Hello' if you can hear me."
         }
     }
     
+    # Process-wide cache of the key file, revalidated against its stat() stamp
+    _cached_keys: Optional[Dict[str, Any]] = None
+    _cached_stamp: Optional[Tuple[int, int, int]] = None
+    _cache_lock = threading.Lock()
+    
     @classmethod
     def _ensure_key_file(cls) -> None:
         """Ensure the key file directory exists"""
         try:
             os.makedirs(os.path.dirname(cls.KEY_FILE), exist_ok=True)
             if not os.path.exists(cls.KEY_FILE):
-                with open(cls.KEY_FILE, "w") as f:
-                    json.dump({}, f, indent=2)
+                cls._atomic_write({})
         except Exception as e:
             print(f"Warning: Could not create key file directory: {e}")
     
     @classmethod
-    def _load_keys(cls) -> Dict[str, str]:
-        """Load API key from file"""
-        cls._ensure_key_file()
+    def _file_stamp(cls) -> Optional[Tuple[int, int, int]]:
+        """Identify the current key file version by mtime, inode and size"""
+        try:
+            st = os.stat(cls.KEY_FILE)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_ino, st.st_size)
+    
+    @classmethod
+    def _atomic_write(cls, keys: Dict[str, Any]) -> None:
+        """Write the key file via temp file + rename so readers never see a partial file"""
+        directory = os.path.dirname(cls.KEY_FILE)
+        fd, tmp_path = tempfile.mkstemp(prefix=".api_keys.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(keys, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, cls.KEY_FILE)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+    
+    @classmethod
+    def _load_keys(cls) -> Dict[str, Any]:
+        """Load API key from file (cached until the file changes on disk)"""
+        stamp = cls._file_stamp()
+        with cls._cache_lock:
+            if stamp is not None and cls._cached_keys is not None and stamp == cls._cached_stamp:
+                return dict(cls._cached_keys)
+        
+        if stamp is None:
+            cls._ensure_key_file()
+            stamp = cls._file_stamp()
         try:
             with open(cls.KEY_FILE, "r") as f:
                 data = json.load(f)
-                return data if isinstance(data, dict) else {}
+            keys = data if isinstance(data, dict) else {}
         except (json.JSONDecodeError, FileNotFoundError, Exception) as e:
             print(f"Warning: Could not load API keys: {e}")
             return {}
+        
+        with cls._cache_lock:
+            cls._cached_keys = dict(keys)
+            cls._cached_stamp = stamp
+        return keys
     
     @classmethod
-    def _save_keys(cls, keys: Dict[str, str]) -> bool:
+    def _save_keys(cls, keys: Dict[str, Any]) -> bool:
         """Save API key to file"""
         try:
-            cls._ensure_key_file()
-            with open(cls.KEY_FILE, "w") as f:
-                json.dump(keys, f, indent=2)
+            os.makedirs(os.path.dirname(cls.KEY_FILE), exist_ok=True)
+            cls._atomic_write(keys)
+            with cls._cache_lock:
+                cls._cached_keys = dict(keys)
+                cls._cached_stamp = cls._file_stamp()
             return True
         except Exception as e:
             print(f"Error: Could not save API keys: {e}")
@@ -98,6 +150,54 @@ class APIManager:
         key = keys.get(model_num, "")
         return key.strip() if key and key.strip() else None
     
+    @classmethod
+    def get_keys(cls, model_num: str) -> List[str]:
+        """Get every Gemini API key available for rotation, primary key first"""
+        if model_num != "1":
+            return []
+        
+        keys = []
+        primary = cls.get_key(model_num)
+        if primary:
+            keys.append(primary)
+        
+        # Extra keys come from GOOGLE_API_KEYS (comma separated) and the key file pool
+        env_pool = os.getenv(cls.MODELS[model_num]["pool_env_name"], "").split(",")
+        stored_pool = cls._load_keys().get(model_num + cls.POOL_SUFFIX, [])
+        if not isinstance(stored_pool, list):
+            stored_pool = []
+        for key in env_pool + stored_pool:
+            key = key.strip() if isinstance(key, str) else ""
+            if key and key not in keys:
+                keys.append(key)
+        return keys
+    
+    @classmethod
+    def add_pool_key(cls, model_num: str, api_key: str) -> bool:
+        """Add an extra Gemini API key to the rotation pool"""
+        if model_num != "1" or not api_key or not api_key.strip():
+            return False
+        
+        keys = cls._load_keys()
+        pool = keys.get(model_num + cls.POOL_SUFFIX, [])
+        pool = list(pool) if isinstance(pool, list) else []
+        if api_key.strip() not in pool:
+            pool.append(api_key.strip())
+        keys[model_num + cls.POOL_SUFFIX] = pool
+        return cls._save_keys(keys)
+    
+    @classmethod
+    def remove_pool_keys(cls, model_num: str) -> bool:
+        """Remove all extra Gemini API keys from the rotation pool"""
+        if model_num != "1":
+            return False
+        
+        keys = cls._load_keys()
+        if model_num + cls.POOL_SUFFIX in keys:
+            del keys[model_num + cls.POOL_SUFFIX]
+            return cls._save_keys(keys)
+        return True
+    
     @classmethod
     def list_models(cls) -> None:
         """List Gemini model with status"""
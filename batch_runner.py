@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Non-interactive batch runner
+Reads tasks from a file or stdin and streams one JSONL result per finished task
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, TextIO
+
+from main import BrowserManager, execute_task, setup_signal_handlers
+from concurrency_controller import get_adaptive_concurrency
+from key_scheduler import report_key_usage
+from prompt_budget import report_largest_prompts
+from storage_profiles import parse_profile
+from task_control import TaskBudget
+from task_queue import TaskQueue, batch_key, open_task_queue
+from vision import VisionSettings
+
+def parse_task_line(line: str, line_number: int) -> Optional[Dict[str, Any]]:
+    """Turn one input line into a task dict; plain text and JSON objects are both accepted"""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+
+    if line.startswith("{"):
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {line_number}: invalid JSON: {e}")
+        task = data.get("task")
+        if task is not None and not isinstance(task, str):
+            raise ValueError(f"Line {line_number}: 'task' must be a string")
+        task = (task or "").strip()
+        if not task:
+            raise ValueError(f"Line {line_number}: JSON task is missing a 'task' field")
+        item = {"id": data.get("id", line_number), "task": task}
+        try:
+            profile = parse_profile(data)
+            budget = TaskBudget.parse_overrides(data)
+            vision = VisionSettings.parse_overrides(data)
+        except ValueError as e:
+            raise ValueError(f"Line {line_number}: {e}")
+        if profile:
+            item["profile"] = profile
+        if budget:
+            item["budget"] = budget
+        if vision:
+            item["vision"] = vision
+        return item
+
+    return {"id": line_number, "task": line}
+
+def load_tasks(lines: Iterable[str]) -> List[Dict[str, Any]]:
+    """Parse all task lines, skipping blanks and comments"""
+    tasks = []
+    for line_number, line in enumerate(lines, 1):
+        task = parse_task_line(line, line_number)
+        if task:
+            tasks.append(task)
+    return tasks
+
+def write_result(output: TextIO, record: Dict[str, Any]) -> None:
+    """Write one result as a JSONL line and flush it immediately"""
+    output.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    output.flush()
+
+async def run_batch(tasks: List[Dict[str, Any]], output: TextIO, concurrency: int = 1,
+                    manager: Optional[BrowserManager] = None, llm=None,
+                    queue: Optional[TaskQueue] = None, batch: Optional[str] = None,
+                    steps: Optional[TextIO] = None) -> Dict[str, Any]:
+    """Run tasks with at most `concurrency` in flight, streaming results as they finish
+
+    Tasks go through `queue` (an in-memory one if none is given). With a queue
+    database, running the same batch again only runs what hasn't finished yet.
+    Step events of running tasks are written to `steps` as JSONL when given.
+    """
+    concurrency = max(1, concurrency)
+    own_manager = manager is None
+    if own_manager:
+        manager = BrowserManager(pool_min=min(concurrency, 2), pool_max=concurrency) \
+            if concurrency > 1 else BrowserManager()
+    if queue is None:
+        queue = TaskQueue()
+    if batch is None:
+        batch = batch_key(tasks)
+    queue.enqueue(batch, tasks)
+
+    claimed = deque()
+    summary = {"total": len(tasks), "succeeded": 0, "failed": 0}
+    started = time.monotonic()
+
+    # With adaptive concurrency, `concurrency` workers exist but only the controller's
+    # current limit of them run a task at once
+    controller = get_adaptive_concurrency()
+
+    def next_item():
+        # Claim a group of tasks per transaction rather than one at a time
+        if not claimed:
+            claimed.extend(queue.claim(batch, controller.limit if controller else concurrency))
+        return claimed.popleft() if claimed else None
+
+    async def run_item(item):
+        try:
+            on_step = (lambda event, task_id=item["id"]: write_result(steps, {"id": task_id, **event})) \
+                if steps else None
+            record = await execute_task(item["task"], manager, llm=llm, profile=item.get("profile"),
+                                        on_step=on_step, budget=item.get("budget"), vision=item.get("vision"))
+        except asyncio.CancelledError:
+            queue.release([item["queue_id"]])
+            raise
+        except Exception as e:
+            record = {"task": item["task"], "success": False, "result": None,
+                      "error": f"{type(e).__name__}: {e}"}
+        record = {"id": item["id"], **record}
+        queue.finish(item["queue_id"], record)
+        summary["succeeded" if record["success"] else "failed"] += 1
+        write_result(output, record)
+
+    async def worker():
+        while True:
+            if controller:
+                await controller.acquire()
+            try:
+                item = next_item()
+                if item is None:
+                    return
+                await run_item(item)
+            finally:
+                if controller:
+                    await controller.release()
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(min(concurrency, len(tasks)) or 1)))
+    finally:
+        if claimed:
+            queue.release(item["queue_id"] for item in claimed)
+        if own_manager:
+            await manager.cleanup()
+
+    summary["duration"] = round(time.monotonic() - started, 3)
+    return summary
+
+def read_task_source(path: str) -> List[Dict[str, Any]]:
+    """Load tasks from a file path, or stdin for '-'"""
+    if path == "-":
+        return load_tasks(sys.stdin)
+    with open(path, "r", encoding="utf-8") as f:
+        return load_tasks(f)
+
+def open_step_events(path: Optional[str], stack: contextlib.ExitStack) -> Optional[TextIO]:
+    """Where --step-events lines go: None when disabled, stderr for '-', else the file (appended)"""
+    if not path:
+        return None
+    if path == "-":
+        return sys.stderr
+    return stack.enter_context(open(path, "a", encoding="utf-8"))
+
+def resume_batch(args, tasks: List[Dict[str, Any]], output: TextIO):
+    """Open the task queue for a batch and recover tasks a previous run left running
+
+    Returns the queue and the batch key. Recovered tasks that are out of attempts are
+    written to `output` as failures.
+    """
+    queue = open_task_queue(args.queue_db)
+    batch = batch_key(tasks)
+    counts = queue.counts(batch)
+    finished = counts["done"] + counts["failed"]
+    if finished:
+        print(f"♻️ Resuming batch {batch}: {finished} of {len(tasks)} task(s) already finished", file=sys.stderr)
+    interrupted, failed = queue.recover(batch)
+    if interrupted:
+        print(f"♻️ {interrupted} task(s) were interrupted by the previous run; "
+              f"{interrupted - len(failed)} will be retried", file=sys.stderr)
+    for record in failed:
+        write_result(output, record)
+    return queue, batch
+
+async def run_batch_cli(args) -> int:
+    """Entry point for `python main.py --batch PATH`; returns the process exit code"""
+    tasks = read_task_source(args.batch)
+
+    if not tasks:
+        print("❌ No tasks found in input", file=sys.stderr)
+        return 1
+
+    # SIGTERM/SIGINT cancel the batch: running tasks go back to pending and the browser is closed
+    setup_signal_handlers()
+    print(f"🚀 Running {len(tasks)} task(s) with concurrency {args.concurrency}", file=sys.stderr)
+    try:
+        with contextlib.ExitStack() as stack:
+            steps = open_step_events(args.step_events, stack)
+            if args.output == "-":
+                # Keep stdout clean for JSONL: status prints from the browser manager go to stderr
+                results = sys.stdout
+                stack.enter_context(contextlib.redirect_stdout(sys.stderr))
+            else:
+                results = stack.enter_context(open(args.output, "a", encoding="utf-8"))
+            queue, batch = resume_batch(args, tasks, results)
+            summary = await run_batch(tasks, results, args.concurrency, queue=queue, batch=batch, steps=steps)
+    except asyncio.CancelledError:
+        hint = " Run the same command again to resume." if args.queue_db or os.getenv("TASK_QUEUE_DB") else ""
+        print(f"⚠️ Batch stopped before finishing.{hint}", file=sys.stderr)
+        return 143
+
+    counts = queue.counts(batch)
+    queue.close()
+    print(f"✅ Batch finished: {summary['succeeded']} succeeded, {summary['failed']} failed "
+          f"in {summary['duration']}s", file=sys.stderr)
+    if counts["done"] + counts["failed"] > summary["succeeded"] + summary["failed"]:
+        print(f"📊 Whole batch: {counts['done']} done, {counts['failed']} failed", file=sys.stderr)
+    report_largest_prompts()
+    report_key_usage()
+    from llm_cache import report_llm_cache
+    report_llm_cache()
+    controller = get_adaptive_concurrency()
+    if controller:
+        print(f"🎚️ Adaptive concurrency ended at {controller.limit} of {controller.maximum} "
+              f"after {len(controller.changes)} change(s)", file=sys.stderr)
+    return 0 if counts["failed"] == 0 else 1
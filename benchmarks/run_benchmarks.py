@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Offline performance benchmarks
+Drives the real execute_task/Agent path with a fake chat model against a local static site
+
+Reports cold-start time, warm task latency (p50/p95), tasks/sec at several
+concurrency levels and peak RSS of Python and Chromium. With --baseline the
+run fails when a metric regresses by more than --tolerance.
+
+Usage:
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --baseline bench.json --tolerance 0.25
+"""
+
+import argparse
+import asyncio
+import contextlib
+import functools
+import http.server
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+# Keep the run fully offline and quiet
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "false")
+os.environ.setdefault("SKIP_LLM_API_KEY_VERIFICATION", "true")
+os.environ.setdefault("BROWSER_USE_LOGGING_LEVEL", "result")
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import psutil
+
+from batch_runner import run_batch
+from fake_llm import make_fake_llm
+from main import BrowserManager, execute_task
+from server import percentile
+
+SITE_DIR = os.path.join(BENCH_DIR, "site")
+PAGES = ["index.html", "article.html", "form.html", "list.html"]
+
+# Metrics where a higher value is better; everything else is "lower is better"
+HIGHER_IS_BETTER = ("tasks_per_sec",)
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    """Static file handler that doesn't log every request"""
+
+    def log_message(self, format, *args):
+        pass
+
+def start_site_server():
+    """Serve the fixture site on a free localhost port in a background thread"""
+    handler = functools.partial(QuietHandler, directory=SITE_DIR)
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    return httpd, f"http://127.0.0.1:{httpd.server_address[1]}"
+
+class RSSSampler:
+    """Samples peak RSS of this process and its Chromium children in a background thread"""
+
+    def __init__(self, interval: float = 0.2):
+        self.interval = interval
+        self.peak_python = 0
+        self.peak_browser = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        me = psutil.Process()
+        while not self._stop.is_set():
+            try:
+                self.peak_python = max(self.peak_python, me.memory_info().rss)
+                browser_rss = 0
+                for child in me.children(recursive=True):
+                    with contextlib.suppress(psutil.Error):
+                        browser_rss += child.memory_info().rss
+                self.peak_browser = max(self.peak_browser, browser_rss)
+            except psutil.Error:
+                pass
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+def make_tasks(base_url, count):
+    return [{"id": i, "task": f"Open {base_url}/{PAGES[i % len(PAGES)]} and report its title"} for i in range(count)]
+
+async def bench_cold_start(base_url, llm):
+    """First task on a fresh BrowserManager, including the browser launch"""
+    manager = BrowserManager()
+    started = time.perf_counter()
+    try:
+        record = await execute_task(f"Open {base_url}/index.html", manager, llm=llm)
+    finally:
+        await manager.cleanup()
+    return {"seconds": round(time.perf_counter() - started, 3), "success": record["success"]}
+
+async def bench_warm_latency(base_url, llm, runs):
+    """Sequential tasks on an already-warm pooled context"""
+    manager = BrowserManager(pool_min=1, pool_max=2)
+    await manager.initialize_browser()
+    await execute_task(f"Open {base_url}/index.html", manager, llm=llm)  # warm-up, not measured
+    latencies = []
+    try:
+        for item in make_tasks(base_url, runs):
+            started = time.perf_counter()
+            await execute_task(item["task"], manager, llm=llm)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        await manager.cleanup()
+    return {"p50": percentile(latencies, 50), "p95": percentile(latencies, 95), "runs": runs}
+
+async def bench_throughput(base_url, llm, concurrency, tasks_per_level):
+    """Tasks/sec through the batch runner at a given concurrency"""
+    manager = BrowserManager(pool_min=concurrency, pool_max=concurrency) if concurrency > 1 else BrowserManager()
+    await manager.initialize_browser()
+    sink = io.StringIO()
+    try:
+        started = time.perf_counter()
+        summary = await run_batch(make_tasks(base_url, tasks_per_level), sink, concurrency, manager=manager, llm=llm)
+        elapsed = time.perf_counter() - started
+    finally:
+        await manager.cleanup()
+    return {"tasks_per_sec": round(summary["total"] / elapsed, 3), "failed": summary["failed"]}
+
+async def run_all(args):
+    httpd, base_url = start_site_server()
+    llm = make_fake_llm(latency=args.llm_latency)
+    report = {"config": {"runs": args.runs, "concurrency": args.concurrency, "llm_latency": args.llm_latency}}
+    try:
+        with RSSSampler() as rss, contextlib.redirect_stdout(io.StringIO()):
+            report["cold_start"] = await bench_cold_start(base_url, llm)
+            report["warm_latency"] = await bench_warm_latency(base_url, llm, args.runs)
+            report["throughput"] = {
+                str(level): await bench_throughput(base_url, llm, level, args.tasks_per_level)
+                for level in args.concurrency
+            }
+        report["peak_rss_mb"] = {
+            "python": round(rss.peak_python / 1024 / 1024, 1),
+            "browser": round(rss.peak_browser / 1024 / 1024, 1),
+        }
+    finally:
+        httpd.shutdown()
+    return report
+
+def flatten(report, prefix=""):
+    """Numeric leaves of the report as {"a.b.c": value}"""
+    flat = {}
+    for key, value in report.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and not name.startswith("config."):
+            flat[name] = value
+    return flat
+
+def compare(report, baseline, tolerance):
+    """List metrics that regressed more than `tolerance` (relative) against the baseline"""
+    current, previous = flatten(report), flatten(baseline)
+    regressions = []
+    for name, old in previous.items():
+        new = current.get(name)
+        if new is None or not old or name.endswith(("runs", "failed")):
+            continue
+        change = (new - old) / old
+        if name.endswith(HIGHER_IS_BETTER):
+            change = -change
+        if change > tolerance:
+            regressions.append(f"{name}: {old} -> {new} ({change:.0%} worse)")
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline performance benchmarks")
+    parser.add_argument("--runs", type=int, default=10, help="Warm tasks measured for p50/p95")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4],
+                        help="Concurrency levels for the throughput benchmark")
+    parser.add_argument("--tasks-per-level", type=int, default=12, help="Tasks run at each concurrency level")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated seconds per fake LLM call")
+    parser.add_argument("--output", metavar="PATH", help="Write the JSON report to PATH")
+    parser.add_argument("--baseline", metavar="PATH", help="Fail if results regress against this report")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression (default 25%%)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run_all(args))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("❌ Performance regressions:", file=sys.stderr)
+            for line in regressions:
+                print(f"   {line}", file=sys.stderr)
+            return 1
+        print("✅ No regressions against baseline", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import asyncio
+import os
+from typing import Optional, Set
+
+from config import env_flag
+
+class RecyclePolicy:
+    """When BrowserManager replaces pooled contexts and the shared browser"""
+
+    def __init__(self, max_tasks: int = 0, max_rss_mb: float = 0, probe_timeout: float = 5.0,
+                 standby: bool = False):
+        self.max_tasks = max(0, max_tasks)  # tasks per context before it is replaced (0 = never)
+        self.max_rss_mb = max(0, max_rss_mb)  # Chromium process tree RSS that triggers a browser swap
+        self.probe_timeout = probe_timeout  # seconds a liveness probe may take before it counts as failed
+        self.standby = standby  # keep a launched spare browser so a swap doesn't wait for Chromium
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_tasks or self.max_rss_mb or self.standby)
+
+def chromium_pids() -> Set[int]:
+    """PIDs of the Chromium browser processes (not their renderers) started by this process"""
+    import psutil
+
+    pids = set()
+    try:
+        descendants = psutil.Process().children(recursive=True)
+    except psutil.Error:
+        return pids
+    for proc in descendants:
+        try:
+            name = proc.name().lower()
+            parent = proc.parent()
+            parent_name = parent.name().lower() if parent else ""
+        except psutil.Error:
+            continue
+        if ("chrom" in name or "headless_shell" in name) and not ("chrom" in parent_name or "headless_shell" in parent_name):
+            pids.add(proc.pid)
+    return pids
+
+def process_tree_rss_mb(pid: int) -> float:
+    """Resident memory of a process and all its children, in MB (0 if it is gone)"""
+    import psutil
+
+    try:
+        root = psutil.Process(pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.Error:
+        return 0.0
+    total = 0
+    for proc in processes:
+        try:
+            total += proc.memory_info().rss
+        except psutil.Error:
+            continue
+    return total / 1024 / 1024
+
+async def probe_context(context, timeout: float) -> bool:
+    """Cheap liveness check: one CDP round trip to the browser behind a context"""
+    try:
+        # Persistent contexts (single-context mode) have no Browser object to ask
+        if context.browser is not None and not context.browser.is_connected():
+            return False
+        await asyncio.wait_for(context.cookies(), timeout)
+        return True
+    except Exception:
+        return False
+
+_recycle_policy = RecyclePolicy()
+
+def configure_recycling(max_tasks: Optional[int] = None, max_rss_mb: Optional[float] = None,
+                        standby: Optional[bool] = None) -> RecyclePolicy:
+    """Set the process-wide recycling policy (defaults from BROWSER_RECYCLE_TASKS / BROWSER_MAX_RSS_MB / BROWSER_STANDBY)"""
+    global _recycle_policy
+    if max_tasks is None:
+        max_tasks = int(os.getenv("BROWSER_RECYCLE_TASKS", "0"))
+    if max_rss_mb is None:
+        max_rss_mb = float(os.getenv("BROWSER_MAX_RSS_MB", "0"))
+    if standby is None:
+        standby = env_flag("BROWSER_STANDBY")
+    if max_rss_mb:
+        # Fail at startup rather than on the first browser launch
+        try:
+            import psutil  # noqa: F401
+        except ImportError:
+            raise RuntimeError("--max-browser-rss / BROWSER_MAX_RSS_MB needs psutil: pip install psutil")
+    _recycle_policy = RecyclePolicy(max_tasks=max_tasks, max_rss_mb=max_rss_mb, standby=standby)
+    return _recycle_policy
+
+def get_recycle_policy() -> RecyclePolicy:
+    """The configured recycling policy (everything off unless configured)"""
+    return _recycle_policy
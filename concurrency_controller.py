@@ -0,0 +1,166 @@
+import asyncio
+import os
+import statistics
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from config import env_flag
+from metrics import registry
+
+class AdaptiveConcurrency:
+    """AIMD limit on the number of tasks in flight
+
+    Every `interval` seconds the steps finished since the last check are looked at.
+    The limit is cut by `decrease` (multiplicative) when:
+    - a step hit a 429/quota error;
+    - LLM or step errors exceed `max_error_rate`;
+    - the median step latency grew past `latency_factor` x the best recent median;
+    - host CPU or memory use is above `max_cpu` / `max_memory` percent.
+    Otherwise it grows by one (additive) if every slot was in use. Each change is
+    kept with its reason and exported as metrics.
+    """
+
+    def __init__(self, maximum: int, minimum: int = 1, initial: Optional[int] = None, interval: float = 10.0,
+                 decrease: float = 0.5, max_error_rate: float = 0.3, latency_factor: float = 2.0,
+                 max_cpu: float = 90.0, max_memory: float = 90.0):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = max(self.minimum, min(initial or (self.maximum + 1) // 2, self.maximum))
+        self.interval = interval
+        self.decrease = decrease
+        self.max_error_rate = max_error_rate
+        self.latency_factor = latency_factor
+        self.max_cpu = max_cpu
+        self.max_memory = max_memory
+        self.in_flight = 0
+        self.changes = deque(maxlen=100)
+        self._condition: Optional[asyncio.Condition] = None
+        self._window_started = time.monotonic()
+        self._latencies: List[float] = []
+        self._steps = 0
+        self._errors = 0
+        self._rate_limited = 0
+        self._saturated = False  # every slot was taken at some point in the window
+        self._baseline_latency: Optional[float] = None
+        self._publish()
+
+    @property
+    def condition(self) -> asyncio.Condition:
+        # Created lazily so the controller can be configured before the event loop starts
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self) -> None:
+        """Wait for a free slot under the current limit"""
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+            if self.in_flight >= self.limit:
+                self._saturated = True
+
+    async def release(self) -> None:
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def observe_step(self, latency: float, errors: int = 0, rate_limited: bool = False) -> None:
+        """Feed one finished agent step into the current window"""
+        self._latencies.append(latency)
+        self._steps += 1
+        self._errors += errors
+        self._rate_limited += int(rate_limited)
+        if time.monotonic() - self._window_started >= self.interval:
+            self.adjust()
+
+    def host_pressure(self) -> Optional[str]:
+        """'cpu' or 'memory' when the host is overloaded, None otherwise (or without psutil)"""
+        try:
+            import psutil
+        except ImportError:
+            return None
+        if psutil.cpu_percent(interval=None) > self.max_cpu:
+            return "cpu"
+        if psutil.virtual_memory().percent > self.max_memory:
+            return "memory"
+        return None
+
+    def adjust(self) -> Optional[str]:
+        """Close the current window and change the limit; returns the reason if it changed"""
+        median = statistics.median(self._latencies) if self._latencies else None
+        if self._rate_limited:
+            reason = "rate_limited"
+        elif self._steps and self._errors / self._steps > self.max_error_rate:
+            reason = "errors"
+        elif median is not None and self._baseline_latency and median > self._baseline_latency * self.latency_factor:
+            reason = "latency"
+        else:
+            reason = self.host_pressure()
+
+        if median is not None and reason != "latency":
+            # The baseline follows the best recent median but drifts up 5% per window,
+            # so one unusually fast window doesn't make every later one look slow
+            self._baseline_latency = median if self._baseline_latency is None else \
+                min(self._baseline_latency * 1.05, median)
+
+        if reason:
+            new_limit = max(self.minimum, int(self.limit * self.decrease))
+        elif self._saturated:
+            new_limit, reason = min(self.maximum, self.limit + 1), "saturated"
+        else:
+            new_limit = self.limit
+
+        self._window_started = time.monotonic()
+        self._latencies = []
+        self._steps = self._errors = self._rate_limited = 0
+        self._saturated = self.in_flight >= new_limit
+
+        if new_limit == self.limit:
+            return None
+        self.changes.append({"time": time.time(), "from": self.limit, "to": new_limit, "reason": reason,
+                             "median_step_latency": round(median, 3) if median is not None else None})
+        print(f"🎚️ Concurrency {self.limit} -> {new_limit} ({reason})")
+        self.limit = new_limit
+        registry.count_limit_change(reason)
+        self._publish()
+        if self._condition is not None and new_limit > self.in_flight:
+            asyncio.get_running_loop().create_task(self._wake())
+        return reason
+
+    async def _wake(self) -> None:
+        async with self.condition:
+            self.condition.notify_all()
+
+    def _publish(self) -> None:
+        registry.set_gauge("browser_use_concurrency_limit", self.limit, "Current adaptive limit on tasks in flight")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            "baseline_step_latency": round(self._baseline_latency, 3) if self._baseline_latency else None,
+            "changes": list(self.changes)[-10:],
+        }
+
+_controller: Optional[AdaptiveConcurrency] = None
+
+def configure_adaptive_concurrency(enabled: Optional[bool] = None, maximum: int = 1,
+                                   minimum: Optional[int] = None) -> Optional[AdaptiveConcurrency]:
+    """Set up the controller with `maximum` slots (defaults from ADAPTIVE_CONCURRENCY / ADAPTIVE_MIN_CONCURRENCY)"""
+    global _controller
+    if enabled is None:
+        enabled = env_flag("ADAPTIVE_CONCURRENCY")
+    if not enabled or maximum <= 1:
+        _controller = None
+        return None
+    if minimum is None:
+        minimum = int(os.getenv("ADAPTIVE_MIN_CONCURRENCY", "1"))
+    _controller = AdaptiveConcurrency(maximum, minimum=minimum)
+    return _controller
+
+def get_adaptive_concurrency() -> Optional[AdaptiveConcurrency]:
+    """The configured controller, or None when concurrency is fixed"""
+    return _controller
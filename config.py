@@ -1,9 +1,16 @@
 import os
+from functools import lru_cache
 from typing import Dict, Any
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+@lru_cache(maxsize=None)
+def load_environment() -> None:
+    """Load .env once, on first use rather than at import time"""
+    from dotenv import load_dotenv
+    load_dotenv()
+
+def env_flag(name: str) -> bool:
+    """Whether an on/off environment variable is switched on (1, true, yes or on)"""
+    return os.getenv(name, "").strip().lower() in ("1", "true", "yes", "on")
 
 def validate_api_key(key_name: str, key_value: str | None, required: bool = False) -> str | None:
     """Validate API key format and presence"""
@@ -24,10 +31,10 @@ def validate_api_key(key_name: str, key_value: str | None, required: bool = Fals
 class LLMConfig:
     """Configuration for Gemini Language Model"""
     
-    # Google Gemini Flash configuration
+    # Google Gemini Flash configuration (api_key is filled in on first use)
     GEMINI = {
         "model": "gemini-2.0-flash-exp",
-        "api_key": validate_api_key("GOOGLE_API_KEY", os.getenv("GOOGLE_API_KEY"))
+        "api_key": None
     }
     
     @classmethod
@@ -35,6 +42,10 @@ class LLMConfig:
         """Get models with valid API keys"""
         models = {}
         
+        if cls.GEMINI["api_key"] is None:
+            load_environment()
+            cls.GEMINI["api_key"] = validate_api_key("GOOGLE_API_KEY", os.getenv("GOOGLE_API_KEY"))
+        
         # Add Gemini if API key is valid
         if cls.GEMINI["api_key"]:
             models["gemini-flash"] = cls.GEMINI
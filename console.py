@@ -0,0 +1,51 @@
+import asyncio
+import threading
+from typing import Optional
+
+# Prompt currently waiting for input, re-shown after background output
+_open_prompt: Optional[str] = None
+
+async def ainput(prompt: str = "") -> str:
+    """input() that doesn't block the event loop
+
+    The line is read on a daemon thread, so browser keep-alives, the pre-warm and
+    background tasks keep running while a prompt is open. A daemon thread (rather
+    than the default executor) keeps a pending prompt from delaying shutdown.
+    """
+    global _open_prompt
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def resolve(result, error):
+        if not future.done():
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def read():
+        try:
+            line = input(prompt)
+        except (EOFError, KeyboardInterrupt) as e:
+            loop.call_soon_threadsafe(resolve, None, e)
+        else:
+            loop.call_soon_threadsafe(resolve, line, None)
+
+    _open_prompt = prompt
+    threading.Thread(target=read, name="console-input", daemon=True).start()
+    try:
+        return await future
+    finally:
+        _open_prompt = None
+
+async def confirm(prompt: str) -> bool:
+    """Ask a y/n question; anything but 'y' counts as no"""
+    return (await ainput(prompt)).strip().lower() == "y"
+
+def notify(message: str) -> None:
+    """Print a message from background work without losing track of an open prompt"""
+    if _open_prompt is None:
+        print(message)
+    else:
+        print(f"\n{message}")
+        print(_open_prompt.lstrip("\n"), end="", flush=True)
@@ -0,0 +1,217 @@
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, TextIO
+
+from api_manager import APIManager
+
+# Exception types raised for rate-limited LLM calls (Google, OpenAI-style and HTTP clients)
+RATE_LIMIT_EXCEPTIONS = ("ResourceExhausted", "RateLimitError", "TooManyRequests")
+
+# Requests per minute each key is throttled to when several keys share the load
+DEFAULT_KEY_RPM = 10
+
+# Rate-limit wording in an error message, matched as whole phrases; browser_use reports
+# openai-style limits as "Rate limit reached. Waiting before retry."
+RATE_LIMIT_PATTERN = re.compile(r"\b(?:resource[ _]exhausted|too many requests|rate limit reached)\b", re.IGNORECASE)
+
+# A bare 429 only counts as the status of a failed LLM call ("429 Resource has been
+# exhausted", "Error 429: LLM API call failed ..."), never as a number in action errors
+LLM_429_PATTERN = re.compile(r"^(?:error )?429\b|\bLLM API call failed\b.*\b429\b", re.IGNORECASE | re.DOTALL)
+
+def is_rate_limit_error(error) -> bool:
+    """Check whether an LLM exception or an agent step's error message is a 429/quota failure
+
+    Only the LLM call's own failure counts: an action error that merely mentions 429 or
+    "quota" (an element index, page text) doesn't.
+    """
+    if error is None:
+        return False
+    if isinstance(error, BaseException):
+        while error is not None:
+            if type(error).__name__ in RATE_LIMIT_EXCEPTIONS or \
+                    429 in (getattr(error, "code", None), getattr(error, "status_code", None)):
+                return True
+            if RATE_LIMIT_PATTERN.search(str(error)) or LLM_429_PATTERN.search(str(error)):
+                return True
+            error = error.__cause__
+        return False
+    text = str(error).strip()
+    return bool(RATE_LIMIT_PATTERN.search(text) or LLM_429_PATTERN.search(text))
+
+class TokenBucket:
+    """Classic token bucket: `rate_per_minute` tokens refilled continuously, capped at `burst`"""
+
+    def __init__(self, rate_per_minute: float, burst: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst if burst is not None else max(1.0, rate_per_minute / 4))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if now <= self.updated:
+            return  # refill is paused while a key is benched
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def headroom(self, now: Optional[float] = None) -> float:
+        """Tokens currently available"""
+        self._refill(now if now is not None else time.monotonic())
+        return self.tokens
+
+    def take(self, now: Optional[float] = None) -> bool:
+        """Consume one token if available"""
+        self._refill(now if now is not None else time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def seconds_until_token(self) -> float:
+        """How long until one token is available"""
+        missing = 1 - self.headroom()
+        return 0.0 if missing <= 0 else missing / self.rate
+
+class KeyScheduler:
+    """Hands out the API key with the most rate-limit headroom and benches throttled keys
+
+    With throttle_single_key off, a lone key isn't held to requests_per_minute:
+    there is no other key to spread the load to, so only a 429 benches it.
+    """
+
+    def __init__(self, keys: List[str], requests_per_minute: float = DEFAULT_KEY_RPM, burst: Optional[float] = None,
+                 cooldown: float = 60, throttle_single_key: bool = True):
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self.cooldown = cooldown
+        self.throttle_single_key = throttle_single_key
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.benched_until: Dict[str, float] = {}
+        self.counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self.sync_keys(keys)
+
+    def sync_keys(self, keys: List[str]) -> None:
+        """Track a new key list, keeping bucket state for keys that are still present"""
+        with self._lock:
+            for key in keys:
+                if key not in self.buckets:
+                    self.buckets[key] = TokenBucket(self.requests_per_minute, self.burst)
+                    self.counters[key] = {"requests": 0, "rate_limited": 0}
+            for key in list(self.buckets):
+                if key not in keys:
+                    del self.buckets[key]
+                    self.benched_until.pop(key, None)
+                    self.counters.pop(key, None)
+
+    @property
+    def keys(self) -> List[str]:
+        return list(self.buckets)
+
+    @property
+    def throttled(self) -> bool:
+        """Whether keys are held to their token buckets (not just benched on 429s)"""
+        return self.throttle_single_key or len(self.buckets) > 1
+
+    def _available(self, now: float) -> List[str]:
+        return [key for key in self.buckets if self.benched_until.get(key, 0) <= now]
+
+    def try_acquire(self) -> Optional[str]:
+        """Take a token from the key with the most headroom, None if every key is exhausted"""
+        with self._lock:
+            now = time.monotonic()
+            candidates = self._available(now)
+            candidates.sort(key=lambda key: self.buckets[key].headroom(now), reverse=True)
+            for key in candidates:
+                if not self.throttled or self.buckets[key].take(now):
+                    self.counters[key]["requests"] += 1
+                    return key
+            return None
+
+    def _wait_time(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            waits = [self.buckets[key].seconds_until_token() for key in self._available(now)]
+            waits += [until - now for until in self.benched_until.values() if until > now]
+            return max(0.05, min(waits) if waits else 1.0)
+
+    async def acquire(self, timeout: Optional[float] = None) -> str:
+        """Wait until some key has headroom and return it"""
+        if not self.buckets:
+            raise RuntimeError("No API keys configured for rotation")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            key = self.try_acquire()
+            if key:
+                return key
+            delay = self._wait_time()
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("Timed out waiting for an API key with free quota")
+                delay = min(delay, remaining)
+            await asyncio.sleep(delay)
+
+    def report_rate_limited(self, key: str, cooldown: Optional[float] = None) -> None:
+        """Bench a key that returned 429/quota errors for the cooldown period"""
+        with self._lock:
+            if key not in self.buckets:
+                return
+            until = time.monotonic() + (cooldown if cooldown is not None else self.cooldown)
+            self.benched_until[key] = until
+            # Start the key from an empty bucket once its cooldown ends
+            self.buckets[key].tokens = 0
+            self.buckets[key].updated = until
+            self.counters[key]["rate_limited"] += 1
+        print(f"⏳ API key {mask_key(key)} rate limited, benched for {cooldown or self.cooldown:.0f}s")
+
+    def stats(self) -> List[Dict[str, object]]:
+        """Per-key headroom, bench state and counters (keys masked)"""
+        with self._lock:
+            now = time.monotonic()
+            return [
+                {
+                    "key": mask_key(key),
+                    "headroom": round(bucket.headroom(now), 2) if self.throttled else None,
+                    "benched_for": round(max(0.0, self.benched_until.get(key, 0) - now), 1),
+                    **self.counters[key],
+                }
+                for key, bucket in self.buckets.items()
+            ]
+
+def mask_key(key: str) -> str:
+    """Printable form of a key, as shown in the API key menu"""
+    return f"{key[:10]}...{key[-4:]}" if len(key) > 14 else "***"
+
+_scheduler: Optional[KeyScheduler] = None
+
+def get_key_scheduler() -> KeyScheduler:
+    """Process-wide scheduler, resynced with APIManager whenever the key list changes"""
+    global _scheduler
+    keys = APIManager.get_keys("1")
+    if _scheduler is None:
+        rpm = os.getenv("GOOGLE_KEY_RPM")
+        _scheduler = KeyScheduler(
+            keys,
+            requests_per_minute=float(rpm) if rpm else DEFAULT_KEY_RPM,
+            cooldown=float(os.getenv("GOOGLE_KEY_COOLDOWN", "60")),
+            # An explicit limit applies even to a single key; by default only rotation is paced
+            throttle_single_key=bool(rpm),
+        )
+    elif keys != _scheduler.keys:
+        _scheduler.sync_keys(keys)
+    return _scheduler
+
+def report_key_usage(file: TextIO = sys.stderr) -> None:
+    """Print each API key's requests and rate limits in this process (batch summary)"""
+    if _scheduler is None:
+        return
+    used = [entry for entry in _scheduler.stats() if entry["requests"] or entry["rate_limited"]]
+    if not used:
+        return
+    print("🔑 API keys:", file=file)
+    for entry in used:
+        print(f"   {entry['key']}  {entry['requests']} request(s), {entry['rate_limited']} rate limited", file=file)
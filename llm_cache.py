@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, TextIO
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+CACHE_MODES = ("off", "on", "replay")
+
+# Parts of the prompt that change between otherwise identical runs
+_TIMESTAMP_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?")
+_IMAGE_PATTERN = re.compile(r"data:image/[a-z]+;base64,[A-Za-z0-9+/=]+")
+
+class LLMCacheMiss(RuntimeError):
+    """Raised in replay mode when a prompt has no cached response"""
+
+def normalize_prompt(prompt: str, ignore_images: bool = True) -> str:
+    """Strip timestamps (and optionally screenshots) so repeated runs hash to the same key"""
+    prompt = _TIMESTAMP_PATTERN.sub("<timestamp>", prompt)
+    if ignore_images:
+        prompt = _IMAGE_PATTERN.sub("<image>", prompt)
+    return prompt
+
+class DiskLLMCache(BaseCache):
+    """LangChain cache that stores LLM responses in SQLite with size-bounded LRU eviction"""
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, replay: bool = False,
+                 ignore_images: bool = True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.replay = replay
+        self.ignore_images = ignore_images
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, model TEXT, value TEXT, size INTEGER, last_access REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses(last_access)")
+        self._conn.commit()
+
+    def make_key(self, prompt: str, llm_string: str) -> str:
+        """Hash of the model configuration plus the normalized prompt"""
+        digest = hashlib.sha256()
+        digest.update(llm_string.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(normalize_prompt(prompt, self.ignore_images).encode("utf-8"))
+        return digest.hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = self.make_key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row:
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+                self.hits += 1
+            else:
+                self.misses += 1
+        if row:
+            return [loads(item) for item in json.loads(row[0])]
+        if self.replay:
+            raise LLMCacheMiss(f"No cached LLM response for prompt {key[:12]} (replay mode)")
+        return None
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        if self.replay:
+            return
+        key = self.make_key(prompt, llm_string)
+        value = json.dumps([dumps(generation) for generation in return_val])
+        model = _model_from_llm_string(llm_string)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, value, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, model, value, len(value), time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC").fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and on-disk size"""
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size,
+                "mode": "replay" if self.replay else "on"}
+
+def _model_from_llm_string(llm_string: str) -> str:
+    """Best-effort model name from LangChain's llm_string, for inspecting the cache"""
+    match = re.search(r"'model(?:_name)?': '([^']+)'|\"model(?:_name)?\": \"([^\"]+)\"", llm_string)
+    return (match.group(1) or match.group(2)) if match else ""
+
+_llm_cache: Optional[DiskLLMCache] = None
+
+def configure_llm_cache(mode: Optional[str] = None, path: Optional[str] = None,
+                        max_mb: Optional[float] = None) -> Optional[DiskLLMCache]:
+    """Set up the process-wide response cache; mode is off, on or replay (defaults from LLM_CACHE*)"""
+    global _llm_cache
+    mode = (mode or os.getenv("LLM_CACHE", "off")).lower()
+    if mode not in CACHE_MODES:
+        raise ValueError(f"Invalid LLM cache mode: {mode}. Use one of: {', '.join(CACHE_MODES)}")
+    if mode == "off":
+        _llm_cache = None
+        return None
+
+    path = path or os.getenv("LLM_CACHE_PATH") or str(Path.home() / ".browser_use" / "llm_cache.sqlite")
+    max_mb = max_mb if max_mb is not None else float(os.getenv("LLM_CACHE_MAX_MB", "256"))
+    _llm_cache = DiskLLMCache(path, max_bytes=int(max_mb * 1024 * 1024), replay=(mode == "replay"))
+    return _llm_cache
+
+def get_llm_cache() -> Optional[DiskLLMCache]:
+    """The configured response cache, or None when caching is off"""
+    return _llm_cache
+
+def report_llm_cache(file: TextIO = sys.stderr) -> None:
+    """Print the cache's hit rate and size (batch summary); nothing when caching is off"""
+    if _llm_cache is None:
+        return
+    stats = _llm_cache.stats()
+    lookups = stats["hits"] + stats["misses"]
+    rate = f" ({100 * stats['hits'] / lookups:.0f}%)" if lookups else ""
+    print(f"💾 LLM cache ({stats['mode']}): {stats['hits']} hit(s), {stats['misses']} miss(es){rate}, "
+          f"{stats['entries']} entries, {stats['bytes'] / 1024 / 1024:.1f} MB", file=file)
@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from api_manager import APIManager
+from key_scheduler import is_rate_limit_error
+from llm_cache import DiskLLMCache, get_llm_cache
+from metrics import current_task_metrics, record_span, registry
+
+class MetricsCallbackHandler(AsyncCallbackHandler):
+    """LangChain callback that times every LLM call and counts its tokens"""
+
+    def __init__(self):
+        self._started: Dict[Any, float] = {}
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    async def on_llm_start(self, serialized, prompts, *, run_id, **kwargs) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    async def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        started = self._started.pop(run_id, None)
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+        registry.count_tokens(input_tokens, output_tokens)
+        metrics = current_task_metrics()
+        if metrics is not None:
+            metrics.llm_calls += 1
+            metrics.input_tokens += input_tokens
+            metrics.output_tokens += output_tokens
+        if started is not None:
+            record_span("llm_call", time.time() - (time.perf_counter() - started),
+                        time.perf_counter() - started, input_tokens=input_tokens, output_tokens=output_tokens)
+
+    async def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        started = self._started.pop(run_id, None)
+        kind = f"llm_{type(error).__name__}"
+        registry.count_error(kind)
+        metrics = current_task_metrics()
+        if metrics is not None:
+            metrics.count_error(kind)
+        if started is not None:
+            # The agent often reports LLM failures without their cause ("LLM API call failed"),
+            # so the span is where a rate limit is reliably visible
+            record_span("llm_call", time.time() - (time.perf_counter() - started),
+                        time.perf_counter() - started, error=type(error).__name__,
+                        **({"rate_limited": True} if is_rate_limit_error(error) else {}))
+
+metrics_callback = MetricsCallbackHandler()
+
+class LLMClientCache:
+    """Process-wide cache of chat model clients keyed by (model, api key)
+
+    Reusing one client per key keeps its HTTP/gRPC channel open between tasks,
+    so only the first request on a key pays the connection and TLS setup.
+    """
+
+    MAX_CLIENTS = 32
+
+    _clients: "OrderedDict[Tuple[str, str, Optional[DiskLLMCache]], ChatGoogleGenerativeAI]" = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, api_key: str, model: Optional[str] = None, use_cache: bool = True) -> ChatGoogleGenerativeAI:
+        """Return the cached client for (model, api_key), creating it on first use
+
+        With use_cache=False the client bypasses the LLM response cache (used for key tests).
+        """
+        model = model or APIManager.MODELS["1"]["model"]
+        response_cache = get_llm_cache() if use_cache else None
+        cache_key = (model, api_key, response_cache)
+        with cls._lock:
+            client = cls._clients.get(cache_key)
+            if client is not None:
+                cls._clients.move_to_end(cache_key)
+                return client
+
+            client = ChatGoogleGenerativeAI(
+                model=model,
+                google_api_key=api_key,
+                cache=response_cache or False,
+                callbacks=[metrics_callback],
+            )
+            cls._clients[cache_key] = client
+            while len(cls._clients) > cls.MAX_CLIENTS:
+                cls._clients.popitem(last=False)
+            return client
+
+    @classmethod
+    def invalidate(cls, api_key: Optional[str] = None, model: Optional[str] = None) -> None:
+        """Drop cached clients for a key and/or model (all clients if neither is given)"""
+        with cls._lock:
+            for cache_key in list(cls._clients):
+                cached_model, cached_key, _ = cache_key
+                if (api_key is None or cached_key == api_key) and (model is None or cached_model == model):
+                    del cls._clients[cache_key]
@@ -1,73 +1,606 @@
+import argparse
 import asyncio
+import contextlib
 import os
-import signal
 import sys
-from browser_use import Agent, Browser
-from langchain_google_genai import ChatGoogleGenerativeAI
+import time
+from contextlib import asynccontextmanager
 from api_manager import APIManager
+from browser_recycler import chromium_pids, configure_recycling, get_recycle_policy, probe_context, process_tree_rss_mb
+from concurrency_controller import configure_adaptive_concurrency, get_adaptive_concurrency
+from config import env_flag
+from console import ainput, confirm, notify
+from key_scheduler import get_key_scheduler, is_rate_limit_error
+from metrics import configure_metrics, record_span, span, task_metrics
+from model_router import configure_model_router, get_model_router, step_confidence
+from prompt_budget import apply_prompt_budget
+from resource_blocker import RESOURCE_TYPES, configure_resource_blocking, get_block_policy
+from startup import print_startup_report, start_preload
+from step_events import build_step_event, describe_step, emit_step_event
+from task_control import (RunControl, TaskTimeout, configure_task_budget, get_task_budget, install_signal_handlers,
+                          reinstall_signal_handlers, stop_running_tasks)
+from storage_profiles import (apply_storage_state, configure_isolation, configure_storage_profiles, get_isolation,
+                              get_profile_store)
+from trace_store import TraceStore, configure_trace_store, get_trace_store, replay_record, replay_trace
+from vision import ScreenshotControl, configure_vision, get_vision
+
+# browser_use, langchain_google_genai (via llm_clients) and llm_cache take seconds to
+# import, so they are imported where first used; start_preload() warms them up early.
 
 class BrowserManager:
     """Manages persistent browser sessions"""
-    
-    def __init__(self):
+
+    def __init__(self, pool_min=0, pool_max=1, idle_timeout=300, recycle=None, isolate=None, seed_state=None):
         self.browser_instance = None
         self.browser_context = None
         self.is_browser_ready = False
+
+        # Pool mode (pool_max > 1): tasks check out their own context in the shared browser
+        self.pool_min = max(0, pool_min)
+        self.pool_max = max(1, pool_max, self.pool_min)
+        self.idle_timeout = idle_timeout
+        self._pool_size = 0  # idle + checked out + being created
+        self._idle_sessions = []  # (session, last_used) pairs, most recently used last
+        self._busy_sessions = set()
+        self._pool_condition = asyncio.Condition()
+        self._reaper_task = None
+        self._init_lock = asyncio.Lock()
+        self._session_lock = asyncio.Lock()
+
+        # Opt-in pre-warm: launch the browser before the first task asks for it
+        self.quiet = False  # suppress launch/cleanup messages (used while the menu is showing)
+        self._prewarm_task = None
+        self._prewarm_claimed = False
+
+        # Automatic recycling in pool mode (see RecyclePolicy); None follows configure_recycling()
+        self._recycle = recycle
+        self._session_owner = {}  # pooled session -> shared browser it was created in
+        self._session_tasks = {}  # pooled session -> tasks it has run
+        self._browser_pids = {}  # id(shared browser) -> Chromium PID, for the RSS check
+        self._draining = {}  # replaced browser -> its sessions still running a task
+        self._standby_task = None  # launch of the spare browser
+        self._recycle_task = None
+        self.recycle_counts = {}  # reason -> number of recycles
+        self._single_tasks = 0  # tasks the single-context browser has run since its launch
+
+        # Isolation: every task gets a fresh context in the shared browser, closed afterwards
+        self._isolate = isolate
+        self._seed_state = seed_state  # storage state every new context starts with
+        self._fresh_browser = None  # incognito browser for fresh contexts in single-context mode
+
+    @property
+    def isolate(self):
+        """Whether each task runs in a fresh context that is closed afterwards"""
+        # Unset managers follow the process-wide --isolate default, see storage_profiles.configure_isolation
+        return self._isolate if self._isolate is not None else get_isolation().isolate
+
+    @property
+    def seed_state(self):
+        return self._seed_state if self._seed_state is not None else get_isolation().seed_state
+
+    @property
+    def pool_enabled(self):
+        """Whether tasks get their own pooled context instead of the shared one
+
+        Asking for warm contexts (pool_min > 0) means pool mode even with one slot,
+        so a one-worker service still keeps its browser and context warm.
+        """
+        return self.pool_max > 1 or self.pool_min > 0 or self.isolate
+
+    @property
+    def recycle_policy(self):
+        """Recycling settings for this manager"""
+        return self._recycle if self._recycle is not None else get_recycle_policy()
+
+    @property
+    def prewarming(self):
+        """Whether a background pre-warm launch or its idle timer is pending"""
+        return self._prewarm_task is not None
+
+    def _log(self, message):
+        if not self.quiet:
+            print(message)
     
+    def _new_browser(self):
+        """Browser session with this app's launch settings (not started yet)"""
+        from browser_use import Browser
+
+        # Create browser - force headless mode since no GUI available
+        browser = Browser()
+        # Set headless to True since no display is available
+        browser.browser_profile.headless = True
+        # Disable sandbox for root user (common in containers/servers)
+        browser.browser_profile.chromium_sandbox = False
+
+        # Add Chrome arguments for running as root and better compatibility
+        if not browser.browser_profile.args:
+            browser.browser_profile.args = []
+        browser.browser_profile.args.extend([
+            '--no-sandbox',
+            '--disable-dev-shm-usage',
+            '--disable-gpu-sandbox',
+            '--disable-software-rasterizer'
+        ])
+        return browser
+
     async def initialize_browser(self):
         """Initialize browser if not already done"""
         if not self.browser_instance:
-            print("🌐 Initializing browser...")
+            self._log("🌐 Initializing browser...")
             try:
-                # Create browser - force headless mode since no GUI available
-                self.browser_instance = Browser()
-                # Set headless to True since no display is available
-                self.browser_instance.browser_profile.headless = True
-                # Disable sandbox for root user (common in containers/servers)
-                self.browser_instance.browser_profile.chromium_sandbox = False
-
-                # Add Chrome arguments for running as root and better compatibility
-                if not self.browser_instance.browser_profile.args:
-                    self.browser_instance.browser_profile.args = []
-                self.browser_instance.browser_profile.args.extend([
-                    '--no-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-gpu-sandbox',
-                    '--disable-software-rasterizer'
-                ])
+                self.browser_instance = self._new_browser()
 
                 # Also ensure we have a proper display
                 if os.getenv('DISPLAY'):
-                    print(f"📺 Display detected: {os.getenv('DISPLAY')}")
+                    self._log(f"📺 Display detected: {os.getenv('DISPLAY')}")
                 else:
-                    print("⚠️ No DISPLAY environment variable found - browser may not be visible")
+                    self._log("⚠️ No DISPLAY environment variable found - browser may not be visible")
 
+                if self.pool_enabled:
+                    await self._start_pool()
+                else:
+                    if self.recycle_policy.standby:
+                        # Its persistent user_data_dir can only be open in one Chromium at a time
+                        self._log("⚠️ --standby-browser only applies to pooled browsers, ignoring it")
+                    await self._launch_single_browser()
                 self.browser_context = await self.browser_instance.new_context()
                 self.is_browser_ready = True
-                print("✅ Browser initialized successfully")
-                print("🌐 Browser window should now be visible on your screen")
+                self._log("✅ Browser initialized successfully")
+                self._log("🌐 Browser window should now be visible on your screen")
             except Exception as e:
-                print(f"❌ Failed to initialize browser: {str(e)}")
+                self._log(f"❌ Failed to initialize browser: {str(e)}")
                 self.is_browser_ready = False
+                await self._discard_failed_launch()
                 raise
         else:
-            print("🌐 Using existing browser session...")
+            self._log("🌐 Using existing browser session...")
+
+    async def _discard_failed_launch(self):
+        """Kill whatever a failed initialize_browser started, so the next call launches from scratch"""
+        browser, self.browser_instance, self.browser_context = self.browser_instance, None, None
+        for session, _ in self._idle_sessions:
+            await self._close_pooled_session(session)
+        self._idle_sessions = []
+        self._pool_size = 0
+        if browser is not None:
+            await self._kill_shared_browser(browser)
+
+    async def _launch_single_browser(self):
+        """Start the browser that single-context mode hands to every task
+
+        Agent works on a copy of the session it is given. Started here with keep_alive,
+        every copy reuses this Chromium; left unstarted, each agent would launch its
+        own and kill it again when it finishes.
+        """
+        self.browser_instance.browser_profile.keep_alive = True
+        self._single_tasks = 0
+        await self._start_browser(self.browser_instance)
+
+    async def _launch_shared_browser(self, browser):
+        """Start a browser that pooled contexts are created in"""
+        profile = browser.browser_profile
+        # Pooled contexts are created inside one launched browser, which needs an
+        # incognito launch (no persistent user_data_dir) and must outlive each agent
+        profile.user_data_dir = None
+        profile.keep_alive = True
+        await self._start_browser(browser)
+        return browser
+
+    async def _start_browser(self, browser):
+        """Launch Chromium, noting its PID when the RSS limit needs it"""
+        launched_before = chromium_pids() if self.recycle_policy.max_rss_mb else set()
+        # Only the Chromium start; warm contexts are timed separately as context_create
+        with span("browser_launch"):
+            await browser.start()
+        if self.recycle_policy.max_rss_mb:
+            launched = chromium_pids() - launched_before
+            if launched:
+                self._browser_pids[id(browser)] = min(launched)
+
+    async def _start_pool(self):
+        """Launch the shared browser and pre-warm pool_min contexts"""
+        await self._launch_shared_browser(self.browser_instance)
+
+        for _ in range(self.pool_min):
+            self._pool_size += 1
+            try:
+                session = await self._create_pooled_session()
+            except Exception:
+                self._pool_size -= 1
+                raise
+            self._idle_sessions.append((session, time.monotonic()))
+
+        if self.idle_timeout and not self._reaper_task:
+            self._reaper_task = asyncio.create_task(self._reap_idle_sessions())
+        if self.recycle_policy.standby:
+            self._start_standby()
+        self._log(f"🏊 Browser pool ready: {len(self._idle_sessions)} warm context(s), up to {self.pool_max}")
+
+    async def _create_pooled_session(self, owner=None):
+        """Create a new context in the shared browser (or `owner`) and wrap it in a session"""
+        owner = owner or self.browser_instance
+        playwright_browser = owner.browser
+        profile = owner.browser_profile
+        from browser_use import Browser
+
+        context_kwargs = profile.kwargs_for_new_context().model_dump(mode='json')
+        if self.seed_state:
+            context_kwargs["storage_state"] = self.seed_state
+        with span("context_create"):
+            context = await playwright_browser.new_context(**context_kwargs)
+            session = Browser(browser_profile=profile, browser=playwright_browser, browser_context=context)
+            await session.start()
+        self._session_owner[session] = owner
+        return session
+
+    async def _close_pooled_session(self, session):
+        """Close a pooled context without touching the shared browser"""
+        self._session_owner.pop(session, None)
+        self._session_tasks.pop(session, None)
+        try:
+            if session.browser_context:
+                await session.browser_context.close()
+        except Exception as e:
+            print(f"⚠️ Warning while closing pooled context: {str(e)}")
+
+    async def _reap_idle_sessions(self):
+        """Close contexts that stayed idle longer than idle_timeout, down to pool_min"""
+        while True:
+            await asyncio.sleep(min(self.idle_timeout, 30))
+            now = time.monotonic()
+            expired = []
+            async with self._pool_condition:
+                kept = []
+                for session, last_used in self._idle_sessions:
+                    if now - last_used > self.idle_timeout and self._pool_size - len(expired) > self.pool_min:
+                        expired.append(session)
+                    else:
+                        kept.append((session, last_used))
+                self._idle_sessions = kept
+                self._pool_size -= len(expired)
+            for session in expired:
+                await self._close_pooled_session(session)
+            if expired:
+                print(f"🧹 Closed {len(expired)} idle browser context(s)")
+
+    async def ensure_browser(self):
+        """Initialize the browser unless it is ready, waiting for a launch already in progress"""
+        if not self.is_browser_ready:
+            async with self._init_lock:
+                if not self.is_browser_ready:
+                    await self.initialize_browser()
+
+    def start_prewarm(self, idle_timeout=300):
+        """Launch the browser in the background so the first task finds it ready
+
+        If no task uses it within idle_timeout seconds, it is shut down again.
+        """
+        if self._prewarm_task is None and not self.is_browser_ready:
+            self._prewarm_claimed = False
+            self._prewarm_task = asyncio.create_task(self._prewarm(idle_timeout))
+
+    async def _prewarm(self, idle_timeout):
+        """Background part of start_prewarm"""
+        try:
+            self.quiet = True
+            try:
+                await self.ensure_browser()
+            except Exception as e:
+                notify(f"⚠️ Browser pre-warm failed, it will be started with the first task: {e}")
+                return
+            finally:
+                self.quiet = False
+
+            await asyncio.sleep(idle_timeout)
+            async with self._init_lock:
+                if not self._prewarm_claimed and self.is_browser_ready:
+                    notify(f"💤 Pre-warmed browser unused for {idle_timeout}s, shutting it down")
+                    self.quiet = True
+                    try:
+                        await self.cleanup()
+                    finally:
+                        self.quiet = False
+        finally:
+            if self._prewarm_task is asyncio.current_task():
+                self._prewarm_task = None
+
+    async def acquire_session(self, fresh=False):
+        """Check out a browser session for one task (waits if the pool is exhausted)
+
+        With fresh, the task gets a new context that holds no cookies or storage from
+        earlier tasks; release it with discard=True.
+        """
+        self._prewarm_claimed = True
+        await self.ensure_browser()
+
+        if not self.pool_enabled:
+            # A single shared context only runs one task at a time
+            await self._session_lock.acquire()
+            try:
+                if not self.browser_instance.is_connected():
+                    # Chromium died between tasks; start() launches a new one
+                    await self._start_browser(self.browser_instance)
+                elif self.recycle_policy.enabled and not await probe_context(self.browser_instance.browser_context,
+                                                                             self.recycle_policy.probe_timeout):
+                    await self._replace_single_browser("probe")
+                if fresh:
+                    return await self._create_fresh_session()
+            except BaseException:
+                self._session_lock.release()
+                raise
+            return self.browser_instance
+
+        while True:
+            stale = None
+            async with self._pool_condition:
+                while True:
+                    if self._idle_sessions and not fresh:
+                        session, _ = self._idle_sessions.pop()
+                        self._busy_sessions.add(session)
+                        break
+                    if self._pool_size < self.pool_max:
+                        self._pool_size += 1
+                        session = None
+                        break
+                    if fresh and self._idle_sessions:
+                        # Hand the slot of the least recently used idle context to the new one
+                        stale, _ = self._idle_sessions.pop(0)
+                        session = None
+                        break
+                    await self._pool_condition.wait()
+
+            if stale is not None:
+                await self._close_pooled_session(stale)
+            if session is None:
+                break
+            if not self.recycle_policy.enabled or await probe_context(session.browser_context,
+                                                                      self.recycle_policy.probe_timeout):
+                return session
+
+            # The context (or the whole browser) died while idle: replace it and try again
+            self._count_recycle("probe")
+            await self.release_session(session, discard=True)
+            if not self.browser_instance.browser or not self.browser_instance.browser.is_connected():
+                await self.recycle_browser("probe")
+
+        try:
+            session = await self._create_pooled_session()
+        except Exception:
+            async with self._pool_condition:
+                self._pool_size -= 1
+                self._pool_condition.notify()
+            raise
+        async with self._pool_condition:
+            self._busy_sessions.add(session)
+        return session
+
+    async def _create_fresh_session(self):
+        """New context for a single-context task that must not share the shared context's cookies
+
+        The shared browser runs on a persistent user_data_dir, which has room for one
+        context only, so these contexts live in an incognito browser launched on first use.
+        """
+        browser = self._fresh_browser
+        if browser is None or not browser.browser or not browser.browser.is_connected():
+            if browser is not None:
+                await self._kill_shared_browser(browser)
+                self._fresh_browser = None
+            self._fresh_browser = await self._launch_shared_browser(self._new_browser())
+        return await self._create_pooled_session(self._fresh_browser)
+
+    async def release_session(self, session, discard=False):
+        """Return a checked-out session; discarded sessions are closed instead of reused"""
+        if not self.pool_enabled:
+            try:
+                if session is not self.browser_instance:
+                    # A fresh context from _create_fresh_session, only ever used once
+                    await self._close_pooled_session(session)
+                else:
+                    await self._check_single_browser()
+            finally:
+                self._session_lock.release()
+            return
+
+        policy = self.recycle_policy
+        tasks = self._session_tasks.get(session, 0) + 1
+        if policy.max_tasks and tasks >= policy.max_tasks and not discard:
+            self._count_recycle("tasks")
+            discard = True
+
+        drained_browser = None
+        async with self._pool_condition:
+            self._busy_sessions.discard(session)
+            owner = self._session_owner.get(session)
+            if discard or not self.is_browser_ready or owner is not self.browser_instance:
+                self._pool_size -= 1
+                discard = True
+            else:
+                self._session_tasks[session] = tasks
+                self._idle_sessions.append((session, time.monotonic()))
+            if owner in self._draining:
+                self._draining[owner].discard(session)
+                if not self._draining[owner]:
+                    del self._draining[owner]
+                    drained_browser = owner
+            self._pool_condition.notify()
+        if discard:
+            await self._close_pooled_session(session)
+        if drained_browser is not None:
+            await self._kill_shared_browser(drained_browser)
+
+        if policy.max_rss_mb and self._recycle_task is None and self.is_browser_ready:
+            pid = self._browser_pids.get(id(self.browser_instance))
+            rss_mb = process_tree_rss_mb(pid) if pid else 0.0
+            if rss_mb > policy.max_rss_mb:
+                print(f"♻️ Browser uses {rss_mb:.0f} MB (limit {policy.max_rss_mb:.0f} MB), recycling it")
+                self._recycle_task = asyncio.create_task(self._recycle_browser("rss"))
+
+    async def _check_single_browser(self):
+        """Relaunch the single-context browser once it ran max_tasks tasks or outgrew max_rss_mb"""
+        policy = self.recycle_policy
+        self._single_tasks += 1
+        if policy.max_tasks and self._single_tasks >= policy.max_tasks:
+            await self._replace_single_browser("tasks")
+        elif policy.max_rss_mb:
+            pid = self._browser_pids.get(id(self.browser_instance))
+            rss_mb = process_tree_rss_mb(pid) if pid else 0.0
+            if rss_mb > policy.max_rss_mb:
+                print(f"♻️ Browser uses {rss_mb:.0f} MB (limit {policy.max_rss_mb:.0f} MB), recycling it")
+                await self._replace_single_browser("rss")
+
+    async def _replace_single_browser(self, reason):
+        """Kill the single-context browser and launch a new one (the caller holds _session_lock)
+
+        Its cookies are kept: they live in the persistent user_data_dir, not in Chromium.
+        """
+        self._count_recycle(reason)
+        started = time.perf_counter()
+        await self._kill_shared_browser(self.browser_instance)
+        self.browser_instance = self.browser_context = self._new_browser()
+        try:
+            await self._launch_single_browser()
+        except Exception as e:
+            # The next acquire_session sees it disconnected and tries to start it again
+            print(f"❌ Failed to recycle browser: {str(e)}")
+            return
+        self.browser_context = await self.browser_instance.new_context()
+        print(f"♻️ Browser recycled ({reason}) in {time.perf_counter() - started:.2f}s")
+
+    def _count_recycle(self, reason):
+        self.recycle_counts[reason] = self.recycle_counts.get(reason, 0) + 1
+
+    def _start_standby(self):
+        """Launch a spare shared browser in the background"""
+        if self._standby_task is None:
+            self._standby_task = asyncio.create_task(self._launch_shared_browser(self._new_browser()))
+
+    async def _take_standby(self):
+        """The spare browser if one was launched, otherwise a freshly launched one"""
+        standby, self._standby_task = self._standby_task, None
+        if standby is not None:
+            try:
+                return await standby
+            except Exception as e:
+                print(f"⚠️ Standby browser failed to start ({e}), launching a new one")
+        return await self._launch_shared_browser(self._new_browser())
+
+    async def _kill_shared_browser(self, browser):
+        self._browser_pids.pop(id(browser), None)
+        try:
+            await browser.kill()
+        except Exception as e:
+            self._log(f"⚠️ Warning while closing browser: {str(e)}")
+
+    async def recycle_browser(self, reason="manual"):
+        """Swap in a new shared browser (the standby if there is one); concurrent calls share one swap"""
+        if not self.pool_enabled:
+            await self.reset_browser()
+            return
+        if self._recycle_task is None:
+            self._recycle_task = asyncio.create_task(self._recycle_browser(reason))
+        await asyncio.shield(self._recycle_task)
+
+    async def _recycle_browser(self, reason):
+        """Idle contexts of the old browser are closed right away; contexts still running a
+        task finish first, and the old browser is killed when the last one is released.
+        """
+        try:
+            self._count_recycle(reason)
+            started = time.perf_counter()
+            replacement = await self._take_standby()
+            async with self._pool_condition:
+                old_browser = self.browser_instance
+                self.browser_instance = self.browser_context = replacement
+                stale = [session for session, _ in self._idle_sessions]
+                self._idle_sessions = []
+                self._pool_size -= len(stale)
+                running = {session for session in self._busy_sessions if self._session_owner.get(session) is old_browser}
+                if running:
+                    self._draining[old_browser] = running
+                self._pool_condition.notify_all()
+            for session in stale:
+                await self._close_pooled_session(session)
+            if not running:
+                await self._kill_shared_browser(old_browser)
+            print(f"♻️ Browser recycled ({reason}) in {time.perf_counter() - started:.2f}s, "
+                  f"{len(running)} running task(s) finish on the old one")
+            if self.recycle_policy.standby:
+                self._start_standby()
+        except Exception as e:
+            print(f"❌ Failed to recycle browser: {str(e)}")
+        finally:
+            self._recycle_task = None
+
+    @asynccontextmanager
+    async def lease(self, fresh=False):
+        """Context manager around acquire_session/release_session
+
+        With fresh, the task runs in a new context without earlier tasks' cookies or
+        storage. Fresh contexts (and every context in isolation mode) are closed
+        afterwards instead of reused.
+        """
+        session = await self.acquire_session(fresh=fresh)
+        discard = fresh or self.isolate
+        try:
+            yield session
+        except BaseException:
+            # A failed task may leave the context in a bad state, don't hand it out again
+            discard = True
+            raise
+        finally:
+            with span("cleanup"):
+                await self.release_session(session, discard=discard)
     
     async def cleanup(self):
         """Safely cleanup browser resources"""
         try:
-            if self.browser_context:
-                print("🧹 Closing browser context...")
-                await self.browser_context.close()
+            with span("browser_cleanup"):
+                if self._prewarm_task and self._prewarm_task is not asyncio.current_task():
+                    # Stop a launch still in progress; whatever it started is closed below
+                    prewarm_task, self._prewarm_task = self._prewarm_task, None
+                    prewarm_task.cancel()
+                    with contextlib.suppress(asyncio.CancelledError):
+                        await prewarm_task
+                if self._reaper_task:
+                    self._reaper_task.cancel()
+                    self._reaper_task = None
+                if self._recycle_task:
+                    recycle_task, self._recycle_task = self._recycle_task, None
+                    recycle_task.cancel()
+                    with contextlib.suppress(asyncio.CancelledError):
+                        await recycle_task
+                if self._standby_task:
+                    standby_task, self._standby_task = self._standby_task, None
+                    try:
+                        await self._kill_shared_browser(await standby_task)
+                    except Exception as e:
+                        self._log(f"⚠️ Warning while closing standby browser: {str(e)}")
+                for old_browser in list(self._draining):
+                    await self._kill_shared_browser(old_browser)
+                self._draining = {}
+                if self._fresh_browser:
+                    await self._kill_shared_browser(self._fresh_browser)
+                    self._fresh_browser = None
+                if self._idle_sessions or self._busy_sessions:
+                    self._log("🧹 Closing pooled browser contexts...")
+                    for session, _ in self._idle_sessions:
+                        await self._close_pooled_session(session)
+                    for session in list(self._busy_sessions):
+                        await self._close_pooled_session(session)
+                    self._idle_sessions = []
+                    self._busy_sessions = set()
+                    self._pool_size = 0
+                # new_context() hands back the session itself, so it goes with the browser below
                 self.browser_context = None
-            if self.browser_instance:
-                print("🧹 Closing browser...")
-                await self.browser_instance.close()
-                self.browser_instance = None
-            self.is_browser_ready = False
-            print("✅ Browser cleanup completed")
+                if self.browser_instance:
+                    self._log("🧹 Closing browser...")
+                    # Both modes launch with keep_alive=True, so close() would leave Chromium running
+                    await self._kill_shared_browser(self.browser_instance)
+                    self.browser_instance = None
+                self.is_browser_ready = False
+                self._log("✅ Browser cleanup completed")
         except Exception as e:
-            print(f"⚠️ Warning during browser cleanup: {str(e)}")
+            self._log(f"⚠️ Warning during browser cleanup: {str(e)}")
     
     async def reset_browser(self):
         """Reset browser session (close and reinitialize)"""
@@ -79,24 +612,26 @@ browser_manager = BrowserManager()
 
 async def test_api_key(api_key):
     """Test if the API key is valid"""
+    from llm_clients import LLMClientCache
+
     try:
-        llm = ChatGoogleGenerativeAI(
-            model=APIManager.MODELS["1"]['model'],
-            google_api_key=api_key
-        )
+        llm = LLMClientCache.get(api_key, use_cache=False)
         await llm.ainvoke(APIManager.MODELS["1"]['test_prompt'])
         return True
     except Exception as e:
         print(f"Error testing API key: {str(e)}")
+        LLMClientCache.invalidate(api_key)
         return False
 
 async def prompt_for_api_key():
     """Prompt user to add an API key"""
+    from llm_clients import LLMClientCache
+
     print("\nNo API key found. Please add your Google API key.")
     print("You can get one from: https://makersuite.google.com/app/apikey")
     
     while True:
-        api_key = input("\nEnter your Google API key: ").strip()
+        api_key = (await ainput("\nEnter your Google API key: ")).strip()
         if not api_key:
             print("API key cannot be empty.")
             continue
@@ -108,27 +643,29 @@ async def prompt_for_api_key():
             
         print("Testing API key...")
         try:
-            llm = ChatGoogleGenerativeAI(
-                model=APIManager.MODELS["1"]['model'],
-                google_api_key=api_key
-            )
+            previous_key = APIManager.get_key("1")
+            llm = LLMClientCache.get(api_key, use_cache=False)
             await llm.ainvoke("Test")
             
             # If test passes, save the key
             if APIManager.add_key("1", api_key):
+                if previous_key and previous_key != api_key:
+                    LLMClientCache.invalidate(previous_key)
                 print("✅ API key added successfully")
                 return True
             else:
                 print("❌ Failed to save API key")
                 return False
         except Exception as e:
+            LLMClientCache.invalidate(api_key)
             print(f"❌ API key test failed: {str(e)}")
-            retry = input("Would you like to try again? (y/n): ").strip().lower()
-            if retry != 'y':
+            if not await confirm("Would you like to try again? (y/n): "):
                 return False
 
 async def manage_api_keys():
     """Manage API keys"""
+    from llm_clients import LLMClientCache
+
     while True:
         print("\nAPI Key Management")
         print("==================")
@@ -139,13 +676,18 @@ async def manage_api_keys():
             print(f"Current Google API Key: {current_key[:10]}...{current_key[-4:]}")
         else:
             print("No Google API Key found")
+        extra_keys = [key for key in APIManager.get_keys("1") if key != current_key]
+        if extra_keys:
+            print(f"Extra keys for rotation: {len(extra_keys)}")
         
         print("\n1. Add/Update Google API Key")
         print("2. Test Current API Key")
         print("3. Remove API Key")
-        print("4. Back to Main Menu")
+        print("4. Add Extra Google API Key (rotation)")
+        print("5. Remove Extra API Keys")
+        print("6. Back to Main Menu")
         
-        choice = input("\nSelect an option (1-4): ").strip()
+        choice = (await ainput("\nSelect an option (1-6): ")).strip()
         
         if choice == "1":
             await prompt_for_api_key()
@@ -159,17 +701,278 @@ async def manage_api_keys():
             else:
                 print("No API key to test")
         elif choice == "3":
+            if current_key:
+                LLMClientCache.invalidate(current_key)
             if APIManager.remove_key("1"):
                 print("✅ API key removed successfully")
             else:
                 print("❌ Failed to remove API key")
         elif choice == "4":
+            extra_key = (await ainput("\nEnter the extra Google API key: ")).strip()
+            if not APIManager.validate_key_format(extra_key):
+                print("❌ Invalid API key format. Please check your key.")
+            elif not await test_api_key(extra_key):
+                print("❌ API key test failed")
+            elif APIManager.add_pool_key("1", extra_key):
+                print("✅ Extra API key added to rotation")
+            else:
+                print("❌ Failed to save API key")
+        elif choice == "5":
+            for key in extra_keys:
+                LLMClientCache.invalidate(key)
+            if APIManager.remove_pool_keys("1"):
+                print("✅ Extra API keys removed")
+            else:
+                print("❌ Failed to remove extra API keys")
+        elif choice == "6":
             break
         else:
             print("Invalid option. Please try again.")
 
-async def run_browser_task(task):
-    """Run a browser automation task with persistent browser session"""
+async def execute_task(task, manager=None, llm=None, profile=None, on_step=None, budget=None, vision=None):
+    """Run one task on a leased browser session and return its result record
+
+    Passing `llm` pins every step to that chat model (used by the benchmarks);
+    otherwise steps rotate across the configured Google API keys. `profile` names
+    a saved storage state (cookies + localStorage) loaded before and saved after
+    the task; it defaults to the --profile setting. `on_step` (sync or async) is
+    called with a step event (see step_events.build_step_event) as each step ends.
+    `budget` overrides fields of the default TaskBudget for this task; a task that
+    runs out of it stops at a step boundary and its record names the reason in `stopped`.
+    `vision` overrides fields of the default VisionSettings (screenshot mode, width, quality).
+    """
+    from browser_use import Agent
+    from llm_clients import LLMClientCache
+
+    manager = manager or browser_manager
+    profile_store = get_profile_store()
+    profile = profile or profile_store.default_profile
+    budget = get_task_budget().with_overrides(budget)
+    vision = get_vision().with_overrides(vision)
+    scheduler = None
+    current_key = None
+    # A pinned `llm` is used for every step; otherwise the router (if enabled) picks a model per step
+    router = get_model_router() if llm is None else None
+    route = router.route() if router else None
+    controller = get_adaptive_concurrency()
+
+    if llm is None:
+        api_key = APIManager.get_key("1")
+        if not api_key:
+            raise RuntimeError("No API key found. Please add one first.")
+
+        # Set environment variable for the memory system
+        os.environ['GOOGLE_API_KEY'] = api_key
+
+        # Each step runs on whichever key has the most rate-limit headroom; clients
+        # are cached so their connections stay warm across tasks and key switches
+        scheduler = get_key_scheduler()
+        current_key = scheduler.keys[0] if scheduler.keys else api_key
+        llm = LLMClientCache.get(current_key, model=route.next_model() if route else None)
+
+    with task_metrics(task) as metrics:
+        step_started = None  # (wall clock, perf counter) of the running step
+        step_baseline = None  # history length and token counters when the step started
+
+        async def on_step_start(agent):
+            nonlocal current_key, step_started, step_baseline
+            if scheduler:
+                current_key = await scheduler.acquire()
+                agent.llm = LLMClientCache.get(current_key, model=route.next_model() if route else None)
+            # Agent.run swaps in its own SIGINT/SIGTERM handlers; keep ours in charge
+            reinstall_signal_handlers()
+            apply_prompt_budget(agent, budget, metrics)
+            screenshots.before_step()
+            step_started = (time.time(), time.perf_counter())
+            step_baseline = (len(agent.state.history.history), len(metrics.spans), metrics.input_tokens,
+                             metrics.output_tokens, metrics.llm_calls)
+
+        async def on_step_end(agent):
+            nonlocal step_started
+            failed = False
+            for action_result in agent.state.last_result or []:
+                if action_result.error:
+                    failed = True
+                    metrics.count_error("step_error")
+            # Only a rate-limited LLM call counts, not action errors that happen to mention 429
+            step_spans = metrics.spans[step_baseline[1]:] if step_baseline else []
+            rate_limited = any(item.get("rate_limited") for item in step_spans if item["name"] == "llm_call") or \
+                any(is_rate_limit_error(result.error) for result in agent.state.last_result or [])
+            if scheduler and rate_limited:
+                scheduler.report_rate_limited(current_key)
+            if step_started:
+                started_wall, started = step_started
+                duration = time.perf_counter() - started
+                record_span("agent_step", started_wall, duration, step=agent.state.n_steps)
+                step_started = None
+                history_len, span_count, input_tokens, output_tokens, llm_calls = step_baseline
+                new_items = agent.state.history.history[history_len:]
+                usage = {"input_tokens": metrics.input_tokens - input_tokens,
+                         "output_tokens": metrics.output_tokens - output_tokens,
+                         "llm_calls": metrics.llm_calls - llm_calls}
+                # browser_use's own estimate of the prompt it built, next to what Gemini counted
+                estimated = new_items[-1].metadata.input_tokens if new_items and new_items[-1].metadata else None
+                payload = screenshots.end_step()
+                metrics.step_tokens.append({"step": agent.state.n_steps, **usage, "estimated_prompt_tokens": estimated,
+                                            **payload})
+                llm_spans = [item for item in metrics.spans[span_count:] if item["name"] == "llm_call"]
+                llm_failed = any("error" in item for item in llm_spans)
+                if controller:
+                    controller.observe_step(duration, errors=int(failed or llm_failed), rate_limited=rate_limited)
+                if route:
+                    route.record_step(
+                        failed=failed or llm_failed,
+                        low_confidence=not step_confidence(new_items, first_step=history_len == 0),
+                        latency=sum(item["duration"] for item in llm_spans) if llm_spans else None,
+                        input_tokens=usage["input_tokens"], output_tokens=usage["output_tokens"],
+                    )
+                if on_step:
+                    event = build_step_event(agent, agent.state.n_steps, started_wall, duration, new_items, usage)
+                    event["model"] = route.current.model if route else getattr(agent.llm, "model", None)
+                    event["estimated_prompt_tokens"] = estimated
+                    event.update(payload)
+                    await emit_step_event(on_step, event)
+            control.check_step()
+
+        started = time.monotonic()
+        timed_out = None
+        screenshots = None
+        replayed_steps = 0  # trace steps replayed before the agent took over, they count against max_steps
+        try:
+            # A profile is loaded into a context of its own: earlier tasks' cookies would be saved
+            # into it, and its own must not reach later tasks
+            async with manager.lease(fresh=bool(profile)) as browser_session:
+                with span("agent_init"):
+                    agent = Agent(
+                        task=task,
+                        llm=llm,
+                        browser_session=browser_session,
+                        use_vision=vision.mode == "on",
+                    )
+                # Screenshot mode, size and format, plus per-step request size accounting
+                screenshots = ScreenshotControl(agent, vision)
+                control = RunControl(agent, budget, metrics, started=started)
+
+                # Abort blocked resource types and tracker requests from the first page load on
+                block_policy = get_block_policy()
+                block_stats = block_before = None
+                if block_policy:
+                    await agent.browser_session.start()
+                    block_stats = await block_policy.attach(agent.browser_session.browser_context)
+                    block_before = block_stats.snapshot()
+
+                # Restore a saved login so the agent doesn't redo it
+                if profile:
+                    await agent.browser_session.start()
+                    storage_state = profile_store.load(profile)
+                    if storage_state:
+                        with span("profile_load"):
+                            await apply_storage_state(agent.browser_session.browser_context, storage_state)
+
+                # Repeated tasks replay their last successful trace without the LLM;
+                # the agent only takes over if a replayed step no longer matches the page
+                trace_store = get_trace_store()
+                start_url = TraceStore.starting_url(browser_session) if trace_store else None
+                saved_trace = trace_store.load(task, start_url, agent.AgentOutput) if trace_store else None
+                if saved_trace:
+                    try:
+                        # Under the same control as agent.run: deadline, step and token budget, cancellation
+                        with span("trace_replay"):
+                            replayed_steps, results = await control.run(
+                                replay_trace(agent, saved_trace, control, budget.max_steps)
+                            )
+                        replayed = replay_record(results)
+                        stopped = control.stop_reason
+                        if not replayed and not stopped and replayed_steps >= budget.max_steps:
+                            stopped = "max_steps"
+                        if replayed or stopped:
+                            if not replayed:
+                                replayed = {"success": False, "result": None,
+                                            "errors": [result.error for result in results if result.error]}
+                            metrics.status = "done" if replayed["success"] else "failed"
+                            if block_stats:
+                                metrics.blocked = block_stats.since(block_before)
+                            if profile:
+                                await save_profile(profile_store, profile, agent.browser_session)
+                            # Same shape as the record of an LLM run below
+                            return {
+                                "task": task,
+                                **replayed,
+                                "steps": replayed_steps,
+                                "stopped": None if replayed["success"] else stopped,
+                                "replayed": True,
+                                "duration": round(time.monotonic() - started, 3),
+                                "metrics": metrics.summary(),
+                                "vision": screenshots.summary(),
+                                **({"models": route.summary()} if route else {}),
+                            }
+                        print("⚠️ Replayed trace did not finish the task, handing over to the LLM")
+                    except TaskTimeout:
+                        raise
+                    except Exception as e:
+                        metrics.count_error("replay_failed")
+                        print(f"⚠️ Trace replay failed ({e}), handing over to the LLM")
+                    # The site changed; the agent's run below only covers the steps after the replayed ones,
+                    # so it isn't saved either and the next run records a complete trace
+                    trace_store.discard(task, start_url)
+
+                try:
+                    history = await control.run(agent.run(
+                        max_steps=budget.max_steps - replayed_steps, on_step_start=on_step_start,
+                        on_step_end=on_step_end
+                    ))
+                finally:
+                    # Agent.run removes the process's signal handlers when it returns
+                    reinstall_signal_handlers()
+                if profile:
+                    await save_profile(profile_store, profile, agent.browser_session)
+                if trace_store and not saved_trace and history.is_successful():
+                    trace_store.save(task, start_url, history)
+                if block_stats:
+                    metrics.blocked = block_stats.since(block_before)
+        except TaskTimeout as e:
+            # The lease closed the context the cancelled step was using; report what the agent got done
+            timed_out = str(e)
+            history = agent.state.history
+        finally:
+            # Pooled sessions outlive the task; give the next one an unwrapped session
+            if screenshots:
+                screenshots.detach()
+
+        stopped = control.stop_reason
+        steps = replayed_steps + history.number_of_steps()
+        if stopped is None and not history.is_done() and steps >= budget.max_steps:
+            stopped = "max_steps"
+        metrics.status = "done" if history.is_successful() else "failed"
+        return {
+            "task": task,
+            "success": bool(history.is_successful()),
+            "result": history.final_result(),
+            "steps": steps,
+            "errors": [error for error in history.errors() if error] + ([timed_out] if timed_out else []),
+            "stopped": stopped,
+            "replayed": False,
+            "duration": round(time.monotonic() - started, 3),
+            "metrics": metrics.summary(),
+            "vision": screenshots.summary(),
+            **({"models": route.summary()} if route else {}),
+        }
+
+async def save_profile(profile_store, profile, browser_session):
+    """Save the context's cookies and localStorage under a profile name"""
+    try:
+        with span("profile_save"):
+            storage_state = await browser_session.browser_context.storage_state()
+            profile_store.save(profile, storage_state)
+    except Exception as e:
+        print(f"⚠️ Could not save storage profile '{profile}': {e}")
+
+async def run_browser_task(task, background=None):
+    """Run a browser automation task with persistent browser session
+
+    `background` is the menu's BackgroundTasks; while it has tasks pending the
+    browser is not offered for a reset after a failure.
+    """
     try:
         # Get API key
         api_key = APIManager.get_key("1")
@@ -179,38 +982,43 @@ async def run_browser_task(task):
         
         print(f"🚀 Starting task: {task}")
         
-        # Set environment variable for the memory system
-        os.environ['GOOGLE_API_KEY'] = api_key
-        
-        # Initialize browser if needed
-        await browser_manager.initialize_browser()
+        # Initialize browser if needed (or wait for the pre-warm launch to finish)
+        if browser_manager.is_browser_ready:
+            print("🌐 Using existing browser session...")
+        await browser_manager.ensure_browser()
         
         if not browser_manager.is_browser_ready:
             print("❌ Browser is not ready. Please try again.")
             return False
-            
-        # Create LLM
-        llm = ChatGoogleGenerativeAI(
-            model=APIManager.MODELS["1"]['model'],
-            google_api_key=api_key
-        )
-            
-        # Create and run agent
-        agent = Agent(
-            task=task,
-            llm=llm,
-            browser_session=browser_manager.browser_instance,
-            browser_context=browser_manager.browser_context
-        )
         
-        print("🤖 Agent created successfully. Starting task execution...")
+        print("🤖 Creating agent and starting task execution...")
         print("👀 Watch the browser window to see the AI in action!")
         
-        # Run the task
-        result = await agent.run()
+        # Run the task, printing each step as it finishes
+        record = await execute_task(task, on_step=lambda event: print(describe_step(event)))
         
-        print("✅ Task completed successfully!")
-        print(f"Result: {result}")
+        if record["stopped"]:
+            print(f"⏹️ Task stopped early ({record['stopped']}) after {record['steps']} step(s)")
+        else:
+            print("✅ Task completed successfully!")
+        print(f"Result: {record['result']}")
+        print(f"📊 Steps: {record['steps']}, duration: {record['duration']}s")
+        usage = record["metrics"]
+        largest = max((step["input_tokens"] for step in usage["step_tokens"]), default=0)
+        print(f"🔢 Tokens: {usage['input_tokens']} in / {usage['output_tokens']} out, largest prompt {largest}")
+        if record.get("vision"):
+            vision = record["vision"]
+            print(f"🖼️ Vision {vision['mode']}: {vision['steps_with_vision']} step(s) with a screenshot, "
+                  f"{vision['payload_bytes'] // 1024} KB sent ({vision['image_bytes'] // 1024} KB images)")
+        if usage.get("trimmed"):
+            print("✂️ Trimmed: " + ", ".join(f"{amount} {kind.replace('_', ' ')}"
+                                             for kind, amount in usage["trimmed"].items()))
+        if record.get("models"):
+            used = ", ".join(f"{model} x{steps}" for model, steps in record["models"]["steps_by_model"].items())
+            print(f"🧠 Models: {used} ({record['models']['escalations']} escalation(s))")
+        blocked = record["metrics"].get("blocked")
+        if blocked and blocked["requests"]:
+            print(f"🛡️ Blocked {blocked['requests']} request(s), ~{blocked['estimated_bytes_saved'] // 1024} KB saved")
         
         # Keep browser open for potential next task
         print("\n🌐 Browser will remain open for next task...")
@@ -222,9 +1030,10 @@ async def run_browser_task(task):
         import traceback
         traceback.print_exc()
         
-        # Ask user if they want to reset browser
-        reset_choice = input("\nWould you like to reset the browser session? (y/n): ").strip().lower()
-        if reset_choice == 'y':
+        # Ask user if they want to reset browser (not under a running background agent)
+        if background and background.pending:
+            print("⚠️ Background tasks are using the browser; not offering a reset until they finish.")
+        elif await confirm("\nWould you like to reset the browser session? (y/n): "):
             try:
                 await browser_manager.reset_browser()
                 print("✅ Browser session reset successfully")
@@ -233,19 +1042,111 @@ async def run_browser_task(task):
         
         return False
 
-def setup_signal_handlers():
-    """Setup signal handlers for graceful shutdown"""
-    def signal_handler(signum, frame):
-        print(f"\n\n⚠️ Received signal {signum}. Shutting down gracefully...")
-        # The cleanup will be handled in the main function's finally block
-        sys.exit(0)
-    
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
+class BackgroundTasks:
+    """Tasks queued from the menu, run one at a time while the menu stays usable"""
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.queue = asyncio.Queue()
+        self.records = []
+        self._worker = None
+
+    @property
+    def pending(self):
+        """Number of queued or running tasks"""
+        return sum(1 for record in self.records if record["status"] in ("queued", "running"))
+
+    def submit(self, task):
+        """Queue a task; the worker is started on first use"""
+        record = {"id": len(self.records) + 1, "task": task, "status": "queued", "result": None, "last_step": None}
+        self.records.append(record)
+        self.queue.put_nowait(record)
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+        return record
+
+    async def _run(self):
+        while True:
+            record = await self.queue.get()
+            record["status"] = "running"
+            notify(f"🚀 Background task #{record['id']} started: {record['task']}")
+            try:
+                result = await execute_task(record["task"], self.manager,
+                                            on_step=lambda event: record.update(last_step=event))
+                record["result"] = result["result"]
+                record["status"] = "done" if result["success"] else "failed"
+                notify(f"✅ Background task #{record['id']} finished in {result['duration']}s: {result['result']}")
+            except asyncio.CancelledError:
+                record["status"] = "cancelled"
+                raise
+            except Exception as e:
+                record["result"] = f"{type(e).__name__}: {e}"
+                record["status"] = "failed"
+                notify(f"❌ Background task #{record['id']} failed: {record['result']}")
+            finally:
+                self.queue.task_done()
+
+    def show(self):
+        if not self.records:
+            print("No background tasks queued yet.")
+            return
+        for record in self.records:
+            line = f"#{record['id']} [{record['status']}] {record['task']}"
+            if record["result"] is not None:
+                line += f" -> {record['result']}"
+            elif record["status"] == "running" and record["last_step"]:
+                line += f"\n    {describe_step(record['last_step'])}"
+            print(line)
+
+    async def stop(self):
+        """Cancel the running task and drop queued ones"""
+        if self._worker:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        for record in self.records:
+            if record["status"] in ("queued", "running"):
+                record["status"] = "cancelled"
+
+def setup_signal_handlers(stop_tasks_first=False):
+    """Cancel the running task on SIGINT/SIGTERM so its finally blocks clean up
+
+    Exiting from inside the handler would skip pending awaits, leaving tasks
+    marked as running in the queue and the browser open. Cancellation reaches
+    running agents through RunControl, which stops them between steps. With
+    stop_tasks_first, a signal while agents run only stops them (the menu stays
+    up) and a second one shuts down. Signals during the shutdown are ignored, so
+    they don't cut its cleanup short (a multi-process supervisor sends SIGTERM
+    right after the terminal's SIGINT).
+    """
+    current = asyncio.current_task()
+    shutting_down = False
 
-async def main():
+    def signal_handler(signum):
+        nonlocal shutting_down
+        if shutting_down:
+            print(f"⚠️ Received signal {signum} again, still shutting down...", file=sys.stderr)
+            return
+        if stop_tasks_first and stop_running_tasks("interrupted"):
+            print(f"\n\n⚠️ Received signal {signum}. Stopping the running task after its current step "
+                  "(send it again to exit)...", file=sys.stderr)
+            return
+        print(f"\n\n⚠️ Received signal {signum}. Shutting down gracefully...", file=sys.stderr)
+        shutting_down = True
+        current.cancel()
+
+    # Windows event loops have no signal handlers; Ctrl+C still raises KeyboardInterrupt there
+    install_signal_handlers(signal_handler)
+
+async def main(preload=True, prewarm=False, prewarm_idle=300):
     """Main application loop"""
-    setup_signal_handlers()
+    setup_signal_handlers(stop_tasks_first=True)
+    if preload:
+        # Load browser_use and the Gemini client while the user reads the menu
+        start_preload()
+    if prewarm:
+        # Launch the browser in the background so the first task doesn't wait for Chromium
+        browser_manager.start_prewarm(idle_timeout=prewarm_idle)
     
     print("🌐 Browser Automation with AI")
     print("==============================")
@@ -259,19 +1160,24 @@ async def main():
         print("   The browser may not be visible. Make sure you're running this on a system with GUI.")
         print("   If you're using SSH, try: ssh -X username@hostname")
         
+    background = BackgroundTasks(browser_manager)
     try:
         while True:
             print("\nBrowser Automation Menu")
             print("=====================")
             print("1. Run Task")
-            print("2. Manage API Keys")
-            print("3. Reset Browser Session")
-            print("4. Close Browser")
-            print("5. Exit")
+            print("2. Queue Background Task")
+            print("3. Show Background Tasks")
+            print("4. Manage API Keys")
+            print("5. Reset Browser Session")
+            print("6. Close Browser")
+            print("7. Exit")
+            if background.pending:
+                print(f"⏳ {background.pending} background task(s) queued or running")
             
-            choice = input("\nSelect an option (1-5): ").strip()
+            choice = (await ainput("\nSelect an option (1-7): ")).strip()
             
-            if choice == "1":
+            if choice in ("1", "2"):
                 # Check if API key exists
                 api_key = APIManager.get_key("1")
                 if not api_key:
@@ -279,21 +1185,30 @@ async def main():
                     await manage_api_keys()
                     continue
                 
-                task = input("\nEnter your task (or 'back' to return to menu): ").strip()
+                task = (await ainput("\nEnter your task (or 'back' to return to menu): ")).strip()
                 if task.lower() in ['back', 'exit', '']:
                     if task.lower() == 'exit':
                         break
                     continue
                 
-                if task:
-                    await run_browser_task(task)
+                if choice == "2":
+                    record = background.submit(task)
+                    print(f"📥 Queued background task #{record['id']}; it runs while you keep using the menu")
                 else:
-                    print("Task cannot be empty.")
+                    if background.pending:
+                        print("⏳ Waiting for the browser; background tasks share it")
+                    await run_browser_task(task, background)
                     
-            elif choice == "2":
+            elif choice == "3":
+                background.show()
+                
+            elif choice == "4":
                 await manage_api_keys()
                 
-            elif choice == "3":
+            elif choice in ("5", "6") and background.pending:
+                print("⚠️ Background tasks are using the browser. Wait for them to finish first.")
+                
+            elif choice == "5":
                 if browser_manager.is_browser_ready:
                     try:
                         await browser_manager.reset_browser()
@@ -303,19 +1218,19 @@ async def main():
                 else:
                     print("No browser session is currently active.")
                 
-            elif choice == "4":
+            elif choice == "6":
                 if browser_manager.is_browser_ready:
                     await browser_manager.cleanup()
                 else:
                     print("No browser session is currently open.")
                 
-            elif choice == "5":
+            elif choice == "7":
                 break
                 
             else:
                 print("Invalid option. Please try again.")
     
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, asyncio.CancelledError):
         print("\n\n⚠️ Interrupted by user")
     except Exception as e:
         print(f"\n❌ Unexpected error: {e}")
@@ -323,12 +1238,165 @@ async def main():
         traceback.print_exc()
     
     finally:
+        if background.pending:
+            print(f"\n⚠️ Cancelling {background.pending} background task(s)...")
+        await background.stop()
+
         # Cleanup on exit
-        if browser_manager.is_browser_ready:
+        if browser_manager.is_browser_ready or browser_manager.prewarming:
             print("\n🧹 Cleaning up browser session...")
             await browser_manager.cleanup()
         
         print("👋 Goodbye!")
 
+def parse_args(argv=None):
+    """Parse command line options for the non-interactive entry points"""
+    parser = argparse.ArgumentParser(description="Browser Automation with AI")
+    parser.add_argument("--batch", metavar="PATH",
+                        help="Run tasks from PATH ('-' for stdin), one per line or JSONL, without the menu")
+    parser.add_argument("--output", metavar="PATH", default="-",
+                        help="Where to write JSONL results in batch mode (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Maximum number of tasks running at once in batch mode")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Shard batch mode across this many worker processes, each running "
+                             "--concurrency tasks with its own browser")
+    parser.add_argument("--step-events", metavar="PATH",
+                        help="Append a JSONL event for every agent step of batch tasks as it happens "
+                             "(action, URL, timings, tokens, extracted content); '-' for stderr")
+    parser.add_argument("--queue-db", metavar="PATH",
+                        help="Keep batch tasks and results in this SQLite file (or set TASK_QUEUE_DB); "
+                             "rerunning the same batch resumes it after a crash or SIGTERM")
+    parser.add_argument("--adaptive-concurrency", action="store_true", default=None,
+                        help="Treat --concurrency (or --workers) as a ceiling and adjust the number of tasks in "
+                             "flight from 429s, errors, step latency and host load (or set ADAPTIVE_CONCURRENCY=1)")
+    parser.add_argument("--serve", action="store_true",
+                        help="Run as a local HTTP service with an in-memory task queue")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind in service mode")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on in service mode")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="Number of warm browser contexts serving the queue in service mode")
+    # Same values as llm_cache.CACHE_MODES, which isn't imported here to keep startup fast
+    parser.add_argument("--llm-cache", choices=("off", "on", "replay"), default=None,
+                        help="Cache LLM responses on disk ('on') or only serve cached ones ('replay', "
+                             "fails on a miss). Defaults to $LLM_CACHE or 'off'")
+    parser.add_argument("--replay-traces", action="store_true", default=None,
+                        help="Replay saved action traces of repeated tasks instead of calling the LLM "
+                             "(also enabled by TRACE_REPLAY=1)")
+    parser.add_argument("--metrics-jsonl", metavar="PATH",
+                        help="Append per-task timing/token metrics as JSON lines (or set METRICS_JSONL)")
+    parser.add_argument("--metrics-prom", metavar="PATH",
+                        help="Rewrite a Prometheus text file after every task (or set METRICS_PROM)")
+    parser.add_argument("--block-resources", metavar="TYPES", nargs="?", const="image,media,font", default=None,
+                        help="Abort requests of these resource types (comma-separated from "
+                             f"{', '.join(RESOURCE_TYPES)}; default image,media,font). Also set by BLOCK_RESOURCES")
+    parser.add_argument("--block-trackers", action="store_true", default=None,
+                        help="Abort requests to common ad and analytics domains (or set BLOCK_TRACKERS=1)")
+    parser.add_argument("--block-urls", metavar="PATH",
+                        help="File of extra domains or URL globs to block, one per line (or set BLOCK_URLS_FILE)")
+    parser.add_argument("--recycle-after", metavar="N", type=int, default=None,
+                        help="Replace a pooled browser context (or the single browser) after it ran N tasks "
+                             "(or set BROWSER_RECYCLE_TASKS)")
+    parser.add_argument("--max-browser-rss", metavar="MB", type=float, default=None,
+                        help="Swap in a new shared browser once Chromium uses more than MB of memory "
+                             "(or set BROWSER_MAX_RSS_MB)")
+    parser.add_argument("--standby-browser", action="store_true", default=None,
+                        help="Keep a spare browser launched so pool recycling doesn't wait for Chromium "
+                             "(or set BROWSER_STANDBY=1)")
+    parser.add_argument("--profile", metavar="NAME",
+                        help="Load cookies/localStorage saved under NAME before each task and save them afterwards "
+                             "(or set STORAGE_PROFILE); batch lines and POST /tasks can name their own")
+    parser.add_argument("--profile-ttl", metavar="SECONDS", type=float, default=None,
+                        help="Ignore saved profiles older than this (or set STORAGE_PROFILE_TTL)")
+    parser.add_argument("--isolate", action="store_true", default=None,
+                        help="Run every task in a fresh context of one shared browser, closed afterwards "
+                             "(or set BROWSER_ISOLATE=1)")
+    parser.add_argument("--seed-state", metavar="PATH",
+                        help="Storage state JSON (cookies + localStorage) each new context starts with "
+                             "(or set BROWSER_SEED_STATE)")
+    parser.add_argument("--task-deadline", metavar="SECONDS", type=float, default=None,
+                        help="Stop a task at its next step once it has run this long (or set TASK_DEADLINE)")
+    parser.add_argument("--max-steps", metavar="N", type=int, default=None,
+                        help="Agent steps per task (default 100, or set TASK_MAX_STEPS)")
+    parser.add_argument("--max-tokens", metavar="N", type=int, default=None,
+                        help="Stop a task once its LLM calls used this many tokens (or set TASK_MAX_TOKENS)")
+    parser.add_argument("--keep-steps", metavar="N", type=int, default=None,
+                        help="Send only the last N steps of history with each prompt (or set TASK_KEEP_STEPS)")
+    parser.add_argument("--max-history-tokens", metavar="N", type=int, default=None,
+                        help="Drop the oldest steps while the prompt history is estimated above N tokens "
+                             "(or set TASK_MAX_HISTORY_TOKENS)")
+    parser.add_argument("--max-extracted-chars", metavar="N", type=int, default=None,
+                        help="Cut extracted page content to N characters before it goes into the next prompt "
+                             "(or set TASK_MAX_EXTRACTED_CHARS)")
+    parser.add_argument("--vision", choices=("on", "off", "on_failure"), default=None,
+                        help="Send a screenshot with every step, never, or only after a failed or unclear step "
+                             "(default on, or set VISION_MODE)")
+    parser.add_argument("--screenshot-width", metavar="PIXELS", type=int, default=None,
+                        help="Downscale screenshots sent to the LLM to at most this width (or set SCREENSHOT_WIDTH)")
+    parser.add_argument("--screenshot-quality", metavar="1-100", type=int, default=None,
+                        help="Send screenshots as JPEG at this quality instead of PNG (or set SCREENSHOT_QUALITY)")
+    parser.add_argument("--model-router", action="store_true", default=None,
+                        help="Route each agent step to the cheapest Gemini tier that copes and escalate after "
+                             "failed or low-confidence steps (or set MODEL_ROUTER=1)")
+    parser.add_argument("--model-tiers", metavar="MODELS",
+                        help="Comma-separated Gemini models for the router, cheapest first (or set MODEL_TIERS)")
+    parser.add_argument("--route-prefer", choices=("cost", "latency"), default=None,
+                        help="Among the tiers a step may use, pick the cheapest or the currently fastest "
+                             "(default cost, or set MODEL_ROUTER_PREFER)")
+    parser.add_argument("--no-preload", action="store_true",
+                        help="Don't import browser_use and the LLM client in the background at the menu")
+    parser.add_argument("--prewarm", action="store_true", default=None,
+                        help="Launch the browser in the background as soon as the menu starts "
+                             "(also enabled by BROWSER_PREWARM=1)")
+    parser.add_argument("--prewarm-idle", type=float, default=None,
+                        help="Seconds an unused pre-warmed browser stays open (default: $BROWSER_PREWARM_IDLE or 300)")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="Print how long startup and each lazily loaded module take to import, then exit")
+    args = parser.parse_args(argv)
+    if args.adaptive_concurrency and args.batch and args.processes > 1:
+        # The supervisor hands each worker a fixed --concurrency tasks; no limit would be adjusted
+        parser.error("--adaptive-concurrency can't be combined with --processes; "
+                     "use one process with a higher --concurrency instead")
+    return args
+
+def apply_settings(args):
+    """Apply the process-wide settings from parsed options (also run by each --processes worker)"""
+    if args.llm_cache or os.getenv("LLM_CACHE"):
+        from llm_cache import configure_llm_cache
+        configure_llm_cache(args.llm_cache)
+    configure_trace_store(args.replay_traces)
+    configure_resource_blocking(args.block_resources, args.block_trackers, args.block_urls)
+    configure_recycling(args.recycle_after, args.max_browser_rss, args.standby_browser)
+    configure_storage_profiles(args.profile, args.profile_ttl)
+    configure_isolation(args.isolate, args.seed_state)
+    configure_metrics(args.metrics_jsonl, args.metrics_prom)
+    configure_task_budget(args.task_deadline, args.max_steps, args.max_tokens,
+                          args.keep_steps, args.max_history_tokens, args.max_extracted_chars)
+    configure_vision(args.vision, args.screenshot_width, args.screenshot_quality)
+    configure_model_router(args.model_router, args.model_tiers, args.route_prefer)
+    # Sharded workers run a fixed number of slots each, see parse_args
+    sharded = bool(args.batch) and args.processes > 1
+    configure_adaptive_concurrency(False if sharded else args.adaptive_concurrency,
+                                   maximum=args.workers if args.serve else args.concurrency)
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    args = parse_args()
+    if args.startup_report:
+        print_startup_report()
+        sys.exit(0)
+    apply_settings(args)
+    if args.batch and args.processes > 1:
+        if env_flag("ADAPTIVE_CONCURRENCY"):
+            print("⚠️ ADAPTIVE_CONCURRENCY is ignored with --processes, each worker keeps --concurrency slots",
+                  file=sys.stderr)
+        from supervisor import run_sharded_cli
+        sys.exit(run_sharded_cli(args))
+    if args.batch:
+        from batch_runner import run_batch_cli
+        sys.exit(asyncio.run(run_batch_cli(args)))
+    if args.serve:
+        from server import serve
+        sys.exit(asyncio.run(serve(args)))
+    prewarm = args.prewarm or env_flag("BROWSER_PREWARM")
+    prewarm_idle = args.prewarm_idle if args.prewarm_idle is not None else float(os.getenv("BROWSER_PREWARM_IDLE", "300"))
+    asyncio.run(main(preload=not args.no_preload, prewarm=prewarm, prewarm_idle=prewarm_idle))
@@ -0,0 +1,268 @@
+import contextvars
+import heapq
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+# Histogram buckets (seconds) shared by every phase
+PHASE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Steps kept in the process-wide largest-prompts report
+LARGEST_PROMPTS = 20
+
+class TaskMetrics:
+    """Spans and counters collected while one task runs"""
+
+    def __init__(self, task: str):
+        self.task = task
+        self.started_at = time.time()
+        self.spans: List[Dict[str, Any]] = []
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.llm_calls = 0
+        self.errors: Dict[str, int] = {}
+        self.status: Optional[str] = None  # set by the caller, e.g. "failed" for an unsuccessful result
+        self.blocked: Optional[Dict[str, Any]] = None  # requests aborted by the resource blocking policy
+        self.step_tokens: List[Dict[str, Any]] = []  # token usage and prompt size of every agent step
+        self.trimmed: Dict[str, int] = {}  # prompt content dropped by the task's budget
+
+    def add_span(self, name: str, started: float, duration: float, **attrs: Any) -> None:
+        self.spans.append({"name": name, "start": round(started - self.started_at, 4),
+                           "duration": round(duration, 4), **attrs})
+
+    def count_error(self, kind: str) -> None:
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def count_trimmed(self, kind: str, amount: int) -> None:
+        if amount:
+            self.trimmed[kind] = self.trimmed.get(kind, 0) + amount
+
+    def phase_totals(self) -> Dict[str, float]:
+        """Total seconds spent per span name"""
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            totals[span["name"]] = round(totals.get(span["name"], 0.0) + span["duration"], 4)
+        return totals
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-phase totals and counters, small enough to attach to a task result"""
+        return {
+            "phases": self.phase_totals(),
+            "llm_calls": self.llm_calls,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "errors": self.errors,
+            "step_tokens": self.step_tokens,
+            **({"trimmed": self.trimmed} if self.trimmed else {}),
+            **({"blocked": self.blocked} if self.blocked is not None else {}),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"task": self.task, "started_at": self.started_at, **self.summary(), "spans": self.spans}
+
+_current_task: contextvars.ContextVar[Optional[TaskMetrics]] = contextvars.ContextVar("current_task_metrics", default=None)
+
+class MetricsRegistry:
+    """Process-wide aggregates, exportable as JSON lines and Prometheus text"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.phase_buckets: Dict[str, List[int]] = {}
+        self.phase_sum: Dict[str, float] = {}
+        self.phase_count: Dict[str, int] = {}
+        self.tokens = {"input": 0, "output": 0}
+        self.llm_calls = 0
+        self.errors: Dict[str, int] = {}
+        self.tasks: Dict[str, int] = {}
+        self.gauges: Dict[str, Tuple[str, float]] = {}  # name -> (help text, value)
+        self.limit_changes: Dict[str, int] = {}
+        self._largest_prompts: List[Tuple[int, int, Dict[str, Any]]] = []  # min-heap of (input tokens, seq, step)
+        self._prompt_seq = 0
+        self.jsonl_path: Optional[str] = None
+        self.prometheus_path: Optional[str] = None
+
+    def observe(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            buckets = self.phase_buckets.setdefault(phase, [0] * len(PHASE_BUCKETS))
+            for i, bound in enumerate(PHASE_BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+            self.phase_sum[phase] = self.phase_sum.get(phase, 0.0) + seconds
+            self.phase_count[phase] = self.phase_count.get(phase, 0) + 1
+
+    def count_tokens(self, input_tokens: int, output_tokens: int) -> None:
+        with self._lock:
+            self.tokens["input"] += input_tokens
+            self.tokens["output"] += output_tokens
+            self.llm_calls += 1
+
+    def count_error(self, kind: str) -> None:
+        with self._lock:
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def set_gauge(self, name: str, value: float, help_text: str) -> None:
+        with self._lock:
+            self.gauges[name] = (help_text, value)
+
+    def count_limit_change(self, reason: str) -> None:
+        """Count a change of the adaptive concurrency limit"""
+        with self._lock:
+            self.limit_changes[reason] = self.limit_changes.get(reason, 0) + 1
+
+    def observe_prompts(self, task: str, step_tokens: List[Dict[str, Any]]) -> None:
+        """Keep the steps with the most input tokens for the largest-prompts report"""
+        with self._lock:
+            for step in step_tokens:
+                self._prompt_seq += 1
+                entry = (step.get("input_tokens", 0), self._prompt_seq, {"task": task, **step})
+                if len(self._largest_prompts) < LARGEST_PROMPTS:
+                    heapq.heappush(self._largest_prompts, entry)
+                elif entry[0] > self._largest_prompts[0][0]:
+                    heapq.heapreplace(self._largest_prompts, entry)
+
+    def largest_prompts(self, limit: int = LARGEST_PROMPTS) -> List[Dict[str, Any]]:
+        """Steps that sent the most input tokens, largest first"""
+        with self._lock:
+            return [step for _, _, step in heapq.nlargest(limit, self._largest_prompts)]
+
+    def finish_task(self, metrics: TaskMetrics, status: str) -> None:
+        """Count a finished task and export its record and the current aggregates"""
+        with self._lock:
+            self.tasks[status] = self.tasks.get(status, 0) + 1
+        self.observe_prompts(metrics.task, metrics.step_tokens)
+        if self.jsonl_path:
+            record = {**metrics.to_dict(), "status": status}
+            with self._lock, open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+        if self.prometheus_path:
+            self.write_prometheus(self.prometheus_path)
+
+    def merge_summary(self, summary: Dict[str, Any], status: str, task: str = "") -> None:
+        """Fold a task summary produced in another process into these aggregates
+
+        Each phase total counts as one observation, so histogram counts are per task
+        rather than per span for merged tasks.
+        """
+        for phase, seconds in summary.get("phases", {}).items():
+            self.observe(phase, seconds)
+        with self._lock:
+            self.tokens["input"] += summary.get("input_tokens", 0)
+            self.tokens["output"] += summary.get("output_tokens", 0)
+            self.llm_calls += summary.get("llm_calls", 0)
+            for kind, count in summary.get("errors", {}).items():
+                self.errors[kind] = self.errors.get(kind, 0) + count
+            self.tasks[status] = self.tasks.get(status, 0) + 1
+        self.observe_prompts(task, summary.get("step_tokens", []))
+        if self.prometheus_path:
+            self.write_prometheus(self.prometheus_path)
+
+    def prometheus_text(self) -> str:
+        """Aggregates in the Prometheus text exposition format"""
+        lines = [
+            "# HELP browser_use_phase_seconds Time spent per task phase",
+            "# TYPE browser_use_phase_seconds histogram",
+        ]
+        with self._lock:
+            for phase in sorted(self.phase_count):
+                for bound, count in zip(PHASE_BUCKETS, self.phase_buckets[phase]):
+                    lines.append(f'browser_use_phase_seconds_bucket{{phase="{phase}",le="{bound}"}} {count}')
+                lines.append(f'browser_use_phase_seconds_bucket{{phase="{phase}",le="+Inf"}} {self.phase_count[phase]}')
+                lines.append(f'browser_use_phase_seconds_sum{{phase="{phase}"}} {self.phase_sum[phase]:.6f}')
+                lines.append(f'browser_use_phase_seconds_count{{phase="{phase}"}} {self.phase_count[phase]}')
+
+            lines += ["# HELP browser_use_llm_tokens_total LLM tokens by direction",
+                      "# TYPE browser_use_llm_tokens_total counter"]
+            for direction, count in self.tokens.items():
+                lines.append(f'browser_use_llm_tokens_total{{direction="{direction}"}} {count}')
+
+            lines += ["# HELP browser_use_llm_calls_total LLM calls",
+                      "# TYPE browser_use_llm_calls_total counter",
+                      f"browser_use_llm_calls_total {self.llm_calls}"]
+
+            lines += ["# HELP browser_use_errors_total Errors by kind",
+                      "# TYPE browser_use_errors_total counter"]
+            for kind, count in sorted(self.errors.items()):
+                lines.append(f'browser_use_errors_total{{kind="{kind}"}} {count}')
+
+            lines += ["# HELP browser_use_tasks_total Finished tasks by status",
+                      "# TYPE browser_use_tasks_total counter"]
+            for status, count in sorted(self.tasks.items()):
+                lines.append(f'browser_use_tasks_total{{status="{status}"}} {count}')
+
+            if self.limit_changes:
+                lines += ["# HELP browser_use_concurrency_changes_total Adaptive concurrency limit changes by reason",
+                          "# TYPE browser_use_concurrency_changes_total counter"]
+                for reason, count in sorted(self.limit_changes.items()):
+                    lines.append(f'browser_use_concurrency_changes_total{{reason="{reason}"}} {count}')
+
+            if self._largest_prompts:
+                lines += ["# HELP browser_use_largest_prompt_tokens Input tokens of the largest step prompt seen",
+                          "# TYPE browser_use_largest_prompt_tokens gauge",
+                          f"browser_use_largest_prompt_tokens {max(self._largest_prompts)[0]}"]
+
+            for name, (help_text, value) in sorted(self.gauges.items()):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """Atomically write the Prometheus text file (for node_exporter's textfile collector)"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".metrics.", suffix=".tmp", dir=directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+registry = MetricsRegistry()
+
+def configure_metrics(jsonl_path: Optional[str] = None, prometheus_path: Optional[str] = None) -> MetricsRegistry:
+    """Set export targets (defaults from METRICS_JSONL / METRICS_PROM)"""
+    registry.jsonl_path = jsonl_path or os.getenv("METRICS_JSONL") or None
+    registry.prometheus_path = prometheus_path or os.getenv("METRICS_PROM") or None
+    return registry
+
+def current_task_metrics() -> Optional[TaskMetrics]:
+    """Metrics of the task running in the current asyncio task, if any"""
+    return _current_task.get()
+
+@contextmanager
+def task_metrics(task: str):
+    """Collect metrics for everything that runs inside this block as one task"""
+    metrics = TaskMetrics(task)
+    token = _current_task.set(metrics)
+    status = "failed"
+    try:
+        yield metrics
+        status = "done"
+    except BaseException as e:
+        metrics.count_error(type(e).__name__)
+        registry.count_error(type(e).__name__)
+        raise
+    finally:
+        _current_task.reset(token)
+        registry.observe("task", time.time() - metrics.started_at)
+        registry.finish_task(metrics, metrics.status or status)
+
+@contextmanager
+def span(name: str, **attrs: Any):
+    """Time a phase; recorded on the current task and in the process-wide histograms"""
+    started_wall = time.time()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - started
+        registry.observe(name, duration)
+        metrics = _current_task.get()
+        if metrics is not None:
+            metrics.add_span(name, started_wall, duration, **attrs)
+
+def record_span(name: str, started_wall: float, duration: float, **attrs: Any) -> None:
+    """Record a span measured elsewhere (e.g. between two agent hooks)"""
+    registry.observe(name, duration)
+    metrics = _current_task.get()
+    if metrics is not None:
+        metrics.add_span(name, started_wall, duration, **attrs)
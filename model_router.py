@@ -0,0 +1,197 @@
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from config import env_flag
+
+# browser_use asks the model to open its evaluation of the previous goal with a verdict:
+# "Success|Failed|Unknown - <explanation>"; only that verdict is read, not the explanation
+VERDICT_PATTERN = re.compile(r"\W*(success|failed|failure|unknown)\b", re.IGNORECASE)
+
+class ModelTier:
+    """One Gemini model in the registry; tiers are ordered from cheapest to strongest"""
+
+    def __init__(self, model: str, input_cost: float, output_cost: float):
+        self.model = model
+        self.input_cost = input_cost  # USD per 1M input tokens (list price)
+        self.output_cost = output_cost  # USD per 1M output tokens
+
+    def cost(self, input_tokens: int, output_tokens: int) -> float:
+        return (input_tokens * self.input_cost + output_tokens * self.output_cost) / 1_000_000
+
+# Cheapest first; the middle tier is the model the app always used
+DEFAULT_TIERS = (
+    ModelTier("gemini-2.0-flash-lite", 0.075, 0.30),
+    ModelTier("gemini-2.0-flash-exp", 0.10, 0.40),
+    ModelTier("gemini-2.5-pro", 1.25, 10.0),
+)
+
+class ModelStats:
+    """Live latency and error rate of one model, as exponentially weighted moving averages"""
+
+    ALPHA = 0.2  # weight of the newest sample
+
+    def __init__(self):
+        self.steps = 0
+        self.errors = 0
+        self.latency: Optional[float] = None  # seconds of LLM time per step
+        self.error_rate = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.last_used: Optional[float] = None
+
+    def observe(self, latency: Optional[float], failed: bool, input_tokens: int = 0, output_tokens: int = 0) -> None:
+        self.steps += 1
+        self.errors += int(failed)
+        self.error_rate += self.ALPHA * (float(failed) - self.error_rate)
+        if latency is not None:
+            self.latency = latency if self.latency is None else self.latency + self.ALPHA * (latency - self.latency)
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.last_used = time.time()
+
+class ModelRouter:
+    """Picks the model for every agent step from a registry of tiers
+
+    A task starts on the cheapest tier and moves up one tier after a failed or
+    low-confidence step, then back down after `settle_steps` clean steps. A tier
+    whose recent error rate exceeds `max_error_rate` is skipped until it has been
+    left alone for `retry_after` seconds, then gets another chance. With
+    prefer="latency", the fastest healthy tier at or above the required one is used
+    instead of the cheapest.
+    """
+
+    def __init__(self, tiers: Sequence[ModelTier] = DEFAULT_TIERS, prefer: str = "cost",
+                 max_error_rate: float = 0.5, min_samples: int = 5, settle_steps: int = 2,
+                 retry_after: float = 60):
+        if not tiers:
+            raise ValueError("The model router needs at least one model tier")
+        if prefer not in ("cost", "latency"):
+            raise ValueError(f"Unknown routing preference: {prefer!r}. Use 'cost' or 'latency'")
+        self.tiers = list(tiers)
+        self.prefer = prefer
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples  # steps before a model's error rate counts against it
+        self.settle_steps = settle_steps
+        self.retry_after = retry_after
+        self.stats: Dict[str, ModelStats] = {tier.model: ModelStats() for tier in self.tiers}
+
+    def healthy(self, tier: ModelTier) -> bool:
+        stats = self.stats[tier.model]
+        if stats.steps < self.min_samples or stats.error_rate <= self.max_error_rate:
+            return True
+        return time.time() - (stats.last_used or 0) >= self.retry_after
+
+    def choose(self, level: int) -> ModelTier:
+        """Model for a step that needs at least tier `level`"""
+        level = max(0, min(level, len(self.tiers) - 1))
+        candidates = [tier for tier in self.tiers[level:] if self.healthy(tier)]
+        if not candidates:
+            # Everything at or above the required tier is failing; the strongest is the best bet
+            return self.tiers[-1]
+        if self.prefer == "latency":
+            # Models without samples yet count as fast so they get measured
+            return min(candidates, key=lambda tier: self.stats[tier.model].latency or 0.0)
+        return candidates[0]
+
+    def route(self) -> "TaskRoute":
+        return TaskRoute(self)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Per-model counters for /stats and the result records"""
+        return [
+            {
+                "model": tier.model,
+                "tier": index,
+                "steps": self.stats[tier.model].steps,
+                "errors": self.stats[tier.model].errors,
+                "error_rate": round(self.stats[tier.model].error_rate, 3),
+                "latency": round(self.stats[tier.model].latency, 3) if self.stats[tier.model].latency else None,
+                "cost_usd": round(tier.cost(self.stats[tier.model].input_tokens,
+                                            self.stats[tier.model].output_tokens), 6),
+                "healthy": self.healthy(tier),
+            }
+            for index, tier in enumerate(self.tiers)
+        ]
+
+class TaskRoute:
+    """Escalation state of one task"""
+
+    def __init__(self, router: ModelRouter):
+        self.router = router
+        self.level = 0
+        self.clean_steps = 0
+        self.current: Optional[ModelTier] = None
+        self.steps_by_model: Dict[str, int] = {}
+        self.escalations = 0
+
+    def next_model(self) -> str:
+        self.current = self.router.choose(self.level)
+        return self.current.model
+
+    def record_step(self, failed: bool, low_confidence: bool, latency: Optional[float],
+                    input_tokens: int = 0, output_tokens: int = 0) -> None:
+        """Feed a finished step back: update the model's live stats and the task's tier"""
+        if self.current is None:
+            return
+        model = self.current.model
+        self.router.stats[model].observe(latency, failed, input_tokens, output_tokens)
+        self.steps_by_model[model] = self.steps_by_model.get(model, 0) + 1
+        if failed or low_confidence:
+            if self.level < len(self.router.tiers) - 1:
+                self.level += 1
+                self.escalations += 1
+            self.clean_steps = 0
+        else:
+            self.clean_steps += 1
+            if self.level and self.clean_steps >= self.router.settle_steps:
+                self.level -= 1
+                self.clean_steps = 0
+
+    def summary(self) -> Dict[str, Any]:
+        return {"steps_by_model": dict(self.steps_by_model), "escalations": self.escalations}
+
+def step_confidence(new_items, first_step: bool = False) -> bool:
+    """False when the step's model output is missing or the agent judged its last goal failed or unclear
+
+    "Unknown" is the normal verdict on the first step, where there is no previous goal
+    yet, so it only counts against later steps. An evaluation without a verdict counts
+    as confident.
+    """
+    if not new_items or new_items[-1].model_output is None:
+        return False
+    match = VERDICT_PATTERN.match(new_items[-1].model_output.current_state.evaluation_previous_goal or "")
+    verdict = match.group(1).lower() if match else None
+    if verdict in ("failed", "failure"):
+        return False
+    return not (verdict == "unknown" and not first_step)
+
+def parse_tiers(spec: str) -> List[ModelTier]:
+    """Comma-separated model names, cheapest first; known models keep their prices"""
+    known = {tier.model: tier for tier in DEFAULT_TIERS}
+    tiers = []
+    for model in (name.strip() for name in spec.split(",")):
+        if model:
+            tiers.append(known.get(model) or ModelTier(model, 0.0, 0.0))
+    return tiers
+
+_model_router: Optional[ModelRouter] = None
+
+def configure_model_router(enabled: Optional[bool] = None, tiers: Optional[str] = None,
+                           prefer: Optional[str] = None) -> Optional[ModelRouter]:
+    """Set up per-step model routing (defaults from MODEL_ROUTER / MODEL_TIERS / MODEL_ROUTER_PREFER)"""
+    global _model_router
+    tiers = tiers or os.getenv("MODEL_TIERS") or None
+    if enabled is None:
+        enabled = bool(tiers) or env_flag("MODEL_ROUTER")
+    if not enabled:
+        _model_router = None
+        return None
+    _model_router = ModelRouter(parse_tiers(tiers) if tiers else DEFAULT_TIERS,
+                                prefer=prefer or os.getenv("MODEL_ROUTER_PREFER", "cost"))
+    return _model_router
+
+def get_model_router() -> Optional[ModelRouter]:
+    """The configured router, or None when every step uses the default model"""
+    return _model_router
@@ -0,0 +1,91 @@
+import sys
+from typing import List, TextIO, Tuple
+
+from metrics import registry
+
+# browser_use's message that separates the fixed prompt from the per-step history
+HISTORY_MARKER = "[Your task history memory starts here]"
+
+def _step_groups(messages) -> List[Tuple[int, int]]:
+    """(start, end) indexes of the messages each past step left in the prompt history
+
+    A step adds the "Action result" messages of the step before it, then its own
+    model output as an AI message followed by an empty tool message.
+    """
+    start = next((i + 1 for i, item in enumerate(messages) if item.message.content == HISTORY_MARKER), None)
+    if start is None:
+        return []
+    groups = []
+    for i in range(start, len(messages)):
+        if messages[i].message.type == "tool":
+            groups.append((start, i + 1))
+            start = i + 1
+    return groups
+
+def trim_history(agent, keep_steps=None, max_history_tokens=None) -> int:
+    """Drop the oldest steps from the agent's prompt history; returns how many messages went
+
+    Keeps the last `keep_steps` steps, then drops more while the history is estimated
+    above `max_history_tokens`. The newest step always stays, and so do the system
+    prompt, the task and browser_use's "init" messages. The agent's own memory field
+    still carries a summary of what the dropped steps did.
+    """
+    history = agent._message_manager.state.history
+    groups = _step_groups(history.messages)
+    drop = max(0, len(groups) - keep_steps) if keep_steps else 0
+    if max_history_tokens:
+        tokens = history.current_tokens - sum(item.metadata.tokens for start, end in groups[:drop]
+                                              for item in history.messages[start:end])
+        while tokens > max_history_tokens and drop < len(groups) - 1:
+            start, end = groups[drop]
+            tokens -= sum(item.metadata.tokens for item in history.messages[start:end])
+            drop += 1
+    if not drop:
+        return 0
+    removed = [i for start, end in groups[:drop] for i in range(start, end)
+               if history.messages[i].metadata.message_type != "init"]
+    for i in reversed(removed):
+        history.current_tokens -= history.messages[i].metadata.tokens
+        del history.messages[i]
+    return len(removed)
+
+def cap_extracted(agent, max_chars: int) -> int:
+    """Shorten extracted page content before the next step puts it in the prompt; returns characters cut
+
+    Only the copy the agent carries forward is cut; the history keeps the full text
+    and the final "done" result is never touched.
+    """
+    results = agent.state.last_result or []
+    cut = 0
+    capped = []
+    for result in results:
+        content = result.extracted_content
+        if content and len(content) > max_chars and not result.is_done:
+            cut += len(content) - max_chars
+            result = result.model_copy(update={
+                "extracted_content": f"{content[:max_chars]}\n[... {len(content) - max_chars} characters cut]"})
+        capped.append(result)
+    if cut:
+        agent.state.last_result = capped
+    return cut
+
+def apply_prompt_budget(agent, budget, metrics=None) -> None:
+    """Called before every step: enforce the task's prompt limits and count what was dropped"""
+    if budget.keep_steps or budget.max_history_tokens:
+        removed = trim_history(agent, budget.keep_steps, budget.max_history_tokens)
+        if metrics is not None:
+            metrics.count_trimmed("history_messages", removed)
+    if budget.max_extracted_chars:
+        cut = cap_extracted(agent, budget.max_extracted_chars)
+        if metrics is not None:
+            metrics.count_trimmed("extracted_chars", cut)
+
+def report_largest_prompts(limit: int = 5, file: TextIO = sys.stderr) -> None:
+    """Print the steps that sent the most input tokens in this process"""
+    prompts = registry.largest_prompts(limit)
+    if not prompts:
+        return
+    print("📏 Largest prompts:", file=file)
+    for prompt in prompts:
+        task = prompt["task"] if len(prompt["task"]) <= 60 else prompt["task"][:57] + "..."
+        print(f"   {prompt['input_tokens']:>7} tokens  step {prompt['step']}  {task}", file=file)
@@ -0,0 +1,167 @@
+import fnmatch
+import os
+import weakref
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+from config import env_flag
+
+# Playwright resource types that can be blocked; stylesheets are opt-in because some
+# pages hide or reveal content with CSS that the agent then reads
+RESOURCE_TYPES = ("image", "media", "font", "stylesheet")
+DEFAULT_BLOCKED_TYPES = ("image", "media", "font")
+
+# Ad, tracking and analytics hosts (a request is blocked if its host is one of these or a subdomain)
+TRACKER_DOMAINS = (
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googletagservices.com",
+    "adservice.google.com",
+    "amazon-adsystem.com",
+    "adnxs.com",
+    "criteo.com",
+    "criteo.net",
+    "taboola.com",
+    "outbrain.com",
+    "scorecardresearch.com",
+    "quantserve.com",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "bat.bing.com",
+    "segment.io",
+    "cdn.segment.com",
+    "mixpanel.com",
+    "nr-data.net",
+    "moatads.com",
+    "pubmatic.com",
+    "rubiconproject.com",
+    "openx.net",
+)
+
+# Blocked requests are never downloaded, so their size is estimated from typical
+# transfer sizes per resource type
+ESTIMATED_BYTES = {
+    "image": 40_000,
+    "media": 500_000,
+    "font": 30_000,
+    "stylesheet": 20_000,
+    "script": 25_000,
+}
+DEFAULT_ESTIMATED_BYTES = 10_000
+
+class BlockStats:
+    """Requests blocked in one browser context"""
+
+    def __init__(self):
+        self.requests = 0
+        self.estimated_bytes = 0
+        self.by_reason: Dict[str, int] = {}
+
+    def add(self, reason: str, resource_type: str) -> None:
+        self.requests += 1
+        self.estimated_bytes += ESTIMATED_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES)
+        self.by_reason[reason] = self.by_reason.get(reason, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "estimated_bytes_saved": self.estimated_bytes,
+            "by_reason": dict(self.by_reason),
+        }
+
+    def since(self, before: Dict[str, Any]) -> Dict[str, Any]:
+        """What was blocked after an earlier snapshot(), e.g. during one task"""
+        now = self.snapshot()
+        return {
+            "requests": now["requests"] - before["requests"],
+            "estimated_bytes_saved": now["estimated_bytes_saved"] - before["estimated_bytes_saved"],
+            "by_reason": {
+                reason: count - before["by_reason"].get(reason, 0)
+                for reason, count in now["by_reason"].items()
+                if count > before["by_reason"].get(reason, 0)
+            },
+        }
+
+class ResourceBlockPolicy:
+    """Aborts requests by resource type or URL pattern on the contexts it is attached to"""
+
+    def __init__(self, resource_types: Iterable[str] = DEFAULT_BLOCKED_TYPES,
+                 url_patterns: Iterable[str] = ()):
+        self.resource_types = frozenset(resource_types)
+        unknown = self.resource_types - set(RESOURCE_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown resource type(s): {', '.join(sorted(unknown))}. "
+                             f"Use any of: {', '.join(RESOURCE_TYPES)}")
+        # Plain entries match a host and its subdomains; entries with * are URL globs
+        patterns = [pattern.strip().lower() for pattern in url_patterns if pattern.strip()]
+        self.domains = tuple(pattern for pattern in patterns if "*" not in pattern)
+        self.globs = tuple(pattern for pattern in patterns if "*" in pattern)
+        self._stats: "weakref.WeakKeyDictionary[Any, BlockStats]" = weakref.WeakKeyDictionary()
+
+    def block_reason(self, resource_type: str, url: str) -> Optional[str]:
+        """Why a request should be blocked (its resource type or "url"), None to let it through"""
+        if resource_type in self.resource_types:
+            return resource_type
+        if not (self.domains or self.globs) or not url.startswith(("http://", "https://")):
+            return None
+        host = (urlsplit(url).hostname or "").lower()
+        if any(host == domain or host.endswith("." + domain) for domain in self.domains):
+            return "url"
+        lowered = url.lower()
+        if any(fnmatch.fnmatchcase(lowered, glob) for glob in self.globs):
+            return "url"
+        return None
+
+    async def attach(self, context) -> BlockStats:
+        """Install the request filter on a Playwright browser context (once per context)"""
+        stats = self._stats.get(context)
+        if stats is not None:
+            return stats
+        stats = self._stats[context] = BlockStats()
+
+        async def handle(route, request):
+            reason = self.block_reason(request.resource_type, request.url)
+            if reason is None:
+                await route.fallback()
+                return
+            stats.add(reason, request.resource_type)
+            await route.abort("blockedbyclient")
+
+        await context.route("**/*", handle)
+        return stats
+
+def load_url_patterns(path: str) -> List[str]:
+    """One domain or URL glob per line; blank lines and # comments are skipped"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+_block_policy: Optional[ResourceBlockPolicy] = None
+
+def configure_resource_blocking(resource_types: Optional[str] = None, block_trackers: Optional[bool] = None,
+                                url_file: Optional[str] = None) -> Optional[ResourceBlockPolicy]:
+    """Set up request blocking for this process (defaults from BLOCK_RESOURCES / BLOCK_TRACKERS / BLOCK_URLS_FILE)
+
+    resource_types is a comma-separated list such as "image,font,media"; "off" or empty blocks none.
+    """
+    global _block_policy
+    resource_types = resource_types if resource_types is not None else os.getenv("BLOCK_RESOURCES", "")
+    if block_trackers is None:
+        block_trackers = env_flag("BLOCK_TRACKERS")
+    url_file = url_file or os.getenv("BLOCK_URLS_FILE") or None
+
+    types = [] if resource_types.strip().lower() in ("", "off", "none") else \
+        [name.strip().lower() for name in resource_types.split(",") if name.strip()]
+    patterns = list(TRACKER_DOMAINS) if block_trackers else []
+    if url_file:
+        patterns += load_url_patterns(url_file)
+
+    _block_policy = ResourceBlockPolicy(types, patterns) if (types or patterns) else None
+    return _block_policy
+
+def get_block_policy() -> Optional[ResourceBlockPolicy]:
+    """The configured blocking policy, or None when nothing is blocked"""
+    return _block_policy
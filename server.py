@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Local HTTP service mode
+Accepts tasks over a small JSON API, queues them in memory and runs them on warm pooled browsers
+
+Endpoints:
+    POST /tasks              {"task": "...", optional "profile", budget fields ("deadline", "max_steps",
+                             "max_tokens", "keep_steps", "max_history_tokens", "max_extracted_chars") and
+                             vision fields ("vision", "screenshot_width", "screenshot_quality")}
+                             -> {"id": ..., "status": "queued"}
+    GET  /tasks/<id>         task status, including its latest step and whether it looks stalled
+    GET  /tasks/<id>/steps   step events so far (?after=N skips the first N)
+    GET  /tasks/<id>/result  task result (409 until the task has finished)
+    GET  /stats              queue depth, worker usage, latency percentiles and the largest prompts
+    GET  /metrics            per-phase timings, tokens and errors in Prometheus text format
+    GET  /health             liveness check
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+from concurrency_controller import get_adaptive_concurrency
+from key_scheduler import get_key_scheduler
+from main import BrowserManager, execute_task
+from metrics import registry
+from model_router import get_model_router
+from storage_profiles import parse_profile
+from task_control import TaskBudget, install_signal_handlers
+from vision import VisionSettings
+
+HTTP_REASONS = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+MAX_BODY_BYTES = 1024 * 1024
+
+# A running task with no finished step for this long is reported as stalled
+STALL_SECONDS = 120
+
+def percentile(values, pct: float) -> Optional[float]:
+    """Nearest-rank percentile of a sequence, None when empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return round(ordered[index], 3)
+
+class TaskService:
+    """In-memory task queue served by a fixed number of workers on pooled browsers"""
+
+    def __init__(self, workers: int = 2, max_finished: int = 10000, manager: Optional[BrowserManager] = None,
+                 stall_after: float = STALL_SECONDS):
+        self.workers = max(1, workers)
+        self.max_finished = max_finished
+        self.stall_after = stall_after
+        self.manager = manager or BrowserManager(pool_min=self.workers, pool_max=self.workers, idle_timeout=0)
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.tasks: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Submitted tasks without a slot yet: in the queue, or taken by a worker that waits for the adaptive limit
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.run_latencies = deque(maxlen=1000)
+        self.wait_latencies = deque(maxlen=1000)
+        self._worker_tasks = []
+        self.started_at = time.time()
+
+    async def start(self) -> None:
+        """Warm up the browsers and start the workers"""
+        await self.manager.initialize_browser()
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Stop the workers and release the browsers"""
+        for worker in self._worker_tasks:
+            worker.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        await self.manager.cleanup()
+
+    def submit(self, task: str, profile: Optional[str] = None,
+               budget: Optional[Dict[str, Any]] = None, vision: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Queue a task and return its status record"""
+        task_id = uuid.uuid4().hex
+        record = {
+            "id": task_id,
+            "task": task,
+            "profile": profile,
+            "budget": budget or None,
+            "vision": vision or None,
+            "status": "queued",
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "steps": [],
+        }
+        self.tasks[task_id] = record
+        self.queued += 1
+        self.queue.put_nowait(task_id)
+        return self.status(task_id)
+
+    def status(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Status view of a task without its result payload or full step list"""
+        record = self.tasks.get(task_id)
+        if record is None:
+            return None
+        status = {key: value for key, value in record.items() if key not in ("result", "steps")}
+        status["step_count"] = len(record["steps"])
+        status["last_step"] = record["steps"][-1] if record["steps"] else None
+        status["stalled"] = self._is_stalled(record)
+        return status
+
+    def _is_stalled(self, record: Dict[str, Any]) -> bool:
+        """Running, but no step has finished within stall_after seconds"""
+        if record["status"] != "running" or not self.stall_after:
+            return False
+        last_activity = record["steps"][-1]["started_at"] + record["steps"][-1]["duration"] \
+            if record["steps"] else record["started_at"]
+        return time.time() - last_activity > self.stall_after
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, worker usage and latency percentiles"""
+        from llm_cache import get_llm_cache
+
+        llm_cache = get_llm_cache()
+        return {
+            "queue_depth": self.queued,
+            "running": self.running,
+            "stalled": sum(1 for record in self.tasks.values() if self._is_stalled(record)),
+            "workers": self.workers,
+            "browser_recycles": dict(self.manager.recycle_counts),
+            "api_keys": get_key_scheduler().stats(),
+            "llm_cache": llm_cache.stats() if llm_cache else None,
+            "models": get_model_router().snapshot() if get_model_router() else None,
+            "concurrency": get_adaptive_concurrency().snapshot() if get_adaptive_concurrency() else None,
+            "largest_prompts": registry.largest_prompts(10),
+            "completed": self.completed,
+            "failed": self.failed,
+            "uptime": round(time.time() - self.started_at, 3),
+            "run_latency": {
+                "p50": percentile(self.run_latencies, 50),
+                "p95": percentile(self.run_latencies, 95),
+            },
+            "queue_wait": {
+                "p50": percentile(self.wait_latencies, 50),
+                "p95": percentile(self.wait_latencies, 95),
+            },
+        }
+
+    def _forget_old_tasks(self) -> None:
+        """Drop the oldest finished tasks once more than max_finished are kept"""
+        finished = [task_id for task_id, record in self.tasks.items() if record["finished_at"]]
+        for task_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.tasks[task_id]
+
+    async def _worker(self) -> None:
+        """Pull queued tasks and run them one at a time"""
+        while True:
+            task_id = await self.queue.get()
+            record = self.tasks.get(task_id)
+            if record is None:
+                self.queued -= 1
+                self.queue.task_done()
+                continue
+
+            controller = get_adaptive_concurrency()
+            if controller:
+                # The task stays queued until the adaptive limit has room for it
+                await controller.acquire()
+            self.queued -= 1
+            record["status"] = "running"
+            record["started_at"] = time.time()
+            self.wait_latencies.append(record["started_at"] - record["submitted_at"])
+            self.running += 1
+            try:
+                result = await execute_task(record["task"], self.manager, profile=record["profile"],
+                                            on_step=record["steps"].append, budget=record["budget"],
+                                            vision=record["vision"])
+                record["result"] = result
+                record["status"] = "done" if result["success"] else "failed"
+            except asyncio.CancelledError:
+                record["status"] = "cancelled"
+                raise
+            except Exception as e:
+                record["result"] = {"task": record["task"], "success": False, "error": f"{type(e).__name__}: {e}"}
+                record["status"] = "failed"
+            finally:
+                if controller:
+                    await controller.release()
+                self.running -= 1
+                record["finished_at"] = time.time()
+                self.run_latencies.append(record["finished_at"] - record["started_at"])
+                self.queue.task_done()
+
+            if record["status"] == "done":
+                self.completed += 1
+            else:
+                self.failed += 1
+            self._forget_old_tasks()
+
+    def route(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        """Dispatch one request and return (status code, JSON payload or plain text)"""
+        path, _, query = path.partition("?")
+        parts = [part for part in path.split("/") if part]
+
+        if parts == ["health"]:
+            return 200, {"status": "ok"}
+
+        if parts == ["stats"]:
+            return 200, self.stats()
+
+        if parts == ["metrics"]:
+            return 200, registry.prometheus_text()
+
+        if parts == ["tasks"]:
+            if method != "POST":
+                return 405, {"error": "Use POST to submit a task"}
+            try:
+                data = json.loads(body or b"{}")
+            except json.JSONDecodeError as e:
+                return 400, {"error": f"Invalid JSON: {e}"}
+            if not isinstance(data, dict):
+                return 400, {"error": "Expected a JSON object"}
+            task = data.get("task")
+            if task is not None and not isinstance(task, str):
+                return 400, {"error": "'task' must be a string"}
+            task = (task or "").strip()
+            if not task:
+                return 400, {"error": "Missing 'task'"}
+            # Checked here rather than when a worker picks the task up, so bad input fails the request
+            try:
+                profile = parse_profile(data)
+                budget = TaskBudget.parse_overrides(data)
+                vision = VisionSettings.parse_overrides(data)
+            except ValueError as e:
+                return 400, {"error": str(e)}
+            return 202, self.submit(task, profile, budget, vision)
+
+        if len(parts) in (2, 3) and parts[0] == "tasks":
+            if method != "GET":
+                return 405, {"error": "Use GET to read a task"}
+            record = self.tasks.get(parts[1])
+            if record is None:
+                return 404, {"error": "Unknown task id"}
+            if len(parts) == 2:
+                return 200, self.status(parts[1])
+            if parts[2] == "steps":
+                try:
+                    after = max(0, int(parse_qs(query).get("after", ["0"])[0]))
+                except ValueError:
+                    return 400, {"error": "'after' must be an integer"}
+                return 200, {"id": record["id"], "status": record["status"], "steps": record["steps"][after:]}
+            if parts[2] != "result":
+                return 404, {"error": "Not found"}
+            if not record["finished_at"]:
+                return 409, {"error": "Task has not finished", "status": record["status"]}
+            return 200, {"id": record["id"], "status": record["status"], "result": record["result"]}
+
+        return 404, {"error": "Not found"}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one HTTP/1.1 request per connection"""
+        try:
+            request_line = (await reader.readline()).decode("latin-1").strip()
+            if not request_line:
+                return
+            method, path, _ = request_line.split(" ", 2)
+
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get("content-length", "0") or 0)
+            if length > MAX_BODY_BYTES:
+                status, payload = 413, {"error": "Request body too large"}
+            else:
+                body = await reader.readexactly(length) if length else b""
+                status, payload = self.route(method.upper(), path, body)
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            status, payload = 400, {"error": f"Malformed request: {e}"}
+        except Exception as e:
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+
+        if isinstance(payload, str):
+            data, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            data, content_type = json.dumps(payload, default=str).encode("utf-8"), "application/json"
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, 'OK')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode("latin-1") + data
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+async def serve(args) -> int:
+    """Entry point for `python main.py --serve`; runs until SIGINT/SIGTERM"""
+    service = TaskService(workers=args.workers)
+    print(f"🌐 Warming up {service.workers} browser context(s)...")
+    await service.start()
+
+    server = await asyncio.start_server(service.handle_connection, args.host, args.port)
+    print(f"✅ Serving on http://{args.host}:{args.port} (POST /tasks, GET /tasks/<id>, GET /stats)")
+
+    stop_event = asyncio.Event()
+    # Re-applied around agent runs, which install their own handlers (Windows: KeyboardInterrupt)
+    install_signal_handlers(lambda signum: stop_event.set())
+
+    try:
+        await stop_event.wait()
+    finally:
+        print("\n⚠️ Shutting down service...")
+        server.close()
+        await server.wait_closed()
+        await service.stop()
+        print("👋 Goodbye!")
+    return 0
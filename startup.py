@@ -0,0 +1,96 @@
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+# Slow imports the menu doesn't need; loaded on first use or by start_preload()
+PRELOAD_MODULES = ("browser_use", "langchain_google_genai", "llm_clients")
+
+_preload_thread: Optional[threading.Thread] = None
+
+def start_preload(modules: Sequence[str] = PRELOAD_MODULES) -> None:
+    """Import the heavy modules in a background thread while the user is still at the menu
+
+    Errors are ignored here; the real import on first use raises them again.
+    """
+    global _preload_thread
+    if _preload_thread is not None:
+        return
+
+    def preload():
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                pass
+
+    _preload_thread = threading.Thread(target=preload, name="preload", daemon=True)
+    _preload_thread.start()
+
+def parse_import_times(stderr: str) -> List[Dict[str, object]]:
+    """Parse `python -X importtime` output into {"module", "self_ms", "cumulative_ms", "depth"} rows"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            rows.append({
+                "module": name.strip(),
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+                "depth": (len(name) - len(name.lstrip())) // 2,
+            })
+        except ValueError:
+            continue
+    return rows
+
+def measure_import_times(modules: Sequence[str]) -> List[Dict[str, object]]:
+    """Import `modules` one after another in a fresh interpreter and return its -X importtime rows
+
+    A top-level module's cumulative time is what it adds on top of the modules before it.
+    """
+    code = "; ".join(f"import {name}" for name in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit code {result.returncode}"
+        raise RuntimeError(f"Importing {', '.join(modules)} failed: {error}")
+    return parse_import_times(result.stderr)
+
+def print_startup_report(top: int = 15) -> None:
+    """Show what reaching the menu costs and what each lazily loaded module adds on top"""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    interpreter_ms = (time.perf_counter() - started) * 1000
+
+    print("⏱️ Startup time report")
+    print("=====================")
+    print(f"Interpreter start:           {interpreter_ms:8.1f} ms")
+    rows = measure_import_times(("main",))
+    menu_ms = next(row["cumulative_ms"] for row in rows if row["module"] == "main" and row["depth"] == 0)
+    print(f"main.py imports (menu):      {menu_ms:8.1f} ms")
+
+    slowest = {row["module"]: row for row in rows}
+    for name in PRELOAD_MODULES:
+        try:
+            lazy_rows = measure_import_times(("main", name))
+        except RuntimeError as e:
+            print(f"{name + ' (lazy)':<29}  failed: {e}")
+            continue
+        added = next((row["cumulative_ms"] for row in lazy_rows if row["module"] == name and row["depth"] == 0), 0.0)
+        print(f"{name + ' (lazy)':<29}{added:8.1f} ms")
+        for row in lazy_rows:
+            if row["cumulative_ms"] > slowest.get(row["module"], {"cumulative_ms": -1})["cumulative_ms"]:
+                slowest[row["module"]] = row
+
+    print(f"\nSlowest imports (cumulative, top {top}):")
+    for row in sorted(slowest.values(), key=lambda row: row["cumulative_ms"], reverse=True)[:top]:
+        print(f"  {row['cumulative_ms']:8.1f} ms  {row['self_ms']:8.1f} ms self  {row['module']}")
@@ -0,0 +1,86 @@
+import asyncio
+import inspect
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+# Longest extracted-content string kept in an event; the full text stays in the agent history
+MAX_EXTRACTED_CHARS = 2000
+
+def build_step_event(agent, step: int, started_at: float, duration: float, new_items: List[Any],
+                     tokens: Dict[str, int]) -> Dict[str, Any]:
+    """Describe one finished agent step from its history item(s) and the step's token usage"""
+    results = list(agent.state.last_result or [])
+    event = {
+        "type": "step",
+        "step": step,
+        "started_at": round(started_at, 3),
+        "duration": round(duration, 3),
+        "url": None,
+        "title": None,
+        "goal": None,
+        "actions": [],
+        "extracted": [result.extracted_content[:MAX_EXTRACTED_CHARS]
+                      for result in results if result.extracted_content],
+        "errors": [result.error for result in results if result.error],
+        "done": any(result.is_done for result in results),
+        **tokens,
+    }
+    # The agent only records a history item once it has read the page, so a step that
+    # failed before that has no URL or actions
+    if new_items:
+        item = new_items[-1]
+        event["url"] = item.state.url
+        event["title"] = item.state.title
+        if item.model_output:
+            event["goal"] = item.model_output.current_state.next_goal
+            event["actions"] = [action.model_dump(exclude_none=True) for action in item.model_output.action]
+    return event
+
+async def emit_step_event(callback: Optional[Callable[[Dict[str, Any]], Any]], event: Dict[str, Any]) -> None:
+    """Hand an event to a sync or async callback; a failing callback never fails the task"""
+    if callback is None:
+        return
+    try:
+        outcome = callback(event)
+        if inspect.isawaitable(outcome):
+            await outcome
+    except Exception as e:
+        print(f"⚠️ Step event callback failed: {type(e).__name__}: {e}")
+
+async def stream_task(task: str, manager=None, **options) -> AsyncIterator[Dict[str, Any]]:
+    """Run a task and yield its step events as they happen, then {"type": "result", "record": ...}
+
+    Stopping the iteration early (break / aclose()) cancels the task.
+    """
+    from main import execute_task
+
+    events: asyncio.Queue = asyncio.Queue()
+    finished = object()
+
+    async def run():
+        try:
+            return await execute_task(task, manager, on_step=events.put_nowait, **options)
+        finally:
+            events.put_nowait(finished)
+
+    runner = asyncio.create_task(run())
+    try:
+        while True:
+            event = await events.get()
+            if event is finished:
+                break
+            yield event
+        yield {"type": "result", "record": await runner}
+    finally:
+        if not runner.done():
+            runner.cancel()
+            await asyncio.gather(runner, return_exceptions=True)
+
+def describe_step(event: Dict[str, Any]) -> str:
+    """One console line for a step event"""
+    actions = ", ".join(next(iter(action), "?") for action in event["actions"]) or "no action"
+    line = f"👣 Step {event['step']} ({event['duration']:.1f}s): {actions}"
+    if event["url"]:
+        line += f" on {event['url']}"
+    if event["errors"]:
+        line += f" ❌ {event['errors'][-1].splitlines()[0][:120]}"
+    return line
@@ -0,0 +1,155 @@
+import json
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from config import env_flag
+
+# Profile names become file names
+_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+class StorageProfileStore:
+    """Named browser storage states (cookies + localStorage) kept on disk between runs"""
+
+    def __init__(self, directory: Optional[str] = None, ttl: Optional[float] = None,
+                 default_profile: Optional[str] = None):
+        self.directory = directory or os.getenv("STORAGE_PROFILE_DIR") or str(Path.home() / ".browser_use" / "profiles")
+        self.ttl = ttl  # seconds a saved state stays usable, None for no expiry
+        self.default_profile = default_profile
+
+    def path_for(self, name: str) -> str:
+        _check_name(name)
+        return os.path.join(self.directory, f"{name}.json")
+
+    def load(self, name: str) -> Optional[Dict[str, Any]]:
+        """Saved storage state of a profile, None if there is none or it has expired"""
+        path = self.path_for(name)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️ Ignoring unreadable storage profile {path}: {e}")
+            return None
+        if self.ttl and time.time() - saved.get("saved_at", 0) > self.ttl:
+            print(f"⌛ Storage profile '{name}' is older than {self.ttl:.0f}s, starting without it")
+            return None
+        return saved.get("storage_state")
+
+    def save(self, name: str, storage_state: Dict[str, Any]) -> str:
+        """Write a profile atomically; the file holds session cookies, so it is private to the user"""
+        path = self.path_for(name)
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".profile.", suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"saved_at": time.time(), "storage_state": storage_state}, f)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        return path
+
+def _check_name(name: str) -> None:
+    if not _NAME_PATTERN.match(name):
+        raise ValueError(f"Invalid profile name: {name!r}. Use letters, digits, '.', '_' or '-'")
+
+def parse_profile(data: Dict[str, Any]) -> Optional[str]:
+    """Pick and validate the "profile" field of a task's JSON (batch line or POST /tasks body)"""
+    profile = data.get("profile")
+    if profile is None or profile == "":
+        return None
+    if not isinstance(profile, str):
+        raise ValueError("'profile' must be a string")
+    _check_name(profile)
+    return profile
+
+def local_storage_script(storage_state: Dict[str, Any]) -> Optional[str]:
+    """Init script that restores saved localStorage entries on matching origins
+
+    Keys the page already has are left alone, so values the site updates during a
+    task aren't reset to the saved ones on the next navigation.
+    """
+    origins = [origin for origin in storage_state.get("origins", []) if origin.get("localStorage")]
+    if not origins:
+        return None
+    return (
+        "(() => {"
+        f" const origins = {json.dumps(origins)};"
+        " const saved = origins.find(entry => entry.origin === window.location.origin);"
+        " if (!saved) return;"
+        " try {"
+        "  for (const item of saved.localStorage) {"
+        "   if (window.localStorage.getItem(item.name) === null) window.localStorage.setItem(item.name, item.value);"
+        "  }"
+        " } catch (e) {}"
+        "})();"
+    )
+
+def load_storage_state_file(path: str) -> Dict[str, Any]:
+    """Read a Playwright storage state file (a saved profile file works too)"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    state = data.get("storage_state", data) if isinstance(data, dict) else None
+    if not isinstance(state, dict) or not isinstance(state.get("cookies", []), list):
+        raise ValueError(f"{path} is not a storage state file (expected 'cookies' and 'origins')")
+    return {"cookies": state.get("cookies", []), "origins": state.get("origins", [])}
+
+async def apply_storage_state(context, storage_state: Dict[str, Any]) -> None:
+    """Load cookies and localStorage into an existing Playwright context"""
+    if storage_state.get("cookies"):
+        await context.add_cookies(storage_state["cookies"])
+    script = local_storage_script(storage_state)
+    if script:
+        await context.add_init_script(script=script)
+
+_profile_store: Optional[StorageProfileStore] = None
+
+def configure_storage_profiles(default_profile: Optional[str] = None, ttl: Optional[float] = None,
+                               directory: Optional[str] = None) -> StorageProfileStore:
+    """Set up the profile store (defaults from STORAGE_PROFILE / STORAGE_PROFILE_TTL / STORAGE_PROFILE_DIR)"""
+    global _profile_store
+    default_profile = default_profile or os.getenv("STORAGE_PROFILE") or None
+    if ttl is None and os.getenv("STORAGE_PROFILE_TTL"):
+        ttl = float(os.getenv("STORAGE_PROFILE_TTL"))
+    _profile_store = StorageProfileStore(directory, ttl=ttl or None, default_profile=default_profile)
+    if default_profile:
+        _profile_store.path_for(default_profile)  # validate the name up front
+    return _profile_store
+
+def get_profile_store() -> StorageProfileStore:
+    """The configured profile store (created with defaults on first use)"""
+    global _profile_store
+    if _profile_store is None:
+        _profile_store = StorageProfileStore()
+    return _profile_store
+
+class IsolationSettings:
+    """Process-wide isolation defaults (--isolate / --seed-state) for browser managers that don't set their own"""
+
+    def __init__(self, isolate: bool = False, seed_state: Optional[Dict[str, Any]] = None):
+        self.isolate = isolate  # every task gets a fresh context, closed afterwards
+        self.seed_state = seed_state  # storage state every new context starts with
+
+_isolation = IsolationSettings()
+
+def configure_isolation(isolate: Optional[bool] = None, seed_path: Optional[str] = None) -> IsolationSettings:
+    """Set the isolation defaults (from BROWSER_ISOLATE / BROWSER_SEED_STATE when not given)"""
+    global _isolation
+    if isolate is None:
+        isolate = env_flag("BROWSER_ISOLATE")
+    seed_path = seed_path or os.getenv("BROWSER_SEED_STATE") or None
+    _isolation = IsolationSettings(isolate, load_storage_state_file(seed_path) if seed_path else None)
+    return _isolation
+
+def get_isolation() -> IsolationSettings:
+    """The configured isolation defaults (shared contexts, no seed state unless configured)"""
+    return _isolation
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Multi-process batch mode
+A supervisor hands tasks to K worker processes, each with its own event loop and
+BrowserManager, and gathers their results and metrics; dead workers are restarted
+"""
+
+import asyncio
+import contextlib
+import multiprocessing
+import os
+import queue as queue_module
+import signal
+import sys
+import time
+from typing import Any, Dict, List, Optional, TextIO
+
+from batch_runner import open_step_events, read_task_source, resume_batch, write_result
+from key_scheduler import report_key_usage
+from metrics import registry
+from prompt_budget import report_largest_prompts
+from task_control import STOP_GRACE
+from task_queue import TaskQueue, batch_key
+
+# A task is retried on another worker if its worker dies, up to this many attempts
+MAX_ATTEMPTS = 2
+# Restarts allowed per worker slot before the slot is given up
+MAX_RESTARTS = 5
+# How long stopped workers get to end their agents' steps and close the browser before they are killed
+WORKER_STOP_TIMEOUT = STOP_GRACE + 30
+
+def worker_main(worker_id: int, settings, concurrency: int, inbox, outbox) -> None:
+    """Worker process entry point: run tasks from `inbox` until a None sentinel arrives"""
+    from main import apply_settings
+
+    apply_settings(settings)
+    # Only the supervisor writes the Prometheus file; per-task JSONL lines are appended by each worker
+    registry.prometheus_path = None
+    # A stop (SIGTERM from the supervisor) cancels the loop; its tasks go back to pending in the supervisor
+    with contextlib.redirect_stdout(sys.stderr), contextlib.suppress(asyncio.CancelledError):
+        asyncio.run(_worker_loop(worker_id, concurrency, inbox, outbox, bool(settings.step_events)))
+
+async def _worker_loop(worker_id: int, concurrency: int, inbox, outbox, send_steps: bool = False) -> None:
+    from main import BrowserManager, execute_task, setup_signal_handlers
+
+    # SIGINT/SIGTERM stop running agents between steps and close the browser, as in single-process batch mode
+    setup_signal_handlers()
+    manager = BrowserManager(pool_min=min(concurrency, 2), pool_max=concurrency) \
+        if concurrency > 1 else BrowserManager()
+    loop = asyncio.get_running_loop()
+
+    async def slot():
+        while True:
+            item = await loop.run_in_executor(None, inbox.get)
+            if item is None:
+                return
+            on_step = (lambda event, queue_id=item["queue_id"]: outbox.put(("step", worker_id, queue_id, event))) \
+                if send_steps else None
+            try:
+                record = await execute_task(item["task"], manager, profile=item.get("profile"), on_step=on_step,
+                                            budget=item.get("budget"), vision=item.get("vision"))
+            except Exception as e:
+                record = {"task": item["task"], "success": False, "result": None,
+                          "error": f"{type(e).__name__}: {e}"}
+            outbox.put(("result", worker_id, item["queue_id"], record))
+
+    try:
+        await asyncio.gather(*(slot() for _ in range(concurrency)))
+    finally:
+        await manager.cleanup()
+        # Each worker has its own key scheduler and cache counters, so their usage is reported here
+        report_key_usage()
+        from llm_cache import report_llm_cache
+        report_llm_cache()
+
+class Supervisor:
+    """Spawns worker processes, keeps each one fed with up to `concurrency` tasks and restarts dead ones"""
+
+    def __init__(self, processes: int, concurrency: int = 1, settings=None):
+        self.processes = max(1, processes)
+        self.concurrency = max(1, concurrency)
+        self.settings = settings
+        self._context = multiprocessing.get_context("spawn")  # no fork: Playwright and threads don't survive it
+        self._outbox = self._context.Queue()
+        self.workers: Dict[int, Dict[str, Any]] = {}
+        self.restarts: Dict[int, int] = {}
+        self.stopping = False  # set by request_stop(); no more tasks are handed out
+
+    def _spawn(self, worker_id: int) -> None:
+        inbox = self._context.Queue()
+        process = self._context.Process(
+            target=worker_main,
+            args=(worker_id, self.settings, self.concurrency, inbox, self._outbox),
+            name=f"browser-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        self.workers[worker_id] = {"process": process, "inbox": inbox, "assigned": {}, "stopping": False}
+
+    def request_stop(self) -> None:
+        """Stop handing out tasks and stop the workers; safe to call from a signal handler"""
+        self.stopping = True
+
+    def _signal_stop(self, worker: Dict[str, Any]) -> None:
+        """SIGTERM a worker, which stops its agents between steps, and wake its idle slots"""
+        if worker["stopping"]:
+            return
+        worker["stopping"] = time.monotonic() + WORKER_STOP_TIMEOUT  # when it gets killed instead
+        worker["process"].terminate()
+        # Slots waiting in inbox.get hold executor threads the worker's event loop waits for on exit
+        for _ in range(self.concurrency):
+            worker["inbox"].put(None)
+
+    def _stop_workers(self, graceful: bool = True) -> None:
+        deadline = time.monotonic() + 30
+        for worker in self.workers.values():
+            if graceful:
+                for _ in range(self.concurrency):
+                    worker["inbox"].put(None)
+            else:
+                self._signal_stop(worker)
+        for worker in self.workers.values():
+            worker["process"].join(max(0.0, (worker["stopping"] or deadline) - time.monotonic()))
+            if worker["process"].is_alive():
+                worker["process"].kill()
+                worker["process"].join(5)
+
+    def run(self, tasks: List[Dict[str, Any]], output: TextIO, queue: Optional[TaskQueue] = None,
+            batch: Optional[str] = None, steps: Optional[TextIO] = None) -> Dict[str, Any]:
+        """Run all tasks, writing JSONL results as they arrive; returns the batch summary
+
+        The supervisor is the only process touching `queue`: it claims tasks for
+        workers with free slots and stores each result as it comes back.
+        """
+        if queue is None:
+            queue = TaskQueue(max_attempts=MAX_ATTEMPTS)
+        if batch is None:
+            batch = batch_key(tasks)
+        queue.enqueue(batch, tasks)
+        summary = {"total": len(tasks), "succeeded": 0, "failed": 0, "worker_restarts": 0}
+        started = time.monotonic()
+
+        def finish(record):
+            summary["succeeded" if record["success"] else "failed"] += 1
+            if record.get("metrics"):
+                registry.merge_summary(record["metrics"], "done" if record["success"] else "failed", record["task"])
+            write_result(output, record)
+
+        def handle(message):
+            kind, worker_id, queue_id, payload = message
+            worker = self.workers.get(worker_id)
+            if kind == "step":
+                item = worker["assigned"].get(queue_id) if worker is not None else None
+                if item is not None and steps:
+                    write_result(steps, {"id": item["id"], **payload})
+                return
+            item = worker["assigned"].pop(queue_id, None) if worker is not None else None
+            if item is not None:
+                record = {"id": item["id"], **payload}
+                queue.finish(queue_id, record)
+                finish(record)
+
+        def in_flight():
+            return sum(len(worker["assigned"]) for worker in self.workers.values())
+
+        remaining = queue.counts(batch)["pending"]
+        for worker_id in range(min(self.processes, remaining) or 1):
+            self._spawn(worker_id)
+
+        graceful = True
+        try:
+            while True:
+                if self.stopping:
+                    # Keep reading the outbox while the workers shut down: results of tasks that
+                    # finish now are kept, and a worker can't exit with unsent messages
+                    for worker in self.workers.values():
+                        self._signal_stop(worker)
+                    if not self.workers or time.monotonic() > min(w["stopping"] for w in self.workers.values()):
+                        break
+                else:
+                    # Hand out work so each live worker has up to `concurrency` tasks in flight,
+                    # claiming for all free slots in one transaction
+                    free = {worker_id: self.concurrency - len(worker["assigned"])
+                            for worker_id, worker in self.workers.items()}
+                    claimed = queue.claim(batch, sum(free.values()), worker="supervisor") if any(free.values()) else []
+                    for worker_id, slots in free.items():
+                        worker = self.workers[worker_id]
+                        for item in claimed[:slots]:
+                            worker["assigned"][item["queue_id"]] = item
+                            worker["inbox"].put(item)
+                        claimed = claimed[slots:]
+                    if not in_flight():
+                        break
+
+                try:
+                    handle(self._outbox.get(timeout=1.0))
+                except queue_module.Empty:
+                    pass
+
+                for worker_id, worker in list(self.workers.items()):
+                    if worker["process"].is_alive():
+                        continue
+                    # Collect results it managed to send before dying, then retry the rest
+                    with contextlib.suppress(queue_module.Empty):
+                        while True:
+                            handle(self._outbox.get_nowait())
+                    lost = list(worker["assigned"])
+                    del self.workers[worker_id]
+                    if worker["stopping"]:
+                        # Stopped on request: its unfinished tasks run again on resume
+                        queue.release(lost)
+                        continue
+                    print(f"⚠️ Worker {worker_id} exited with code {worker['process'].exitcode} "
+                          f"holding {len(lost)} task(s)", file=sys.stderr)
+                    for queue_id in lost:
+                        record = queue.requeue(queue_id, "Worker process died while running the task")
+                        if record:
+                            finish(record)
+
+                    self.restarts[worker_id] = self.restarts.get(worker_id, 0) + 1
+                    if self.restarts[worker_id] <= MAX_RESTARTS:
+                        summary["worker_restarts"] += 1
+                        self._spawn(worker_id)
+                    elif not self.workers:
+                        raise RuntimeError("All worker processes keep dying; giving up")
+        except BaseException:
+            graceful = False
+            raise
+        finally:
+            self._stop_workers(graceful and not self.stopping)
+            # Tasks still assigned were cut short by the shutdown; they run again on resume
+            queue.release(queue_id for worker in self.workers.values() for queue_id in worker["assigned"])
+
+        summary["duration"] = round(time.monotonic() - started, 3)
+        summary["stopped"] = self.stopping
+        return summary
+
+def run_sharded_cli(args) -> int:
+    """Entry point for `python main.py --batch PATH --processes K`; returns the process exit code"""
+    tasks = read_task_source(args.batch)
+    if not tasks:
+        print("❌ No tasks found in input", file=sys.stderr)
+        return 1
+
+    supervisor = Supervisor(args.processes, args.concurrency, settings=args)
+
+    def stop(signum, frame):
+        if supervisor.stopping:
+            print(f"⚠️ Received signal {signum} again, still waiting for the workers to stop...", file=sys.stderr)
+            return
+        print(f"\n⚠️ Received signal {signum}. Stopping the workers' tasks after their current step...",
+              file=sys.stderr)
+        supervisor.request_stop()
+
+    # SIGINT/SIGTERM stop the workers the way single-process batch mode stops itself;
+    # their unfinished tasks go back to pending
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    print(f"🚀 Running {len(tasks)} task(s) on {supervisor.processes} worker process(es) "
+          f"x {supervisor.concurrency} concurrent task(s)", file=sys.stderr)
+    try:
+        with contextlib.ExitStack() as stack:
+            steps = open_step_events(args.step_events, stack)
+            output = sys.stdout if args.output == "-" else \
+                stack.enter_context(open(args.output, "a", encoding="utf-8"))
+            queue, batch = resume_batch(args, tasks, output)
+            summary = supervisor.run(tasks, output, queue, batch, steps)
+    finally:
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    if summary["stopped"]:
+        queue.close()
+        hint = " Run the same command again to resume." if args.queue_db or os.getenv("TASK_QUEUE_DB") else ""
+        print(f"⚠️ Batch stopped before finishing.{hint}", file=sys.stderr)
+        return 143
+
+    counts = queue.counts(batch)
+    queue.close()
+    print(f"✅ Batch finished: {summary['succeeded']} succeeded, {summary['failed']} failed "
+          f"in {summary['duration']}s ({summary['worker_restarts']} worker restart(s))", file=sys.stderr)
+    if counts["done"] + counts["failed"] > summary["succeeded"] + summary["failed"]:
+        print(f"📊 Whole batch: {counts['done']} done, {counts['failed']} failed", file=sys.stderr)
+    report_largest_prompts()
+    return 0 if counts["failed"] == 0 else 1
@@ -0,0 +1,178 @@
+import asyncio
+import os
+import signal
+import time
+from typing import Any, Callable, Dict, Optional, Set
+
+# Seconds a step may keep running after a stop request before it is cancelled outright
+STOP_GRACE = 30
+
+# Agent.run's own default
+DEFAULT_MAX_STEPS = 100
+
+class TaskTimeout(Exception):
+    """A task overran its deadline and its step had to be cancelled mid-way"""
+
+class TaskBudget:
+    """Limits on one task (None = unlimited)
+
+    The deadline, step and token limits stop the task; the prompt limits
+    (keep_steps, max_history_tokens, max_extracted_chars) only shrink what each
+    step sends to the LLM, see prompt_budget.
+    """
+
+    FIELDS = ("deadline", "max_steps", "max_tokens", "keep_steps", "max_history_tokens", "max_extracted_chars")
+
+    def __init__(self, deadline: Optional[float] = None, max_steps: Optional[int] = None,
+                 max_tokens: Optional[int] = None, keep_steps: Optional[int] = None,
+                 max_history_tokens: Optional[int] = None, max_extracted_chars: Optional[int] = None,
+                 grace: float = STOP_GRACE):
+        self.deadline = deadline or None  # wall-clock seconds per task
+        self.max_steps = max_steps or DEFAULT_MAX_STEPS
+        self.max_tokens = max_tokens or None  # input + output tokens over all steps
+        self.keep_steps = keep_steps or None  # past steps kept in the prompt history
+        self.max_history_tokens = max_history_tokens or None  # estimated tokens of the prompt history
+        self.max_extracted_chars = max_extracted_chars or None  # per extracted page content carried forward
+        self.grace = grace
+
+    @classmethod
+    def parse_overrides(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Pick and validate budget fields from a task's JSON (batch line or POST /tasks body)"""
+        overrides = {}
+        for field in cls.FIELDS:
+            if data.get(field) is None:
+                continue
+            try:
+                if isinstance(data[field], bool):
+                    raise TypeError(data[field])
+                value = float(data[field]) if field == "deadline" else int(data[field])
+            except (TypeError, ValueError):
+                raise ValueError(f"'{field}' must be a number")
+            if value <= 0:
+                raise ValueError(f"'{field}' must be positive")
+            overrides[field] = value
+        return overrides
+
+    def with_overrides(self, overrides: Optional[Dict[str, Any]]) -> "TaskBudget":
+        if not overrides:
+            return self
+        values = {field: getattr(self, field) for field in self.FIELDS}
+        values.update(overrides)
+        return TaskBudget(grace=self.grace, **values)
+
+class RunControl:
+    """Enforces a budget on one agent run and lets it be stopped between steps
+
+    Stopping sets the agent's stop flag, so it finishes its current step and returns
+    its history with the browser in a consistent state. Only a step that keeps running
+    `grace` seconds past the request is cancelled mid-way.
+    """
+
+    def __init__(self, agent, budget: TaskBudget, metrics=None, started: Optional[float] = None):
+        self.agent = agent
+        self.budget = budget
+        self.metrics = metrics
+        self.stop_reason: Optional[str] = None
+        self.started = started if started is not None else time.monotonic()  # the deadline counts from here
+
+    def stop(self, reason: str) -> bool:
+        """Ask the agent to stop before its next step; False if a stop was already requested"""
+        if self.stop_reason:
+            return False
+        self.stop_reason = reason
+        self.agent.stop()
+        return True
+
+    def check_step(self) -> None:
+        """Called after every step: stop once the token budget or deadline is used up"""
+        if self.budget.max_tokens and self.metrics is not None and \
+                self.metrics.input_tokens + self.metrics.output_tokens >= self.budget.max_tokens:
+            self.stop("max_tokens")
+        elif self.budget.deadline and time.monotonic() - self.started >= self.budget.deadline:
+            self.stop("deadline")
+
+    async def _finish(self, runner: asyncio.Future) -> bool:
+        """Give a stopping agent `grace` seconds to end its step, then cancel it; True if it ended by itself"""
+        try:
+            done, _ = await asyncio.wait({runner}, timeout=self.budget.grace)
+        except asyncio.CancelledError:
+            done = ()
+        if not done:
+            runner.cancel()
+            await asyncio.gather(runner, return_exceptions=True)
+        return bool(done)
+
+    async def run(self, coro):
+        """Await an agent run under this control; cancelling the caller stops the agent between steps"""
+        runner = asyncio.ensure_future(coro)
+        _running.add(self)
+        try:
+            if self.budget.deadline:
+                remaining = self.budget.deadline - (time.monotonic() - self.started)
+                done, _ = await asyncio.wait({runner}, timeout=max(0.0, remaining))
+                if not done:
+                    self.stop("deadline")
+                    if not await self._finish(runner):
+                        raise TaskTimeout(f"Task exceeded its {self.budget.deadline:g}s deadline "
+                                          f"and its last step was cancelled")
+            # Shielded so cancelling the caller doesn't cancel the step in progress
+            return await asyncio.shield(runner)
+        except asyncio.CancelledError:
+            if not runner.done():
+                self.stop("cancelled")
+                await self._finish(runner)
+            raise
+        finally:
+            _running.discard(self)
+
+_running: Set[RunControl] = set()
+
+def stop_running_tasks(reason: str = "interrupted") -> int:
+    """Stop every running agent at its next step boundary; returns how many were newly stopped"""
+    return sum(1 for control in list(_running) if control.stop(reason))
+
+_signal_action: Optional[Callable[[int], None]] = None
+
+def install_signal_handlers(action: Callable[[int], None]) -> None:
+    """Route SIGINT/SIGTERM to `action(signum)` on the running loop
+
+    browser_use's Agent.run installs its own handlers (which exit the process on
+    SIGTERM) and removes them when it returns, so execute_task re-applies these
+    before every step and after the run.
+    """
+    global _signal_action
+    _signal_action = action
+    reinstall_signal_handlers()
+
+def reinstall_signal_handlers() -> None:
+    if _signal_action is None:
+        return
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, _signal_action, signum)
+        except (NotImplementedError, RuntimeError):
+            # Windows event loops, or a loop outside the main thread
+            pass
+
+_task_budget = TaskBudget()
+
+def configure_task_budget(deadline: Optional[float] = None, max_steps: Optional[int] = None,
+                          max_tokens: Optional[int] = None, keep_steps: Optional[int] = None,
+                          max_history_tokens: Optional[int] = None,
+                          max_extracted_chars: Optional[int] = None) -> TaskBudget:
+    """Set the default budget of every task (defaults from TASK_DEADLINE, TASK_MAX_STEPS, TASK_MAX_TOKENS,
+    TASK_KEEP_STEPS, TASK_MAX_HISTORY_TOKENS and TASK_MAX_EXTRACTED_CHARS)"""
+    global _task_budget
+    values = {"deadline": deadline, "max_steps": max_steps, "max_tokens": max_tokens, "keep_steps": keep_steps,
+              "max_history_tokens": max_history_tokens, "max_extracted_chars": max_extracted_chars}
+    for field, value in values.items():
+        env = os.getenv(f"TASK_{field.upper()}")
+        if value is None and env:
+            values[field] = float(env) if field == "deadline" else int(env)
+    _task_budget = TaskBudget(**values)
+    return _task_budget
+
+def get_task_budget() -> TaskBudget:
+    """The configured default budget (only Agent.run's step limit unless configured)"""
+    return _task_budget
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Task states: pending -> running -> done | failed (running goes back to pending when interrupted)
+STATES = ("pending", "running", "done", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    batch TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    duration REAL,
+    result TEXT,
+    error TEXT,
+    UNIQUE (batch, position)
+);
+CREATE INDEX IF NOT EXISTS tasks_by_state ON tasks (batch, state, id);
+"""
+
+def batch_key(tasks: Iterable[Dict[str, Any]]) -> str:
+    """Stable name for a list of tasks, so running the same input again resumes it"""
+    digest = hashlib.sha256(json.dumps(list(tasks), sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+class TaskQueue:
+    """Tasks and their results in SQLite, so a batch survives a crash or SIGTERM
+
+    Each batch is one input; its tasks are claimed in groups inside a single
+    write transaction, and the database runs in WAL mode so readers (e.g.
+    `sqlite3 queue.db "select state, count(*) from tasks group by state"`)
+    never block the runner.
+    """
+
+    def __init__(self, path: str = ":memory:", max_attempts: int = 2):
+        self.path = path
+        self.max_attempts = max(1, max_attempts)  # a task interrupted this many times is marked failed
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Autocommit mode; writes are grouped with explicit BEGIN IMMEDIATE transactions
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._db
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def enqueue(self, batch: str, tasks: List[Dict[str, Any]]) -> int:
+        """Add a batch's tasks; ones already stored from an earlier run are left as they are"""
+        now = time.time()
+        with self._transaction() as db:
+            before = db.total_changes
+            db.executemany(
+                "INSERT OR IGNORE INTO tasks (batch, position, payload, enqueued_at) VALUES (?, ?, ?, ?)",
+                [(batch, position, json.dumps(task, default=str), now) for position, task in enumerate(tasks)],
+            )
+            return db.total_changes - before
+
+    def claim(self, batch: str, limit: int, worker: str = "") -> List[Dict[str, Any]]:
+        """Move up to `limit` pending tasks to running and return them (with their `queue_id`)"""
+        now = time.time()
+        with self._transaction() as db:
+            rows = db.execute(
+                "SELECT id, payload, attempts FROM tasks WHERE batch = ? AND state = 'pending' ORDER BY id LIMIT ?",
+                (batch, max(1, limit)),
+            ).fetchall()
+            db.executemany(
+                "UPDATE tasks SET state = 'running', attempts = attempts + 1, worker = ?, started_at = ? WHERE id = ?",
+                [(worker, now, row[0]) for row in rows],
+            )
+        return [{**json.loads(payload), "queue_id": task_id, "attempt": attempts + 1}
+                for task_id, payload, attempts in rows]
+
+    def finish(self, queue_id: int, record: Dict[str, Any]) -> None:
+        """Store a task's result record; it is done or failed depending on record["success"]"""
+        now = time.time()
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE tasks SET state = ?, finished_at = ?, duration = ? - COALESCE(started_at, ?), "
+                "result = ?, error = ? WHERE id = ?",
+                ("done" if record.get("success") else "failed", now, now, now,
+                 json.dumps(record, ensure_ascii=False, default=str), record.get("error"), queue_id),
+            )
+
+    def release(self, queue_ids: Iterable[int]) -> None:
+        """Put claimed tasks back as pending without counting the attempt, e.g. on a clean shutdown"""
+        with self._transaction() as db:
+            db.executemany(
+                "UPDATE tasks SET state = 'pending', attempts = MAX(attempts - 1, 0), worker = NULL, "
+                "started_at = NULL WHERE id = ? AND state = 'running'",
+                [(queue_id,) for queue_id in queue_ids],
+            )
+
+    def requeue(self, queue_id: int, error: str) -> Optional[Dict[str, Any]]:
+        """Retry a task whose run was lost; returns its failure record once it is out of attempts"""
+        with self._transaction() as db:
+            row = db.execute("SELECT payload, attempts FROM tasks WHERE id = ? AND state = 'running'",
+                             (queue_id,)).fetchone()
+            if row is None:
+                return None
+            payload, attempts = json.loads(row[0]), row[1]
+            if attempts < self.max_attempts:
+                db.execute("UPDATE tasks SET state = 'pending', worker = NULL, error = ? WHERE id = ?",
+                           (error, queue_id))
+                return None
+            now = time.time()
+            record = {"id": payload.get("id"), "task": payload["task"], "success": False,
+                      "result": None, "error": error}
+            db.execute(
+                "UPDATE tasks SET state = 'failed', finished_at = ?, result = ?, error = ? WHERE id = ?",
+                (now, json.dumps(record, ensure_ascii=False, default=str), error, queue_id),
+            )
+            return record
+
+    def recover(self, batch: str) -> Tuple[int, List[Dict[str, Any]]]:
+        """Requeue tasks left running by a crashed or killed run
+
+        Returns how many were found and the failure records of those that ran out of attempts.
+        """
+        stale = [row[0] for row in self._db.execute(
+            "SELECT id FROM tasks WHERE batch = ? AND state = 'running'", (batch,))]
+        failed = []
+        for queue_id in stale:
+            record = self.requeue(queue_id, "Interrupted while running (the previous run crashed or was killed)")
+            if record:
+                failed.append(record)
+        return len(stale), failed
+
+    def counts(self, batch: str) -> Dict[str, int]:
+        counts = dict.fromkeys(STATES, 0)
+        for state, count in self._db.execute(
+                "SELECT state, COUNT(*) FROM tasks WHERE batch = ? GROUP BY state", (batch,)):
+            counts[state] = count
+        return counts
+
+    def close(self) -> None:
+        self._db.close()
+
+def open_task_queue(path: Optional[str] = None) -> TaskQueue:
+    """Queue database at `path` or $TASK_QUEUE_DB; in memory (nothing survives the process) if neither is set"""
+    return TaskQueue(path or os.getenv("TASK_QUEUE_DB") or ":memory:")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Tests for APIManager's key file cache and atomic writes, using a temporary key file"""
+
+import contextlib
+import json
+import os
+import stat
+import sys
+import tempfile
+
+from api_manager import APIManager
+
+@contextlib.contextmanager
+def temp_key_file():
+    """Point APIManager at an empty temporary key file with a cold cache"""
+    key_file = APIManager.KEY_FILE
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            APIManager.KEY_FILE = os.path.join(directory, "api_keys.json")
+            APIManager._cached_keys = APIManager._cached_stamp = None
+            yield APIManager.KEY_FILE
+    finally:
+        APIManager.KEY_FILE = key_file
+        APIManager._cached_keys = APIManager._cached_stamp = None
+
+def test_unchanged_file_is_served_from_the_cache():
+    with temp_key_file():
+        assert APIManager.add_key("1", "  key-a  ")
+        assert APIManager._load_keys() == {"1": "key-a"}
+        # Same stat() stamp: the cached copy is returned without reading the file
+        APIManager._cached_keys = {"1": "cached"}
+        assert APIManager._load_keys() == {"1": "cached"}
+
+def test_file_changed_on_disk_is_reloaded():
+    with temp_key_file() as path:
+        assert APIManager.add_key("1", "key-a")
+        assert APIManager._load_keys() == {"1": "key-a"}
+        # Another process rewrites the file; the size and inode change, so the stamp does too
+        with open(path + ".new", "w") as f:
+            json.dump({"1": "key-from-elsewhere"}, f)
+        os.replace(path + ".new", path)
+        assert APIManager._load_keys() == {"1": "key-from-elsewhere"}
+
+def test_returned_keys_are_a_copy():
+    with temp_key_file():
+        assert APIManager.add_key("1", "key-a")
+        keys = APIManager._load_keys()
+        keys["1"] = "changed by the caller"
+        assert APIManager._load_keys() == {"1": "key-a"}
+
+def test_missing_or_corrupt_file():
+    with temp_key_file() as path:
+        # A missing file is created empty
+        assert APIManager._load_keys() == {}
+        assert os.path.exists(path)
+        with open(path, "w") as f:
+            f.write("{not json")
+        assert APIManager._load_keys() == {}
+
+def test_save_is_atomic_and_private():
+    with temp_key_file() as path:
+        assert APIManager.add_key("1", "key-a")
+        assert APIManager.add_pool_key("1", "key-b")
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+        assert os.listdir(os.path.dirname(path)) == ["api_keys.json"]  # no temp files left behind
+        with open(path) as f:
+            assert json.load(f) == {"1": "key-a", "1_pool": ["key-b"]}
+        # The cache was updated with the write, matching the new stamp
+        assert APIManager._cached_stamp == APIManager._file_stamp()
+        assert APIManager.remove_pool_keys("1") and APIManager._load_keys() == {"1": "key-a"}
+
+def main():
+    """Run all tests"""
+    print("🧪 Running API manager tests...")
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return failed == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Tests for batch input parsing: plain-text and JSON task lines"""
+
+import sys
+
+from batch_runner import load_tasks, parse_task_line
+
+def test_plain_text_lines():
+    assert parse_task_line("  Find the weather in Paris  \n", 3) == {"id": 3, "task": "Find the weather in Paris"}
+    assert parse_task_line("", 1) is None
+    assert parse_task_line("   ", 1) is None
+    assert parse_task_line("# a comment", 1) is None
+
+def test_json_lines():
+    assert parse_task_line('{"task": "Check the price"}', 7) == {"id": 7, "task": "Check the price"}
+    item = parse_task_line('{"id": "sku-1", "task": "Check the price", "profile": "shop", '
+                           '"max_steps": 5, "deadline": "90", "vision": "off"}', 2)
+    assert item == {"id": "sku-1", "task": "Check the price", "profile": "shop",
+                    "budget": {"max_steps": 5, "deadline": 90.0}, "vision": {"mode": "off"}}
+
+def test_invalid_json_lines_name_the_line():
+    for line, message in (('{"task": ', "Line 4: invalid JSON"),
+                          ('{"id": 1}', "Line 4: JSON task is missing a 'task' field"),
+                          ('{"task": "x", "max_steps": 0}', "Line 4: 'max_steps' must be positive"),
+                          ('{"task": "x", "vision": "sometimes"}', "Line 4: 'vision' must be"),
+                          ('{"task": 42}', "Line 4: 'task' must be a string"),
+                          ('{"task": "x", "profile": 7}', "Line 4: 'profile' must be a string"),
+                          ('{"task": "x", "profile": "a/b"}', "Line 4: Invalid profile name")):
+        try:
+            parse_task_line(line, 4)
+            raise AssertionError(f"{line} should be rejected")
+        except ValueError as e:
+            assert str(e).startswith(message), str(e)
+
+def test_load_tasks_numbers_lines_from_one():
+    tasks = load_tasks(["first\n", "\n", "# skipped\n", '{"task": "fourth"}\n'])
+    assert tasks == [{"id": 1, "task": "first"}, {"id": 4, "task": "fourth"}]
+
+def main():
+    """Run all tests"""
+    print("🧪 Running batch runner tests...")
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return failed == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""Tests for BrowserManager's launch, cleanup and lease logic, using fake browser sessions"""
+
+import asyncio
+import sys
+from types import SimpleNamespace
+
+from browser_recycler import RecyclePolicy
+from main import BrowserManager
+
+class FakeBrowser:
+    """Stands in for a browser_use BrowserSession: start(), kill() and close() with keep_alive semantics"""
+
+    def __init__(self, fail_start=False):
+        self.browser_profile = SimpleNamespace(keep_alive=None, user_data_dir="/tmp/profile")
+        self.fail_start = fail_start
+        self.running = False
+
+    async def start(self):
+        if self.fail_start:
+            raise RuntimeError("Chromium failed to launch")
+        self.running = True
+        return self
+
+    def is_connected(self):
+        return self.running
+
+    async def new_context(self):
+        return self
+
+    async def close(self):
+        # Like BrowserSession.close(): a stop() that leaves keep_alive browsers running
+        if not self.browser_profile.keep_alive:
+            self.running = False
+
+    async def kill(self):
+        self.browser_profile.keep_alive = False
+        self.running = False
+
+    @property
+    def browser(self):
+        # The Playwright browser; contexts are created in it
+        return self if self.running else None
+
+    @property
+    def browser_context(self):
+        return self
+
+    async def cookies(self):
+        # What probe_context calls; a hung renderer fails it
+        if getattr(self, "hung", False):
+            raise RuntimeError("Target closed")
+        return []
+
+class FakeContext:
+    def __init__(self, owner):
+        self.owner = owner
+        self.browser_context = self
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+class FakeManager(BrowserManager):
+    def __init__(self, browsers, **kwargs):
+        super().__init__(**kwargs)
+        self._browsers = list(browsers)
+        self.quiet = True
+
+    def _new_browser(self):
+        return self._browsers.pop(0)
+
+    async def _create_pooled_session(self, owner=None):
+        session = FakeContext(owner or self.browser_instance)
+        self._session_owner[session] = session.owner
+        return session
+
+def test_cleanup_kills_the_single_context_browser():
+    async def scenario():
+        browser = FakeBrowser()
+        manager = FakeManager([browser])
+        await manager.ensure_browser()
+        assert browser.running and browser.browser_profile.keep_alive
+        await manager.cleanup()
+        assert not browser.running
+        assert manager.browser_instance is None and not manager.is_browser_ready
+
+    asyncio.run(scenario())
+
+def test_failed_launch_is_discarded():
+    async def scenario():
+        broken, working = FakeBrowser(fail_start=True), FakeBrowser()
+        manager = FakeManager([broken, working])
+        try:
+            await manager.ensure_browser()
+            raise AssertionError("the launch should have failed")
+        except RuntimeError:
+            pass
+        assert manager.browser_instance is None and manager.browser_context is None
+        assert not manager.is_browser_ready
+        # The next task launches a new browser instead of reusing the broken one
+        await manager.ensure_browser()
+        assert manager.is_browser_ready and manager.browser_instance is working
+        await manager.cleanup()
+
+    asyncio.run(scenario())
+
+def test_fresh_lease_in_single_context_mode():
+    async def scenario():
+        shared, incognito = FakeBrowser(), FakeBrowser()
+        manager = FakeManager([shared, incognito])
+        async with manager.lease() as session:
+            assert session is shared
+        async with manager.lease(fresh=True) as session:
+            # A context of its own, outside the persistent shared one
+            assert isinstance(session, FakeContext) and session.owner is incognito
+            assert incognito.browser_profile.user_data_dir is None
+            fresh = session
+        assert fresh.closed
+        async with manager.lease(fresh=True) as session:
+            assert session is not fresh and session.owner is incognito
+        async with manager.lease() as session:
+            assert session is shared
+        await manager.cleanup()
+        assert not shared.running and not incognito.running
+
+    asyncio.run(scenario())
+
+def test_fresh_lease_skips_idle_pooled_contexts():
+    async def scenario():
+        manager = FakeManager([FakeBrowser()], pool_max=2, idle_timeout=0)
+        async with manager.lease() as first:
+            async with manager.lease() as second:
+                pass
+        # second was released first, so it is the least recently used
+        assert [session for session, _ in manager._idle_sessions] == [second, first]
+        # The pool is full, so the least recently used idle context makes room
+        async with manager.lease(fresh=True) as session:
+            assert session not in (first, second)
+            assert second.closed and not first.closed
+        assert session.closed
+        assert manager._pool_size == 1 and [s for s, _ in manager._idle_sessions] == [first]
+        await manager.cleanup()
+
+    asyncio.run(scenario())
+
+def test_single_context_browser_is_recycled_after_max_tasks():
+    async def scenario():
+        first, second = FakeBrowser(), FakeBrowser()
+        manager = FakeManager([first, second], recycle=RecyclePolicy(max_tasks=2))
+        for _ in range(2):
+            async with manager.lease() as session:
+                assert session is first
+        assert not first.running and manager.recycle_counts == {"tasks": 1}
+        async with manager.lease() as session:
+            assert session is second and second.browser_profile.keep_alive
+        await manager.cleanup()
+
+    asyncio.run(scenario())
+
+def test_single_context_browser_failing_the_probe_is_relaunched():
+    async def scenario():
+        first, second = FakeBrowser(), FakeBrowser()
+        manager = FakeManager([first, second], recycle=RecyclePolicy(max_tasks=100))
+        async with manager.lease():
+            pass
+        first.hung = True
+        async with manager.lease() as session:
+            assert session is second
+        assert not first.running and manager.recycle_counts == {"probe": 1}
+        await manager.cleanup()
+
+    asyncio.run(scenario())
+
+def main():
+    """Run all tests"""
+    print("🧪 Running browser manager tests...")
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return failed == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
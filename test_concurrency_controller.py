@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Tests for the AIMD concurrency controller's window decisions"""
+
+import asyncio
+import sys
+
+from concurrency_controller import AdaptiveConcurrency
+
+def make_controller(**kwargs) -> AdaptiveConcurrency:
+    # A long interval so only explicit adjust() calls close a window; host load never counts
+    controller = AdaptiveConcurrency(interval=3600, **kwargs)
+    controller.host_pressure = lambda: None
+    return controller
+
+def test_initial_limit_is_half_the_maximum():
+    assert AdaptiveConcurrency(8).limit == 4
+    assert AdaptiveConcurrency(8, initial=20).limit == 8
+    assert AdaptiveConcurrency(8, minimum=6).limit == 6
+
+def test_rate_limit_halves_the_limit():
+    controller = make_controller(maximum=8, initial=8)
+    controller.observe_step(1.0, rate_limited=True)
+    assert controller.adjust() == "rate_limited"
+    assert controller.limit == 4
+    assert controller.changes[-1]["from"] == 8 and controller.changes[-1]["to"] == 4
+
+def test_error_rate_above_threshold_decreases():
+    controller = make_controller(maximum=8, initial=8, max_error_rate=0.3)
+    controller.observe_step(1.0, errors=1)
+    controller.observe_step(1.0)
+    controller.observe_step(1.0)
+    controller.observe_step(1.0)
+    assert controller.adjust() is None  # 25% errors is tolerated
+    controller.observe_step(1.0, errors=1)
+    controller.observe_step(1.0)
+    assert controller.adjust() == "errors"
+    assert controller.limit == 4
+
+def test_latency_growth_decreases_without_moving_the_baseline():
+    controller = make_controller(maximum=8, initial=8, latency_factor=2.0)
+    controller.observe_step(1.0)
+    assert controller.adjust() is None
+    controller.observe_step(3.0)
+    assert controller.adjust() == "latency"
+    assert controller.snapshot()["baseline_step_latency"] == 1.0
+
+def test_host_pressure_decreases():
+    controller = make_controller(maximum=8, initial=8)
+    controller.host_pressure = lambda: "memory"
+    assert controller.adjust() == "memory"
+    assert controller.limit == 4
+
+def test_decrease_stops_at_the_minimum():
+    controller = make_controller(maximum=8, minimum=3, initial=4)
+    for _ in range(3):
+        controller.observe_step(1.0, rate_limited=True)
+        controller.adjust()
+    assert controller.limit == 3
+
+def test_grows_by_one_only_when_saturated():
+    async def scenario():
+        controller = make_controller(maximum=3, initial=2)
+        controller.observe_step(1.0)
+        assert controller.adjust() is None  # nothing waited on a slot
+        await controller.acquire()
+        await controller.acquire()
+        assert controller.adjust() == "saturated"
+        assert controller.limit == 3
+        await controller.acquire()
+        assert controller.adjust() is None  # already at the maximum
+        for _ in range(3):
+            await controller.release()
+        assert controller.in_flight == 0
+
+    asyncio.run(scenario())
+
+def main():
+    """Run all tests"""
+    print("🧪 Running adaptive concurrency tests...")
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return failed == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
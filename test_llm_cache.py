@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Tests for the on-disk LLM response cache: record/replay, prompt normalization and LRU eviction"""
+
+import io
+import os
+import sys
+import tempfile
+
+from langchain_core.outputs import Generation
+
+import llm_cache
+from llm_cache import DiskLLMCache, LLMCacheMiss, configure_llm_cache, normalize_prompt, report_llm_cache
+
+LLM = "{'model': 'gemini-2.0-flash', 'temperature': 0}"
+
+def test_record_then_replay():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cache.sqlite")
+        cache = DiskLLMCache(path)
+        assert cache.lookup("What is on the page?", LLM) is None
+        cache.update("What is on the page?", LLM, [Generation(text="A login form")])
+        assert [generation.text for generation in cache.lookup("What is on the page?", LLM)] == ["A login form"]
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+        replay = DiskLLMCache(path, replay=True)
+        assert replay.lookup("What is on the page?", LLM)[0].text == "A login form"
+        # Replay mode never calls the model, so a miss is an error and nothing new is stored
+        try:
+            replay.lookup("Something else", LLM)
+            raise AssertionError("a miss in replay mode should raise")
+        except LLMCacheMiss:
+            pass
+        replay.update("Something else", LLM, [Generation(text="x")])
+        assert replay.stats()["entries"] == 1
+
+def test_timestamps_and_screenshots_do_not_change_the_key():
+    cache_key = DiskLLMCache(os.path.join(tempfile.mkdtemp(), "cache.sqlite")).make_key
+    first = "Current date and time: 2026-01-05 10:31:02\n data:image/png;base64,AAAA"
+    second = "Current date and time: 2026-03-07T18:02\n data:image/png;base64,BBBB"
+    assert cache_key(first, LLM) == cache_key(second, LLM)
+    assert cache_key(first, LLM) != cache_key(first, LLM.replace("flash", "pro"))
+    assert "data:image" in normalize_prompt(first, ignore_images=False)
+
+def test_least_recently_used_entries_are_evicted():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = DiskLLMCache(os.path.join(directory, "cache.sqlite"))
+        cache.update("first", LLM, [Generation(text="1")])
+        cache.max_bytes = cache.stats()["bytes"] * 2  # room for two entries of this size
+        cache.update("second", LLM, [Generation(text="2")])
+        cache.lookup("first", LLM)  # now the most recently used
+        cache.update("third", LLM, [Generation(text="3")])
+        assert cache.stats()["entries"] == 2
+        assert cache.lookup("second", LLM) is None and cache.lookup("first", LLM) is not None
+
+def test_report_llm_cache():
+    with tempfile.TemporaryDirectory() as directory:
+        output = io.StringIO()
+        configure_llm_cache("off")
+        report_llm_cache(output)
+        assert output.getvalue() == ""
+        cache = configure_llm_cache("on", path=os.path.join(directory, "cache.sqlite"))
+        cache.lookup("prompt", LLM)
+        cache.update("prompt", LLM, [Generation(text="answer")])
+        cache.lookup("prompt", LLM)
+        report_llm_cache(output)
+        assert "1 hit(s), 1 miss(es) (50%), 1 entries" in output.getvalue()
+        llm_cache._llm_cache = None
+
+def main():
+    """Run all tests"""
+    print("🧪 Running LLM cache tests...")
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return failed == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
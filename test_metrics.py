@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Tests for the metrics registry: histograms, merged worker summaries and the Prometheus export"""
+
+import os
+import sys
+import tempfile
+
+from metrics import PHASE_BUCKETS, MetricsRegistry, TaskMetrics
+
+def sample(text, name):
+    """Value of the sample line starting with `name` (including its labels)"""
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.split()[-1])
+    raise AssertionError(f"{name} not in the export")
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    for seconds in (0.04, 0.3, 7):
+        registry.observe("agent_step", seconds)
+    text = registry.prometheus_text()
+    assert sample(text, 'browser_use_phase_seconds_bucket{phase="agent_step",le="0.05"}') == 1
+    assert sample(text, 'browser_use_phase_seconds_bucket{phase="agent_step",le="0.5"}') == 2
+    assert sample(text, 'browser_use_phase_seconds_bucket{phase="agent_step",le="10"}') == 3
+    assert sample(text, 'browser_use_phase_seconds_bucket{phase="agent_step",le="+Inf"}') == 3
+    assert abs(sample(text, 'browser_use_phase_seconds_sum{phase="agent_step"}') - 7.34) < 1e-6
+    assert len([line for line in text.splitlines() if "_bucket{" in line]) == len(PHASE_BUCKETS) + 1
+
+def test_merge_summary_folds_in_a_worker_task():
+    registry = MetricsRegistry()
+    metrics = TaskMetrics("find the price")
+    metrics.add_span("llm_call", metrics.started_at, 1.5)
+    metrics.add_span("llm_call", metrics.started_at + 2, 0.5)
+    metrics.input_tokens, metrics.output_tokens, metrics.llm_calls = 1200, 80, 2
+    metrics.count_error("step_error")
+    metrics.step_tokens = [{"step": 1, "input_tokens": 700}, {"step": 2, "input_tokens": 500}]
+    registry.merge_summary(metrics.summary(), "done", metrics.task)
+    registry.merge_summary({"phases": {}, "errors": {"step_error": 2}}, "failed")
+
+    text = registry.prometheus_text()
+    # Both llm_call spans of the task become one observation of their total
+    assert sample(text, 'browser_use_phase_seconds_count{phase="llm_call"}') == 1
+    assert sample(text, 'browser_use_phase_seconds_sum{phase="llm_call"}') == 2.0
+    assert sample(text, 'browser_use_llm_tokens_total{direction="input"}') == 1200
+    assert sample(text, "browser_use_llm_calls_total") == 2
+    assert sample(text, 'browser_use_errors_total{kind="step_error"}') == 3
+    assert sample(text, 'browser_use_tasks_total{status="done"}') == 1
+    assert sample(text, 'browser_use_tasks_total{status="failed"}') == 1
+    assert sample(text, "browser_use_largest_prompt_tokens") == 700
+    assert registry.largest_prompts(1) == [{"task": "find the price", "step": 1, "input_tokens": 700}]
+
+def test_gauges_and_limit_changes():
+    registry = MetricsRegistry()
+    assert "concurrency_changes" not in registry.prometheus_text()
+    registry.set_gauge("browser_use_concurrency_limit", 4, "Current adaptive concurrency limit")
+    registry.count_limit_change("rate_limited")
+    text = registry.prometheus_text()
+    assert "# TYPE browser_use_concurrency_limit gauge" in text
+    assert sample(text, "browser_use_concurrency_limit") == 4
+    assert sample(text, 'browser_use_concurrency_changes_total{reason="rate_limited"}') == 1
+
+def test_write_prometheus_replaces_the_file():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "browser_use.prom")
+        registry = MetricsRegistry()
+        registry.prometheus_path = path
+        registry.merge_summary({"phases": {"task": 3.0}}, "done")
+        with open(path, encoding="utf-8") as f:
+            assert f.read() == registry.prometheus_text()
+        assert os.listdir(directory) == ["browser_use.prom"]
+
+def main():
+    """Run all tests"""
+    print("🧪 Running metrics tests...")
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return failed == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
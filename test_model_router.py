@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Tests for per-step model routing: step confidence, escalation and tier health"""
+
+import sys
+from types import SimpleNamespace
+
+from model_router import DEFAULT_TIERS, ModelRouter, ModelTier, parse_tiers, step_confidence
+
+def step(evaluation):
+    """A history item shaped like browser_use's, with the given evaluation_previous_goal"""
+    return SimpleNamespace(model_output=SimpleNamespace(
+        current_state=SimpleNamespace(evaluation_previous_goal=evaluation)))
+
+def test_step_confidence_reads_the_verdict():
+    assert step_confidence([step("Success - the search results are shown")])
+    assert not step_confidence([step("Failed - the button did not respond")])
+    assert not step_confidence([step("failure: page not found")])
+    assert not step_confidence([step("**Failed** - still on the login page")])
+    # The explanation after the verdict doesn't count
+    assert step_confidence([step("Success - no items failed to load")])
+
+def test_unknown_verdict_only_counts_after_the_first_step():
+    assert step_confidence([step("Unknown - this is the first step")], first_step=True)
+    assert not step_confidence([step("Unknown - the page may have changed")])
+
+def test_step_confidence_without_a_verdict_or_output():
+    assert step_confidence([step("Clicked the link")])
+    assert step_confidence([step(None)])
+    assert not step_confidence([])
+    assert not step_confidence([SimpleNamespace(model_output=None)])
+    # Only the newest item of the step is read
+    assert step_confidence([step("Failed"), step("Success")])
+
+def test_route_escalates_and_settles_back():
+    router = ModelRouter(settle_steps=2)
+    route = router.route()
+    assert route.next_model() == "gemini-2.0-flash-lite"
+    route.record_step(failed=False, low_confidence=True, latency=1.0)
+    assert route.next_model() == "gemini-2.0-flash-exp" and route.escalations == 1
+    route.record_step(failed=False, low_confidence=False, latency=1.0)
+    assert route.next_model() == "gemini-2.0-flash-exp"
+    route.record_step(failed=False, low_confidence=False, latency=1.0)
+    assert route.next_model() == "gemini-2.0-flash-lite"
+    assert route.summary() == {"steps_by_model": {"gemini-2.0-flash-lite": 1, "gemini-2.0-flash-exp": 2},
+                               "escalations": 1}
+
+def test_unhealthy_tier_is_skipped():
+    router = ModelRouter(min_samples=2, retry_after=60)
+    for _ in range(4):  # error rate 1 - 0.8**4 > 0.5
+        router.stats["gemini-2.0-flash-lite"].observe(1.0, failed=True)
+    assert router.choose(0).model == "gemini-2.0-flash-exp"
+    for tier in router.tiers:
+        for _ in range(4):
+            router.stats[tier.model].observe(1.0, failed=True)
+    # Everything is failing: the strongest model is the best bet
+    assert router.choose(0).model == "gemini-2.5-pro"
+
+def test_parse_tiers_keeps_known_prices():
+    tiers = parse_tiers(" gemini-2.0-flash-lite, my-model ,")
+    assert [tier.model for tier in tiers] == ["gemini-2.0-flash-lite", "my-model"]
+    assert tiers[0] is DEFAULT_TIERS[0] and tiers[1].cost(1_000_000, 1_000_000) == 0.0
+    assert ModelTier("m", 1.0, 2.0).cost(500_000, 250_000) == 1.0
+
+def main():
+    """Run all tests"""
+    print("🧪 Running model router tests...")
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return failed == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Tests for prompt trimming: history step grouping and extracted-content caps"""
+
+import sys
+from types import SimpleNamespace
+
+from prompt_budget import HISTORY_MARKER, cap_extracted, trim_history
+
+def message(kind, content, tokens=10, message_type=None):
+    return SimpleNamespace(message=SimpleNamespace(type=kind, content=content),
+                           metadata=SimpleNamespace(tokens=tokens, message_type=message_type))
+
+def make_agent(steps):
+    """An agent whose prompt history has the fixed prompt, browser_use's init example and `steps` past steps"""
+    messages = [
+        message("system", "system prompt", 100, "init"),
+        message("human", "task", 20, "init"),
+        message("human", HISTORY_MARKER, 10, "init"),
+        message("human", "Example output:", 10, "init"),
+        message("ai", "", 30, "init"),
+        message("tool", "Browser started", 10, "init"),
+    ]
+    for step in range(1, steps + 1):
+        if step > 1:
+            messages.append(message("human", f"Action result of step {step - 1}", 40))
+        messages.append(message("ai", f"step {step}", 50))
+        messages.append(message("tool", "", 10))
+    history = SimpleNamespace(messages=messages, current_tokens=sum(item.metadata.tokens for item in messages))
+    return SimpleNamespace(_message_manager=SimpleNamespace(state=SimpleNamespace(history=history)))
+
+def contents(agent):
+    return [item.message.content for item in agent._message_manager.state.history.messages]
+
+def test_keep_steps_drops_the_oldest_steps():
+    agent = make_agent(4)
+    # Five groups (the init example and four steps); keeping three drops the example and step 1
+    assert trim_history(agent, keep_steps=3) == 2
+    remaining = contents(agent)
+    assert remaining[:6] == ["system prompt", "task", HISTORY_MARKER, "Example output:", "", "Browser started"]
+    assert "step 1" not in remaining and "step 2" in remaining and "step 4" in remaining
+    history = agent._message_manager.state.history
+    assert history.current_tokens == sum(item.metadata.tokens for item in history.messages)
+
+def test_nothing_to_drop():
+    agent = make_agent(2)
+    assert trim_history(agent, keep_steps=5) == 0
+    assert trim_history(agent, max_history_tokens=10_000) == 0
+    assert len(contents(agent)) == 6 + 5
+
+def test_token_budget_drops_until_under_the_limit():
+    agent = make_agent(4)
+    history = agent._message_manager.state.history
+    assert history.current_tokens == 540
+    assert trim_history(agent, max_history_tokens=400) == 5  # steps 1 and 2
+    assert history.current_tokens == 540 - 60 - 100
+    assert "step 3" in contents(agent)
+
+def test_newest_step_always_stays():
+    agent = make_agent(3)
+    trim_history(agent, max_history_tokens=1)
+    remaining = contents(agent)
+    assert "step 3" in remaining and "step 2" not in remaining
+    assert remaining[:3] == ["system prompt", "task", HISTORY_MARKER]
+
+def test_no_marker_means_no_trimming():
+    agent = make_agent(3)
+    del agent._message_manager.state.history.messages[2]
+    assert trim_history(agent, keep_steps=1) == 0
+
+class Result(SimpleNamespace):
+    def model_copy(self, update):
+        return Result(**{**vars(self), **update})
+
+def test_cap_extracted_shortens_only_the_carried_copy():
+    long_text = "x" * 50
+    original = Result(extracted_content=long_text, is_done=False)
+    done = Result(extracted_content=long_text, is_done=True)
+    short = Result(extracted_content="short", is_done=False)
+    agent = SimpleNamespace(state=SimpleNamespace(last_result=[original, done, short]))
+    assert cap_extracted(agent, 20) == 30
+    capped, kept_done, kept_short = agent.state.last_result
+    assert capped.extracted_content == "x" * 20 + "\n[... 30 characters cut]"
+    assert original.extracted_content == long_text
+    assert kept_done is done and kept_short is short
+    assert cap_extracted(SimpleNamespace(state=SimpleNamespace(last_result=None)), 20) == 0
+
+def main():
+    """Run all tests"""
+    print("🧪 Running prompt budget tests...")
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return failed == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
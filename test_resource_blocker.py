@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Tests for request blocking: which requests a ResourceBlockPolicy aborts and how they are counted"""
+
+import os
+import sys
+import tempfile
+
+from resource_blocker import (BlockStats, ResourceBlockPolicy, TRACKER_DOMAINS, configure_resource_blocking,
+                              load_url_patterns)
+
+def test_blocks_by_resource_type():
+    policy = ResourceBlockPolicy(("image", "font"))
+    assert policy.block_reason("image", "https://example.com/logo.png") == "image"
+    assert policy.block_reason("font", "https://example.com/a.woff2") == "font"
+    assert policy.block_reason("stylesheet", "https://example.com/site.css") is None
+    assert policy.block_reason("document", "https://example.com/") is None
+
+def test_unknown_resource_type_is_rejected():
+    try:
+        ResourceBlockPolicy(("image", "script"))
+        raise AssertionError("'script' is not a blockable resource type")
+    except ValueError as e:
+        assert "script" in str(e)
+
+def test_domain_matches_host_and_subdomains_only():
+    policy = ResourceBlockPolicy((), ["Doubleclick.net "])
+    assert policy.block_reason("script", "https://doubleclick.net/tag.js") == "url"
+    assert policy.block_reason("xhr", "https://stats.g.DOUBLECLICK.net/collect") == "url"
+    assert policy.block_reason("script", "https://notdoubleclick.net/tag.js") is None
+    assert policy.block_reason("document", "https://example.com/?ref=doubleclick.net") is None
+
+def test_url_globs_match_the_whole_url():
+    policy = ResourceBlockPolicy((), ["*/ads/*", "https://cdn.example.com/*.js"])
+    assert policy.block_reason("image", "https://example.com/ads/banner.png") == "url"
+    assert policy.block_reason("script", "https://CDN.example.com/widget.JS") == "url"
+    assert policy.block_reason("script", "https://cdn.example.com/widget.json") is None
+    assert policy.block_reason("document", "https://example.com/") is None
+
+def test_non_http_urls_are_only_blocked_by_type():
+    policy = ResourceBlockPolicy(("image",), ["*"])
+    assert policy.block_reason("image", "data:image/png;base64,AAAA") == "image"
+    assert policy.block_reason("document", "about:blank") is None
+    assert policy.block_reason("script", "chrome-extension://abc/content.js") is None
+    assert policy.block_reason("script", "https://example.com/app.js") == "url"
+
+def test_block_stats_since_a_snapshot():
+    stats = BlockStats()
+    stats.add("image", "image")
+    before = stats.snapshot()
+    stats.add("url", "script")
+    stats.add("url", "xhr")
+    assert stats.since(before) == {"requests": 2, "estimated_bytes_saved": 35_000, "by_reason": {"url": 2}}
+
+def test_configure_from_arguments():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "block.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("# ad servers\nads.example.com\n\n  */track?*  \n")
+        assert load_url_patterns(path) == ["ads.example.com", "*/track?*"]
+        try:
+            policy = configure_resource_blocking("Image, media", block_trackers=True, url_file=path)
+            assert policy.resource_types == {"image", "media"}
+            assert policy.domains == TRACKER_DOMAINS + ("ads.example.com",) and policy.globs == ("*/track?*",)
+            assert configure_resource_blocking("off", block_trackers=False) is None
+        finally:
+            configure_resource_blocking("", block_trackers=False)
+
+def main():
+    """Run all tests"""
+    print("🧪 Running resource blocker tests...")
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return failed == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Tests for the HTTP service's request routing and POST /tasks validation, without browsers"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+from api_manager import APIManager
+from concurrency_controller import configure_adaptive_concurrency
+from server import TaskService
+
+def post(service, body):
+    return service.route("POST", "/tasks", json.dumps(body).encode("utf-8"))
+
+def test_submit_and_read_a_task():
+    service = TaskService(workers=1)
+    status, queued = post(service, {"task": "  Find the weather  ", "profile": "shop", "max_steps": 5,
+                                    "vision": False})
+    assert status == 202 and queued["status"] == "queued" and queued["task"] == "Find the weather"
+    assert queued["profile"] == "shop" and queued["budget"] == {"max_steps": 5}
+    assert queued["vision"] == {"mode": "off"}
+    assert service.route("GET", f"/tasks/{queued['id']}", b"")[1]["status"] == "queued"
+    assert service.route("GET", f"/tasks/{queued['id']}/steps?after=2", b"")[1]["steps"] == []
+    status, payload = service.route("GET", f"/tasks/{queued['id']}/result", b"")
+    assert status == 409 and payload["status"] == "queued"
+
+def test_invalid_submissions_are_rejected_up_front():
+    service = TaskService(workers=1)
+    for body, error in (
+        ({}, "Missing 'task'"),
+        ({"task": "   "}, "Missing 'task'"),
+        ({"task": ["click"]}, "'task' must be a string"),
+        ({"task": "x", "profile": 123}, "'profile' must be a string"),
+        ({"task": "x", "profile": ["shop"]}, "'profile' must be a string"),
+        ({"task": "x", "profile": "../secrets"}, "Invalid profile name"),
+        ({"task": "x", "max_steps": "many"}, "'max_steps' must be a number"),
+        ({"task": "x", "deadline": True}, "'deadline' must be a number"),
+        ({"task": "x", "vision": ["on"]}, "'vision' must be"),
+        ({"task": "x", "screenshot_quality": 101}, "'screenshot_quality' is out of range"),
+    ):
+        status, payload = post(service, body)
+        assert status == 400 and payload["error"].startswith(error), (body, payload)
+    assert service.route("POST", "/tasks", b"[1, 2]") == (400, {"error": "Expected a JSON object"})
+    assert service.route("POST", "/tasks", b"{")[0] == 400
+    assert service.tasks == {} and service.queue.qsize() == 0
+
+def test_unknown_routes_and_methods():
+    service = TaskService(workers=1)
+    assert service.route("GET", "/health", b"") == (200, {"status": "ok"})
+    assert service.route("GET", "/tasks", b"")[0] == 405
+    assert service.route("POST", "/tasks/abc", b"")[0] == 405
+    assert service.route("GET", "/tasks/abc", b"")[0] == 404
+    assert service.route("GET", "/nope", b"")[0] == 404
+    status, text = service.route("GET", "/metrics", b"")
+    assert status == 200 and "# TYPE browser_use_tasks_total counter" in text
+
+def test_queue_depth_counts_tasks_waiting_for_a_slot():
+    async def scenario():
+        controller = configure_adaptive_concurrency(True, maximum=2)
+        assert controller.limit == 1
+        await controller.acquire()  # another task holds the only slot
+        service = TaskService(workers=2)
+        workers = [asyncio.create_task(service._worker()) for _ in range(2)]
+        for _ in range(3):
+            service.submit("Find the weather")
+        await asyncio.sleep(0.05)
+        # Both workers took a task off the queue, but neither task is running yet
+        assert service.queue.qsize() == 1 and service.running == 0
+        assert service.stats()["queue_depth"] == 3
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    key_file = APIManager.KEY_FILE
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            APIManager.KEY_FILE = os.path.join(directory, "api_keys.json")  # /stats reads the key list
+            asyncio.run(scenario())
+    finally:
+        APIManager.KEY_FILE = key_file
+        configure_adaptive_concurrency(False)
+
+def main():
+    """Run all tests"""
+    print("🧪 Running server tests...")
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return failed == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
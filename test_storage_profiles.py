@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Tests for named storage profiles: saving, expiry, name checks and the localStorage script"""
+
+import json
+import os
+import stat
+import sys
+import tempfile
+import time
+
+from storage_profiles import StorageProfileStore, load_storage_state_file, local_storage_script
+
+STATE = {
+    "cookies": [{"name": "sid", "value": "abc", "domain": "example.com", "path": "/"}],
+    "origins": [{"origin": "https://example.com", "localStorage": [{"name": "theme", "value": "dark"}]}],
+}
+
+def test_save_and_load_round_trip():
+    with tempfile.TemporaryDirectory() as directory:
+        store = StorageProfileStore(os.path.join(directory, "profiles"))
+        assert store.load("shop") is None
+        path = store.save("shop", STATE)
+        assert store.load("shop") == STATE
+        # The file holds session cookies, so only the user may read it
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+        assert [entry for entry in os.listdir(store.directory) if entry.startswith(".")] == []
+
+def test_expired_profile_is_ignored():
+    with tempfile.TemporaryDirectory() as directory:
+        store = StorageProfileStore(directory, ttl=60)
+        path = store.save("shop", STATE)
+        assert store.load("shop") == STATE
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"saved_at": time.time() - 120, "storage_state": STATE}, f)
+        assert store.load("shop") is None
+
+def test_invalid_names_are_rejected():
+    store = StorageProfileStore("/nonexistent")
+    for name in ("../etc/passwd", "", ".hidden", "a/b", "x" * 65):
+        try:
+            store.path_for(name)
+            raise AssertionError(f"{name!r} should be rejected")
+        except ValueError:
+            pass
+    assert store.path_for("work-account_2.eu") == os.path.join("/nonexistent", "work-account_2.eu.json")
+
+def test_local_storage_script():
+    assert local_storage_script({"cookies": STATE["cookies"], "origins": []}) is None
+    script = local_storage_script(STATE)
+    assert '"origin": "https://example.com"' in script
+    # Values the page already set are kept
+    assert "getItem(item.name) === null" in script
+
+def test_load_storage_state_file_accepts_profile_files():
+    with tempfile.TemporaryDirectory() as directory:
+        store = StorageProfileStore(directory)
+        assert load_storage_state_file(store.save("shop", STATE)) == STATE
+        path = os.path.join(directory, "bad.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"cookies": "nope"}, f)
+        try:
+            load_storage_state_file(path)
+            raise AssertionError("a malformed state file should be rejected")
+        except ValueError:
+            pass
+
+def main():
+    """Run all tests"""
+    print("🧪 Running storage profile tests...")
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return failed == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
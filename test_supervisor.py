@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Tests for the multi-process supervisor's stop path, using worker processes that fake their tasks"""
+
+import asyncio
+import contextlib
+import io
+import sys
+import threading
+import time
+
+from supervisor import Supervisor
+from task_queue import TaskQueue
+
+def fake_worker_main(worker_id, settings, concurrency, inbox, outbox):
+    """Like supervisor.worker_main, with tasks that sleep instead of driving a browser"""
+    with contextlib.suppress(asyncio.CancelledError):
+        asyncio.run(_fake_worker_loop(worker_id, concurrency, inbox, outbox))
+
+async def _fake_worker_loop(worker_id, concurrency, inbox, outbox):
+    from main import setup_signal_handlers
+
+    setup_signal_handlers()
+    loop = asyncio.get_running_loop()
+
+    async def slot():
+        while True:
+            item = await loop.run_in_executor(None, inbox.get)
+            if item is None:
+                return
+            await asyncio.sleep(float(item["task"]))
+            outbox.put(("result", worker_id, item["queue_id"], {"task": item["task"], "success": True}))
+
+    await asyncio.gather(*(slot() for _ in range(concurrency)))
+
+class FakeSupervisor(Supervisor):
+    def _spawn(self, worker_id):
+        inbox = self._context.Queue()
+        process = self._context.Process(target=fake_worker_main,
+                                        args=(worker_id, None, self.concurrency, inbox, self._outbox), daemon=True)
+        process.start()
+        self.workers[worker_id] = {"process": process, "inbox": inbox, "assigned": {}, "stopping": False}
+
+def test_finishes_every_task():
+    supervisor = FakeSupervisor(2, concurrency=2)
+    queue = TaskQueue()
+    tasks = [{"id": i, "task": "0.1"} for i in range(6)]
+    summary = supervisor.run(tasks, io.StringIO(), queue, "b")
+    assert summary["succeeded"] == 6 and not summary["stopped"]
+    assert queue.counts("b")["done"] == 6
+
+def test_stop_lets_workers_exit_and_puts_tasks_back():
+    supervisor = FakeSupervisor(2, concurrency=1)
+    queue = TaskQueue()
+    tasks = [{"id": 1, "task": "0.1"}] + [{"id": i, "task": "600"} for i in range(2, 6)]
+    output = io.StringIO()
+    threading.Timer(3.0, supervisor.request_stop).start()
+    started = time.monotonic()
+    summary = supervisor.run(tasks, output, queue, "b")
+    # The workers handled SIGTERM themselves instead of being killed after the timeout
+    assert time.monotonic() - started < 20
+    assert summary["stopped"] and summary["succeeded"] == 1 and summary["worker_restarts"] == 0
+    assert queue.counts("b") == {"pending": 4, "running": 0, "done": 1, "failed": 0}
+    assert output.getvalue().count("\n") == 1
+
+def main():
+    """Run all tests"""
+    print("🧪 Running supervisor tests...")
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return failed == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
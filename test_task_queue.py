@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Tests for the SQLite task queue: claiming, attempts and crash recovery"""
+
+import os
+import sys
+import tempfile
+
+from task_queue import TaskQueue, batch_key
+
+TASKS = [{"id": 1, "task": "first"}, {"id": 2, "task": "second"}, {"id": 3, "task": "third"}]
+
+def test_batch_key_is_stable():
+    assert batch_key(TASKS) == batch_key([dict(task) for task in TASKS])
+    assert batch_key(TASKS) != batch_key(TASKS[:2])
+
+def test_enqueue_is_idempotent():
+    queue = TaskQueue(max_attempts=2)
+    assert queue.enqueue("b", TASKS) == 3
+    assert queue.enqueue("b", TASKS) == 0
+    assert queue.counts("b")["pending"] == 3
+
+def test_claim_counts_attempts_in_order():
+    queue = TaskQueue(max_attempts=2)
+    queue.enqueue("b", TASKS)
+    claimed = queue.claim("b", 2, worker="w1")
+    assert [item["task"] for item in claimed] == ["first", "second"]
+    assert all(item["attempt"] == 1 for item in claimed)
+    assert queue.counts("b") == {"pending": 1, "running": 2, "done": 0, "failed": 0}
+    assert [item["task"] for item in queue.claim("b", 5)] == ["third"]
+    assert queue.claim("b", 5) == []
+
+def test_finish_counts_done_and_failed():
+    queue = TaskQueue()
+    queue.enqueue("b", TASKS)
+    claimed = queue.claim("b", 3)
+    for item in reversed(claimed):
+        queue.finish(item["queue_id"], {"id": item["id"], "task": item["task"], "success": item["id"] != 2})
+    assert queue.counts("b") == {"pending": 0, "running": 0, "done": 2, "failed": 1}
+
+def test_release_does_not_count_the_attempt():
+    queue = TaskQueue(max_attempts=2)
+    queue.enqueue("b", TASKS[:1])
+    item = queue.claim("b", 1)[0]
+    queue.release([item["queue_id"]])
+    assert queue.counts("b")["pending"] == 1
+    assert queue.claim("b", 1)[0]["attempt"] == 1
+
+def test_requeue_fails_the_task_once_out_of_attempts():
+    queue = TaskQueue(max_attempts=2)
+    queue.enqueue("b", TASKS[:1])
+    item = queue.claim("b", 1)[0]
+    assert queue.requeue(item["queue_id"], "worker died") is None
+    retry = queue.claim("b", 1)[0]
+    assert retry["attempt"] == 2
+    record = queue.requeue(retry["queue_id"], "worker died again")
+    assert record == {"id": 1, "task": "first", "success": False, "result": None, "error": "worker died again"}
+    assert queue.counts("b")["failed"] == 1
+    # A task that isn't running any more is left alone
+    assert queue.requeue(retry["queue_id"], "late") is None
+
+def test_recover_after_a_crash():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "queue.db")
+        queue = TaskQueue(path, max_attempts=2)
+        queue.enqueue("b", TASKS)
+        first, second = queue.claim("b", 2)
+        queue.finish(first["queue_id"], {"id": 1, "task": "first", "success": True})
+        queue.close()  # the process dies with the second task still running
+
+        queue = TaskQueue(path, max_attempts=2)
+        assert queue.recover("b") == (1, [])
+        assert queue.counts("b") == {"pending": 2, "running": 0, "done": 1, "failed": 0}
+        resumed = queue.claim("b", 5)
+        assert [(item["task"], item["attempt"]) for item in resumed] == [("second", 2), ("third", 1)]
+        queue.close()
+
+        # Crashing again on its last attempt fails the task instead of retrying it forever
+        queue = TaskQueue(path, max_attempts=2)
+        count, failed = queue.recover("b")
+        assert count == 2
+        assert [record["task"] for record in failed] == ["second"]
+        assert queue.counts("b") == {"pending": 1, "running": 0, "done": 1, "failed": 1}
+        queue.close()
+
+def main():
+    """Run all tests"""
+    print("🧪 Running task queue tests...")
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return failed == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Tests for trace replay: stepping under a RunControl, done detection and discarding traces"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+from task_control import RunControl, TaskBudget
+from trace_store import TraceStore, replay_record, replay_trace
+
+def result(done=False, error=None, content=None):
+    return SimpleNamespace(is_done=done, success=True if done else None, error=error, extracted_content=content)
+
+class FakeTrace:
+    def __init__(self, history):
+        self.history = history
+
+class FakeAgent:
+    """Replays each history item as the action result it names"""
+
+    def __init__(self):
+        self.replayed = []
+        self.stopped = False
+
+    async def rerun_history(self, history, max_retries, skip_failures, delay_between_actions):
+        assert len(history.history) == 1 and not skip_failures
+        item = history.history[0]
+        self.replayed.append(item)
+        if item == "fail":
+            raise RuntimeError("Step 1 failed after 1 attempts: Could not find matching element 0 in current page")
+        return [result(done=item == "done", content="42" if item == "done" else None)]
+
+    def stop(self):
+        self.stopped = True
+
+def test_replays_until_the_done_action():
+    agent = FakeAgent()
+    control = RunControl(agent, TaskBudget())
+    steps, results = asyncio.run(replay_trace(agent, FakeTrace(["click", "done", "click"]), control))
+    assert steps == 2 and agent.replayed == ["click", "done"]
+    assert replay_record(results) == {"success": True, "result": "42", "errors": []}
+
+def test_replay_respects_max_steps_and_stops():
+    agent = FakeAgent()
+    control = RunControl(agent, TaskBudget())
+    steps, results = asyncio.run(replay_trace(agent, FakeTrace(["a", "b", "c", "done"]), control, max_steps=2))
+    assert steps == 2 and replay_record(results) is None
+
+    agent = FakeAgent()
+    control = RunControl(agent, TaskBudget())
+    control.stop("interrupted")
+    assert asyncio.run(replay_trace(agent, FakeTrace(["a", "done"]), control)) == (0, [])
+    assert agent.replayed == []
+
+def test_replay_stops_once_the_deadline_passes():
+    agent = FakeAgent()
+    control = RunControl(agent, TaskBudget(deadline=5), started=0)  # the deadline passed long ago
+    steps, _ = asyncio.run(replay_trace(agent, FakeTrace(["a", "b", "done"]), control))
+    assert steps == 1 and control.stop_reason == "deadline" and agent.stopped
+
+def test_failed_step_raises():
+    agent = FakeAgent()
+    control = RunControl(agent, TaskBudget())
+    try:
+        asyncio.run(replay_trace(agent, FakeTrace(["a", "fail", "done"]), control))
+        raise AssertionError("a step that no longer matches the page should raise")
+    except RuntimeError:
+        pass
+    assert agent.replayed == ["a", "fail"]
+
+def test_discard_removes_the_trace():
+    with tempfile.TemporaryDirectory() as directory:
+        store = TraceStore(directory)
+        path = store.path_for("find the price", "about:blank")
+        assert path != store.path_for("find the price", "https://example.com")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("{}")
+        store.discard("find the price", "about:blank")
+        assert not os.path.exists(path)
+        store.discard("find the price", "about:blank")  # already gone
+
+def main():
+    """Run all tests"""
+    print("🧪 Running trace store tests...")
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return failed == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
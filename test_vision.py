@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Tests for per-task vision settings parsed from task JSON"""
+
+import sys
+
+from vision import VisionSettings
+
+def rejected(data, error):
+    try:
+        VisionSettings.parse_overrides(data)
+    except ValueError as e:
+        assert str(e).startswith(error), (data, str(e))
+        return
+    raise AssertionError(f"{data} should have been rejected")
+
+def test_vision_accepts_booleans_and_modes():
+    assert VisionSettings.parse_overrides({"vision": True}) == {"mode": "on"}
+    assert VisionSettings.parse_overrides({"vision": False}) == {"mode": "off"}
+    assert VisionSettings.parse_overrides({"vision": "on_failure"}) == {"mode": "on_failure"}
+    assert VisionSettings.parse_overrides({"task": "x", "vision": None}) == {}
+
+def test_invalid_vision_modes_are_rejected():
+    for value in ("sometimes", ["on"], {"mode": "on"}, 1):
+        rejected({"vision": value}, "'vision' must be true, false or one of")
+
+def test_screenshot_fields_are_numbers_in_range():
+    assert VisionSettings.parse_overrides({"screenshot_width": "800", "screenshot_quality": 70}) == \
+        {"max_width": 800, "quality": 70}
+    assert VisionSettings.parse_overrides({"screenshot_quality": 100}) == {"quality": 100}
+    rejected({"screenshot_quality": 101}, "'screenshot_quality' is out of range")
+    rejected({"screenshot_quality": 0}, "'screenshot_quality' is out of range")
+    rejected({"screenshot_width": -1}, "'screenshot_width' is out of range")
+    rejected({"screenshot_width": "wide"}, "'screenshot_width' must be a number")
+    rejected({"screenshot_width": [800]}, "'screenshot_width' must be a number")
+
+def test_booleans_are_not_numbers():
+    # int(True) == 1 would otherwise pass as a 1px width
+    rejected({"screenshot_width": True}, "'screenshot_width' must be a number")
+    rejected({"screenshot_quality": False}, "'screenshot_quality' must be a number")
+
+def test_overrides_apply_on_top_of_the_defaults():
+    defaults = VisionSettings("on", max_width=1024, quality=80)
+    assert defaults.with_overrides({}) is defaults
+    task = defaults.with_overrides(VisionSettings.parse_overrides({"vision": "on_failure", "screenshot_width": 640}))
+    assert task.to_dict() == {"mode": "on_failure", "max_width": 640, "quality": 80}
+    assert defaults.to_dict() == {"mode": "on", "max_width": 1024, "quality": 80}
+
+def main():
+    """Run all tests"""
+    print("🧪 Running vision settings tests...")
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return failed == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from config import env_flag
+
+if TYPE_CHECKING:  # imported lazily at runtime; browser_use is slow to import
+    from browser_use.agent.views import AgentHistoryList
+
+class TraceStore:
+    """Saved action traces of successful runs, keyed by task text and starting URL"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or os.getenv("TRACE_DIR") or str(Path.home() / ".browser_use" / "traces")
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def starting_url(browser_session) -> str:
+        """URL of the page the task starts on, about:blank for a fresh context"""
+        context = getattr(browser_session, "browser_context", None)
+        try:
+            pages = context.pages if context else []
+        except Exception:
+            pages = []
+        return pages[-1].url if pages else "about:blank"
+
+    def path_for(self, task: str, url: str) -> str:
+        """Trace file for a (task, starting URL) pair"""
+        digest = hashlib.sha256(f"{task.strip()}\n{url}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def load(self, task: str, url: str, output_model) -> Optional["AgentHistoryList"]:
+        """Load the saved trace for this task, None if there is none or it is unreadable"""
+        path = self.path_for(task, url)
+        if not os.path.exists(path):
+            return None
+        from browser_use.agent.views import AgentHistoryList
+
+        try:
+            return AgentHistoryList.load_from_file(path, output_model)
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable trace {path}: {e}")
+            return None
+
+    def save(self, task: str, url: str, history: "AgentHistoryList") -> str:
+        """Save a successful run's actions (screenshots are dropped to keep traces small)"""
+        trace = history.model_copy(deep=True)
+        for item in trace.history:
+            item.state.screenshot = None
+
+        path = self.path_for(task, url)
+        fd, tmp_path = tempfile.mkstemp(prefix=".trace.", suffix=".tmp", dir=self.directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(trace.model_dump(), f, indent=2, default=str)
+        os.replace(tmp_path, path)
+        return path
+
+    def discard(self, task: str, url: str) -> None:
+        """Forget the trace for this task, e.g. after the site changed"""
+        try:
+            os.unlink(self.path_for(task, url))
+        except FileNotFoundError:
+            pass
+
+async def replay_trace(agent, trace: "AgentHistoryList", control, max_steps: Optional[int] = None) -> Tuple[int, List[Any]]:
+    """Replay a saved trace step by step under a RunControl; returns (steps replayed, action results)
+
+    Agent.rerun_history ignores the agent's stop flag, so steps are fed to it one at
+    a time and the control's stop reason, token budget and deadline are checked in
+    between, as for an agent run. Raises like rerun_history when a step no longer
+    matches the page.
+    """
+    results = []
+    steps = 0
+    for item in trace.history:
+        if control.stop_reason or (max_steps and steps >= max_steps):
+            break
+        results.extend(await agent.rerun_history(
+            type(trace)(history=[item]), max_retries=1, skip_failures=False, delay_between_actions=0.2
+        ))
+        steps += 1
+        if any(result.is_done for result in results):
+            break
+        control.check_step()
+    return steps, results
+
+def replay_record(results: List[Any]) -> Optional[Dict[str, Any]]:
+    """Summarize replayed ActionResults; None if the replay never reached a done action"""
+    done = [result for result in results if result.is_done]
+    if not done:
+        return None
+    return {
+        "success": done[-1].success is not False,
+        "result": done[-1].extracted_content,
+        "errors": [result.error for result in results if result.error],
+    }
+
+_trace_store: Optional[TraceStore] = None
+
+def configure_trace_store(enabled: Optional[bool] = None, directory: Optional[str] = None) -> Optional[TraceStore]:
+    """Turn trace record/replay on or off for this process (defaults to $TRACE_REPLAY)"""
+    global _trace_store
+    if enabled is None:
+        enabled = env_flag("TRACE_REPLAY")
+    _trace_store = TraceStore(directory) if enabled else None
+    return _trace_store
+
+def get_trace_store() -> Optional[TraceStore]:
+    """The configured trace store, or None when replay is off"""
+    return _trace_store
@@ -0,0 +1,204 @@
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from model_router import step_confidence
+
+VISION_MODES = ("on", "off", "on_failure")
+
+class VisionSettings:
+    """Whether agent steps send screenshots to the LLM, and how large those are
+
+    mode "on_failure" captures and sends a screenshot only for the step after one
+    that failed or that the agent judged unclear. `max_width` downscales screenshots
+    to at most that many pixels wide; `quality` (1-100) sends JPEG instead of PNG.
+    """
+
+    # Task JSON field -> attribute, for batch lines and POST /tasks bodies
+    FIELDS = {"vision": "mode", "screenshot_width": "max_width", "screenshot_quality": "quality"}
+
+    def __init__(self, mode: str = "on", max_width: Optional[int] = None, quality: Optional[int] = None):
+        if mode not in VISION_MODES:
+            raise ValueError(f"Unknown vision mode: {mode!r}. Use one of: {', '.join(VISION_MODES)}")
+        if quality is not None and not 1 <= quality <= 100:
+            raise ValueError("'screenshot_quality' must be between 1 and 100")
+        self.mode = mode
+        self.max_width = max_width or None
+        self.quality = quality or None
+
+    @classmethod
+    def parse_overrides(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Pick and validate vision fields from a task's JSON"""
+        overrides = {}
+        for field, attribute in cls.FIELDS.items():
+            if data.get(field) is None:
+                continue
+            value = data[field]
+            if field == "vision":
+                if isinstance(value, bool):
+                    value = "on" if value else "off"
+                if value not in VISION_MODES:
+                    raise ValueError(f"'vision' must be true, false or one of: {', '.join(VISION_MODES)}")
+            else:
+                try:
+                    if isinstance(value, bool):
+                        raise TypeError(value)
+                    value = int(value)
+                except (TypeError, ValueError):
+                    raise ValueError(f"'{field}' must be a number")
+                if value <= 0 or (field == "screenshot_quality" and value > 100):
+                    raise ValueError(f"'{field}' is out of range")
+            overrides[attribute] = value
+        return overrides
+
+    def with_overrides(self, overrides: Optional[Dict[str, Any]]) -> "VisionSettings":
+        if not overrides:
+            return self
+        values = {"mode": self.mode, "max_width": self.max_width, "quality": self.quality}
+        values.update(overrides)
+        return VisionSettings(**values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "max_width": self.max_width, "quality": self.quality}
+
+def _content_bytes(content) -> Tuple[int, int]:
+    """(total, image) bytes of one message's content as sent to the API"""
+    if isinstance(content, str):
+        return len(content.encode("utf-8")), 0
+    total = image = 0
+    for item in content:
+        if isinstance(item, dict) and "image_url" in item:
+            url = item["image_url"]["url"] if isinstance(item["image_url"], dict) else item["image_url"]
+            total += len(url)
+            image += len(url)
+        elif isinstance(item, dict) and "text" in item:
+            total += len(item["text"].encode("utf-8"))
+    return total, image
+
+def _as_jpeg(content):
+    """browser_use labels every screenshot image/png; relabel the JPEG ones"""
+    if isinstance(content, str):
+        return content
+    relabelled = []
+    for item in content:
+        if isinstance(item, dict) and isinstance(item.get("image_url"), dict) and \
+                item["image_url"].get("url", "").startswith("data:image/png;base64,/9j/"):
+            url = "data:image/jpeg;base64," + item["image_url"]["url"][len("data:image/png;base64,"):]
+            item = {**item, "image_url": {**item["image_url"], "url": url}}
+        relabelled.append(item)
+    return relabelled
+
+class ScreenshotControl:
+    """Applies VisionSettings to one agent run and measures what each step uploads
+
+    It wraps the session's take_screenshot (skipped when the step runs without
+    vision, otherwise captured through CDP when a size or JPEG quality is set) and
+    the agent's get_next_action (to measure the request payload). detach() restores
+    the session, which pooled browsers hand to the next task.
+    """
+
+    def __init__(self, agent, settings: VisionSettings):
+        self.agent = agent
+        self.settings = settings
+        self.session = agent.browser_session
+        self.step_stats = self._empty_stats()
+        self.totals = {"steps_with_vision": 0, "payload_bytes": 0, "image_bytes": 0}
+        self._get_next_action = agent.get_next_action
+        self._take_screenshot = self.session.take_screenshot
+        # Instance attributes shadow the methods; object.__setattr__ gets past pydantic's checks on the session
+        object.__setattr__(self.session, "take_screenshot", self.take_screenshot)
+        object.__setattr__(agent, "get_next_action", self.get_next_action)
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, Any]:
+        return {"vision": False, "payload_bytes": 0, "image_bytes": 0}
+
+    def detach(self) -> None:
+        self.session.__dict__.pop("take_screenshot", None)
+
+    def before_step(self) -> None:
+        """Decide whether the coming step sees a screenshot"""
+        if self.settings.mode == "on_failure":
+            history = self.agent.state.history.history
+            failed = any(result.error for result in self.agent.state.last_result or [])
+            unclear = bool(history) and not step_confidence(history[-1:], first_step=len(history) == 1)
+            self.agent.settings.use_vision = failed or unclear
+        self.step_stats = self._empty_stats()
+        self.step_stats["vision"] = bool(self.agent.settings.use_vision)
+
+    def end_step(self) -> Dict[str, Any]:
+        """The finished step's payload stats; also added to the task totals"""
+        stats = self.step_stats
+        self.totals["steps_with_vision"] += int(stats["vision"])
+        self.totals["payload_bytes"] += stats["payload_bytes"]
+        self.totals["image_bytes"] += stats["image_bytes"]
+        return stats
+
+    def summary(self) -> Dict[str, Any]:
+        return {**self.settings.to_dict(), **self.totals}
+
+    async def take_screenshot(self, full_page: bool = False) -> Optional[str]:
+        if not self.agent.settings.use_vision:
+            return None  # nothing would send it; skip the capture
+        if full_page or not (self.settings.max_width or self.settings.quality):
+            return await self._take_screenshot(full_page)
+        try:
+            return await self._capture()
+        except Exception as e:
+            print(f"⚠️ Reduced screenshot failed ({type(e).__name__}: {e}), using a full-size one")
+            return await self._take_screenshot(full_page)
+
+    async def _capture(self) -> str:
+        """Viewport screenshot straight from Chromium, scaled down and/or JPEG-encoded"""
+        page = await self.session.get_current_page()
+        try:
+            await page.wait_for_load_state(timeout=5000)
+        except Exception:
+            pass
+        params: Dict[str, Any] = {"format": "jpeg" if self.settings.quality else "png"}
+        if self.settings.quality:
+            params["quality"] = self.settings.quality
+        if self.settings.max_width:
+            view = await page.evaluate("""() => ({x: window.scrollX, y: window.scrollY,
+                width: window.innerWidth, height: window.innerHeight, dpr: window.devicePixelRatio || 1})""")
+            scale = min(1.0, self.settings.max_width / (view["width"] * view["dpr"]))
+            params["clip"] = {"x": view["x"], "y": view["y"], "width": view["width"],
+                              "height": view["height"], "scale": scale}
+        cdp = await page.context.new_cdp_session(page)
+        try:
+            result = await cdp.send("Page.captureScreenshot", params)
+        finally:
+            await cdp.detach()
+        return result["data"]
+
+    async def get_next_action(self, input_messages):
+        total = image = 0
+        sent = []
+        for message in input_messages:
+            content_bytes, image_bytes = _content_bytes(message.content)
+            total += content_bytes + len(str(getattr(message, "tool_calls", "") or "").encode("utf-8"))
+            image += image_bytes
+            if image_bytes and self.settings.quality:
+                message = message.model_copy(update={"content": _as_jpeg(message.content)})
+            sent.append(message)
+        # A step that retries sends twice; count both
+        self.step_stats["payload_bytes"] += total
+        self.step_stats["image_bytes"] += image
+        return await self._get_next_action(sent)
+
+_vision = VisionSettings()
+
+def configure_vision(mode: Optional[str] = None, max_width: Optional[int] = None,
+                     quality: Optional[int] = None) -> VisionSettings:
+    """Set the default vision settings of every task (from VISION_MODE / SCREENSHOT_WIDTH / SCREENSHOT_QUALITY)"""
+    global _vision
+    mode = mode or os.getenv("VISION_MODE") or "on"
+    if max_width is None and os.getenv("SCREENSHOT_WIDTH"):
+        max_width = int(os.getenv("SCREENSHOT_WIDTH"))
+    if quality is None and os.getenv("SCREENSHOT_QUALITY"):
+        quality = int(os.getenv("SCREENSHOT_QUALITY"))
+    _vision = VisionSettings(mode, max_width, quality)
+    return _vision
+
+def get_vision() -> VisionSettings:
+    """The configured default vision settings (screenshots on, full size, PNG unless configured)"""
+    return _vision